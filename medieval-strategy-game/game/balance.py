@@ -0,0 +1,262 @@
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from .states.menu_state import LEVELS
+
+# Headless match settings
+SCREEN_SIZE = (1500, 1000)  # Same as main.py, so HUD buttons sit where players click
+DECISION_INTERVAL = 1.0     # Seconds of game time between policy decisions
+RESULTS_FILE = "balance_results.jsonl"
+
+class Policy:
+    """Scripted player: recruits and attacks through the same HUD and move commands a player uses"""
+    
+    recruit_types = ()
+    attack_army_size = 10
+    upgrades = False
+    
+    def __init__(self):
+        self.next_recruit = 0
+    
+    def act(self, game_state):
+        castle = game_state.player_castle
+        if self.upgrades:
+            cost = castle.get_upgrade_cost()
+            if cost and all(castle.resources.get(name, 0) >= amount * 2 for name, amount in cost.items()):
+                game_state.click_hud(*game_state.hud.upgrade_button.center)
+        
+        # Recruit one unit per decision, cycling through the preferred types
+        if self.recruit_types:
+            unit_type = self.recruit_types[self.next_recruit % len(self.recruit_types)]
+            self.next_recruit += 1
+            game_state.click_hud(*game_state.hud.recruit_buttons[unit_type].center)
+        
+        # Send idle units at the nearest enemy castle once the army is big enough
+        idle_units = [unit for unit in game_state.unit_manager.get_units_by_owner("player") if not unit.is_moving]
+        targets = [enemy for enemy in game_state.enemy_castles if enemy.is_alive()]
+        if targets and len(idle_units) >= self.attack_army_size:
+            target = min(targets, key=lambda enemy: (enemy.x - castle.x) ** 2 + (enemy.y - castle.y) ** 2)
+            game_state.unit_manager.deselect_all()
+            for unit in idle_units:
+                game_state.unit_manager.select_unit(unit)
+            game_state.move_selected_units(target.x + target.size // 2, target.y + target.size // 2)
+            game_state.unit_manager.deselect_all()
+
+class IdlePolicy(Policy):
+    """Never acts: how long the castle defenses hold on their own"""
+    attack_army_size = math.inf
+
+class RushPolicy(Policy):
+    """Cheap fast units, attack early"""
+    recruit_types = ('knight', 'archer', 'cavalry')
+    attack_army_size = 6
+
+class TurtlePolicy(Policy):
+    """Upgrade the castle, mass ranged units, attack late"""
+    recruit_types = ('archer', 'musket', 'archer', 'cannon')
+    attack_army_size = 25
+    upgrades = True
+
+class BalancedPolicy(Policy):
+    """Mixed army with upgrades; unlocked heavy units as they become available"""
+    recruit_types = ('knight', 'archer', 'cavalry', 'musket', 'battalion', 'cannon', 'giant')
+    attack_army_size = 12
+    upgrades = True
+
+POLICIES = {
+    'idle': IdlePolicy,
+    'rush': RushPolicy,
+    'turtle': TurtlePolicy,
+    'balanced': BalancedPolicy,
+}
+
+def match_seed(base_seed, level, policy, match):
+    """Every match gets its own seed, so results do not depend on which worker ran it"""
+    return zlib.crc32(f"{base_seed}:{level}:{policy}:{match}".encode())
+
+def play_match(game_state, level, policy, seed, tick=1 / 30, max_seconds=600):
+    """Run one headless match to the end (or the time limit) and return its stats"""
+    game_manager = game_state.game_manager
+    game_manager.current_level = level
+    game_manager.current_level_info = LEVELS[level]
+    random.seed(seed)
+    game_state.player_castle.reset_upgrades()
+    game_state.reset(LEVELS[level])
+    player = POLICIES[policy]()
+    
+    peak_units = 0
+    tick_costs = []
+    next_decision = 0.0
+    while not game_state.game_over and game_state.sim_time < max_seconds:
+        if game_state.sim_time >= next_decision:
+            player.act(game_state)
+            next_decision += DECISION_INTERVAL
+        start = time.perf_counter()
+        game_state.simulate(tick)
+        tick_costs.append(time.perf_counter() - start)
+        peak_units = max(peak_units, len(game_state.unit_manager.units))
+    
+    tick_costs.sort()
+    result = 'win' if game_state.victory else 'loss' if game_state.defeat else 'timeout'
+    return {
+        'level': level, 'policy': policy, 'seed': seed, 'result': result,
+        'seconds': round(game_state.sim_time, 2), 'peak_units': peak_units,
+        'tick_ms_mean': round(sum(tick_costs) / max(1, len(tick_costs)) * 1000, 3),
+        'tick_ms_p95': round(tick_costs[int(len(tick_costs) * 0.95)] * 1000, 3) if tick_costs else 0.0,
+        'tick_ms_max': round(tick_costs[-1] * 1000, 3) if tick_costs else 0.0,
+    }
+
+# Each worker process keeps one GameState and resets it for every match
+_worker_game_state = None
+
+def _init_worker():
+    global _worker_game_state
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    # The game prints on victory/defeat; thousands of matches would flood the terminal
+    sys.stdout = open(os.devnull, "w")
+    
+    import pygame
+    from .replay import HeadlessManager
+    from .states.game_state import GameState
+    pygame.init()
+    _worker_game_state = GameState(HeadlessManager(SCREEN_SIZE))
+    _worker_game_state.recorder.enabled = False
+    _worker_game_state.player_castle.persist_upgrades = False
+    # No AI time budget, so a match plays the same whatever the machine's load
+    _worker_game_state.unit_manager.ai_scheduler.budget_ms = None
+
+def _run_match(task):
+    level, policy, match, seed, tick, max_seconds = task
+    stats = play_match(_worker_game_state, level, policy, seed, tick, max_seconds)
+    stats['match'] = match
+    return stats
+
+def load_results(path):
+    """Read finished matches; a line cut short by an interrupted run is skipped"""
+    results = []
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    results.append(json.loads(line))
+                except ValueError:
+                    pass
+    return results
+
+def run_balance(levels, policies, matches, path=RESULTS_FILE, workers=None, tick=1 / 30, max_seconds=600, base_seed=0):
+    """Run every (level, policy, match) not already in the results file, on all cores.
+    
+    Each finished match is appended to the file straight away, so stopping the
+    run (Ctrl+C) and starting it again picks up where it left off.
+    """
+    done = {(result['level'], result['policy'], result['match']) for result in load_results(path)}
+    tasks = [(level, policy, match, match_seed(base_seed, level, policy, match), tick, max_seconds)
+             for match in range(matches) for level in levels for policy in policies
+             if (level, policy, match) not in done]
+    if not tasks:
+        print(f"All {len(done)} matches already in {path}")
+        return
+    
+    workers = workers or os.cpu_count() or 1
+    print(f"Running {len(tasks)} matches on {workers} workers ({len(done)} already done)")
+    start = time.perf_counter()
+    finished = 0
+    next_progress = 100
+    pending = set()
+    task_iter = iter(tasks)
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    try:
+        with open(path, "a") as out:
+            while True:
+                # Keep every worker busy without queueing the whole run up front
+                while len(pending) < workers * 2:
+                    task = next(task_iter, None)
+                    if task is None:
+                        break
+                    pending.add(executor.submit(_run_match, task))
+                if not pending:
+                    break
+                
+                completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    out.write(json.dumps(future.result()) + "\n")
+                    finished += 1
+                out.flush()
+                
+                if finished >= next_progress:
+                    next_progress += 100
+                    rate = finished / (time.perf_counter() - start)
+                    print(f"  {finished}/{len(tasks)} matches ({rate:.1f}/s)")
+    except KeyboardInterrupt:
+        print(f"Stopped after {finished} matches; run the same command again to resume")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def build_report(results):
+    """Summarise results per level and policy as a text table"""
+    groups = {}
+    for result in results:
+        groups.setdefault((result['level'], result['policy']), []).append(result)
+    
+    lines = [f"{'Level':>5} {'Policy':<9} {'Matches':>7} {'Win%':>6} {'Loss%':>6} {'Win time':>9} "
+             f"{'Peak units':>10} {'Tick ms':>8} {'p95 ms':>7} {'Max ms':>7}  enemy_mult spawn_rate"]
+    for (level, policy), group in sorted(groups.items()):
+        wins = [result for result in group if result['result'] == 'win']
+        losses = [result for result in group if result['result'] == 'loss']
+        win_time = f"{sum(result['seconds'] for result in wins) / len(wins):.0f}s" if wins else "-"
+        peak_units = sum(result['peak_units'] for result in group) / len(group)
+        tick_ms = sum(result['tick_ms_mean'] for result in group) / len(group)
+        tick_p95 = sorted(result['tick_ms_p95'] for result in group)[int(len(group) * 0.95)]
+        tick_max = max(result['tick_ms_max'] for result in group)
+        level_info = LEVELS.get(level, {})
+        lines.append(f"{level:>5} {policy:<9} {len(group):>7} {len(wins) / len(group):>6.1%} "
+                     f"{len(losses) / len(group):>6.1%} {win_time:>9} {peak_units:>10.0f} "
+                     f"{tick_ms:>8.2f} {tick_p95:>7.2f} {tick_max:>7.2f}  "
+                     f"{level_info.get('enemy_mult', 0):>10} {level_info.get('spawn_rate', 0):>10}")
+    return "\n".join(lines)
+
+def parse_levels(text):
+    """'1-30' or '1,5,10-12' -> list of level numbers"""
+    levels = []
+    for part in text.split(","):
+        if "-" in part:
+            first, last = part.split("-")
+            levels.extend(range(int(first), int(last) + 1))
+        else:
+            levels.append(int(part))
+    return [level for level in levels if level in LEVELS]
+
+def main(argv=None):
+    """python -m game.balance --levels 1-30 --matches 1000"""
+    parser = argparse.ArgumentParser(description="Run headless matches to check level balance")
+    parser.add_argument("--levels", default=f"1-{max(LEVELS)}")
+    parser.add_argument("--policies", default=",".join(name for name in POLICIES if name != 'idle'))
+    parser.add_argument("--matches", type=int, default=1000, help="matches per level and policy")
+    parser.add_argument("--workers", type=int, default=None, help="default: all cores")
+    parser.add_argument("--out", default=RESULTS_FILE)
+    parser.add_argument("--tick", type=float, default=1 / 30, help="simulation step in seconds")
+    parser.add_argument("--max-minutes", type=float, default=10, help="matches still running are timeouts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report-only", action="store_true")
+    args = parser.parse_args(argv)
+    
+    if not args.report_only:
+        run_balance(parse_levels(args.levels), args.policies.split(","), args.matches, args.out,
+                    args.workers, args.tick, args.max_minutes * 60, args.seed)
+    
+    report = build_report(load_results(args.out))
+    report_path = os.path.splitext(args.out)[0] + "_report.txt"
+    with open(report_path, "w") as f:
+        f.write(report + "\n")
+    print(report)
+    print(f"Report written to {report_path}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
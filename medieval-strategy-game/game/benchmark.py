@@ -0,0 +1,79 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+# Big-battle benchmark: a map full of units from both sides fighting, run
+# headless with the unit update split over different numbers of cores
+SCREEN_SIZE = (1500, 1000)
+UNIT_TYPES = ('knight', 'archer', 'cavalry', 'peasant', 'catapult')
+
+def run_battle(units, workers, ticks, tick=1 / 60, seed=0):
+    """Ticks of a units-strong battle; returns (median ms per tick, state hashes every 10 ticks)"""
+    from .replay import HeadlessManager, state_hash
+    from .states.game_state import GameState
+    
+    random.seed(seed)
+    game_manager = HeadlessManager(SCREEN_SIZE, 3)
+    game_manager.sim_workers = workers
+    game_state = GameState(game_manager)
+    game_state.recorder.enabled = False
+    unit_manager = game_state.unit_manager
+    unit_manager.ai_scheduler.budget_ms = None  # Same AI work whatever the speed, so hashes can be compared
+    
+    # Both armies spread over the whole map; units and castles hold out for the whole run
+    rng = random.Random(seed)
+    size = game_state.game_map.world_width - 50
+    for index in range(units):
+        unit = unit_manager.spawn_unit(rng.uniform(0, size), rng.uniform(0, size), rng.choice(UNIT_TYPES),
+                                       "player" if index % 2 else "enemy")
+        unit.health = unit.max_health = 10**6
+    for castle in [game_state.player_castle] + game_state.enemy_castles:
+        castle.health = castle.max_health = 10**9
+    
+    times = []
+    hashes = []
+    try:
+        for index in range(ticks):
+            start = time.perf_counter()
+            game_state.simulate(tick)
+            times.append(time.perf_counter() - start)
+            if index % 10 == 0:
+                hashes.append(state_hash(game_state))
+    finally:
+        unit_manager.close_regions()
+    
+    # Skip the warm-up ticks (worker start-up, first allocations)
+    times = sorted(times[min(20, len(times) // 4):])
+    return times[len(times) // 2] * 1000, hashes
+
+def main(argv=None):
+    """python -m game.benchmark --units 5000 --workers 0,1,2,4,8"""
+    parser = argparse.ArgumentParser(description="Time a big headless battle with region-split unit updates")
+    parser.add_argument("--units", type=int, default=5000)
+    parser.add_argument("--workers", default="0,1,2,4,8", help="core counts to try (0: the single-process path)")
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    
+    import pygame
+    pygame.init()
+    baseline = None
+    first_hashes = None
+    mismatched = False
+    for workers in [int(value) for value in args.workers.split(",")]:
+        ms, hashes = run_battle(args.units, workers, args.ticks, seed=args.seed)
+        if first_hashes is None:
+            first_hashes = hashes
+            baseline = ms
+        mismatched = mismatched or hashes != first_hashes
+        same = "same result" if hashes == first_hashes else "DIFFERENT RESULT"
+        print(f"{workers} workers: {ms:.1f} ms per tick ({baseline / ms:.2f}x), {same}")
+    print(f"({os.cpu_count()} cores available)")
+    pygame.quit()
+    return 1 if mismatched else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
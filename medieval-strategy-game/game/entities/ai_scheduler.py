@@ -0,0 +1,77 @@
+import math
+import time
+from collections import deque
+
+class AIScheduler:
+    """Spreads unit target re-evaluation over several ticks.
+    
+    Each tick evaluates the urgent queue first (units that took damage or saw
+    a nearby enemy die), then the next round-robin slice of all units, so every
+    unit is looked at once every `buckets` ticks. Work stops early once the
+    tick's budget_ms is spent and picks up from there on the next tick.
+    
+    How many evaluations ran is kept in last_steps; replays record it and set
+    forced_steps instead of using the clock, so they make the same choices.
+    """
+    
+    def __init__(self, buckets=4, budget_ms=2.0):
+        self.buckets = buckets
+        self.budget_ms = budget_ms  # None: no time limit (headless runs that must be reproducible)
+        self.cursor = 0  # Next unit index for the round-robin slice
+        self.urgent = deque()
+        self.urgent_set = set()
+        self.forced_steps = None
+        self.last_steps = 0
+        self.last_ms = 0.0
+    
+    def wake(self, unit):
+        """Re-evaluate this unit ahead of the round-robin order"""
+        if unit not in self.urgent_set:
+            self.urgent_set.add(unit)
+            self.urgent.append(unit)
+    
+    def forget(self, unit):
+        """A unit left play; drop it from the urgent queue"""
+        if unit in self.urgent_set:
+            self.urgent_set.discard(unit)
+            self.urgent.remove(unit)
+    
+    def clear(self):
+        self.cursor = 0
+        self.urgent.clear()
+        self.urgent_set.clear()
+        self.forced_steps = None
+    
+    def run(self, units, evaluate):
+        """Call evaluate(unit) for this tick's share of units"""
+        start = time.perf_counter()
+        if self.forced_steps is not None:
+            limit = self.forced_steps
+            deadline = None
+        else:
+            limit = len(self.urgent) + math.ceil(len(units) / self.buckets)
+            deadline = start + self.budget_ms / 1000.0 if self.budget_ms is not None else None
+        
+        steps = 0
+        urgent = self.urgent
+        while steps < limit:
+            # Always make some progress, even on a slow tick
+            if deadline is not None and steps and time.perf_counter() >= deadline:
+                break
+            if urgent:
+                unit = urgent.popleft()
+                self.urgent_set.discard(unit)
+            elif units:
+                if self.cursor >= len(units):
+                    self.cursor = 0
+                unit = units[self.cursor]
+                self.cursor += 1
+            else:
+                break
+            if unit.health > 0:
+                evaluate(unit)
+            steps += 1
+        
+        self.last_steps = steps
+        self.last_ms = (time.perf_counter() - start) * 1000.0
+        return steps
\ No newline at end of file
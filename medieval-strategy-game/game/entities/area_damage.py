@@ -0,0 +1,49 @@
+from operator import attrgetter
+import numpy as np
+
+SPLASH_EDGE_FACTOR = 0.3  # Share of the damage dealt at the very edge of the blast
+UNIT_MARGIN = 48          # The grid files units by their top-left corner, so look a unit size further
+
+class AreaDamage:
+    """Splash damage around a point, for siege shots and castle bolts.
+    
+    Candidates come from the unit spatial grid, so a blast only looks at units
+    in the cells it touches instead of every unit in play. Damage falls off
+    linearly from full at the center to SPLASH_EDGE_FACTOR at the radius, and
+    is measured to unit centers and to the nearest edge of castles.
+    """
+    
+    def __init__(self, grid):
+        self.grid = grid
+        self.targets_hit = 0  # Units and castles damaged by splash (for stats)
+    
+    def apply(self, x, y, radius, damage, owner, castles=(), exclude=None):
+        """Damage everything not owned by owner within radius of (x, y); returns how many were hit"""
+        hits = []
+        candidates = [unit for unit in self.grid.query_radius(x, y, radius + UNIT_MARGIN)
+                      if unit.owner != owner and unit.health > 0 and unit is not exclude]
+        # Id order, not grid order, so damaged units wake their AI in the same order in replays
+        candidates.sort(key=attrgetter('unit_id'))
+        if candidates:
+            centers_x = np.fromiter((unit.x + unit.size / 2 for unit in candidates), dtype=np.float64, count=len(candidates))
+            centers_y = np.fromiter((unit.y + unit.size / 2 for unit in candidates), dtype=np.float64, count=len(candidates))
+            distances = np.hypot(centers_x - x, centers_y - y)
+            inside = np.flatnonzero(distances <= radius)
+            amounts = damage * (1.0 - (1.0 - SPLASH_EDGE_FACTOR) * distances[inside] / radius)
+            hits.extend(zip([candidates[index] for index in inside.tolist()], amounts.astype(np.int64).tolist()))
+        
+        for castle in castles:
+            if castle.owner == owner or not castle.is_alive() or castle is exclude:
+                continue
+            # Distance to the closest point of the castle's square
+            dx = max(castle.x - x, 0, x - (castle.x + castle.size))
+            dy = max(castle.y - y, 0, y - (castle.y + castle.size))
+            distance = (dx * dx + dy * dy) ** 0.5
+            if distance <= radius:
+                hits.append((castle, int(damage * (1.0 - (1.0 - SPLASH_EDGE_FACTOR) * distance / radius))))
+        
+        # Apply everything in one pass
+        for target, amount in hits:
+            target.take_damage(amount)
+        self.targets_hit += len(hits)
+        return len(hits)
\ No newline at end of file
@@ -0,0 +1,150 @@
+from operator import attrgetter
+from .steering import SEPARATION_SHARE
+
+class Dormancy:
+    """Puts idle units to sleep and keeps the list of units that are awake.
+    
+    A unit with no order, no target and no enemy anywhere near is taken out of
+    the per-tick work (AI, steering, movement, combat) until something happens
+    to it: an order (Unit.move_to), damage, or a unit entering the grid cells
+    it watches. A sleeper watches every cell an enemy could attack it from, so
+    it is awake before anyone can reach it. A friendly unit only wakes it by
+    walking into the cells around its own, so the two can be steered apart;
+    units still being pushed apart by a crowd stay awake until it settles.
+    
+    The awake list stays in unit id order (the order of UnitManager.units), so
+    the simulation does the same things whichever way units fell asleep.
+    """
+    
+    def __init__(self, grid, watch_radius):
+        self.grid = grid
+        self.watch_radius = watch_radius
+        self.active = []       # Awake units in id order, as of the last refresh
+        self.by_owner = {}     # owner -> that owner's units in active, same order
+        self.listed = set()    # Units in the active list
+        self.woken = []        # Woken since the last refresh, joining on the next one
+        self.dozed = False     # Someone fell asleep since the last refresh
+        self.watchers = {}     # cell -> sleeping units watching it
+        self.watched = {}      # sleeping unit -> the cells it watches
+        grid.on_enter = self.on_enter
+    
+    def add(self, unit):
+        """A unit joined play (units join with ever higher ids, so appending keeps the order)"""
+        unit.asleep = False
+        unit.dormancy = self
+        self.active.append(unit)
+        self.by_owner.setdefault(unit.owner, []).append(unit)
+        self.listed.add(unit)
+    
+    def forget(self, unit):
+        """A unit left play"""
+        self._unwatch(unit)
+        unit.asleep = False
+        unit.dormancy = None
+        if unit in self.listed:
+            self.listed.discard(unit)
+            self.active.remove(unit)
+            self.by_owner[unit.owner].remove(unit)
+        if unit in self.woken:
+            self.woken.remove(unit)
+    
+    def clear(self):
+        self.active.clear()
+        self.by_owner.clear()
+        self.listed.clear()
+        self.woken.clear()
+        self.watchers.clear()
+        self.watched.clear()
+        self.dozed = False
+    
+    def try_sleep(self, unit):
+        """Put an idle unit to sleep unless an enemy is in any of the cells it would watch"""
+        if unit.asleep or unit.is_moving or unit.target_enemy is not None or unit.combat_flash > 0:
+            return False
+        x = unit.x
+        y = unit.y
+        for other in self.grid.query_radius(x, y, unit.size):
+            reach = (unit.size + other.size) * SEPARATION_SHARE
+            if other is not unit and abs(other.x - x) < reach and abs(other.y - y) < reach:
+                return False
+        owner = unit.owner
+        for other in self.grid.query_radius(x, y, self.watch_radius):
+            if other.owner != owner and other.health > 0:
+                return False
+        self.sleep(unit)
+        return True
+    
+    def sleep(self, unit):
+        """Put a unit to sleep as it is (restoring a snapshot); try_sleep checks first"""
+        unit.asleep = True
+        self.dozed = True
+        min_x, min_y = self.grid.cell_of(unit.x - self.watch_radius, unit.y - self.watch_radius)
+        max_x, max_y = self.grid.cell_of(unit.x + self.watch_radius, unit.y + self.watch_radius)
+        cells = [(cell_x, cell_y) for cell_x in range(min_x, max_x + 1) for cell_y in range(min_y, max_y + 1)]
+        for cell in cells:
+            self.watchers.setdefault(cell, []).append(unit)
+        self.watched[unit] = cells
+    
+    def wake(self, unit):
+        if not unit.asleep:
+            return
+        unit.asleep = False
+        self._unwatch(unit)
+        if unit not in self.listed:
+            self.woken.append(unit)
+        # A squad member is steered by its leader, so the leader has to be up too
+        squad = unit.squad
+        if squad is not None:
+            self.wake(squad.leader)
+    
+    def on_enter(self, obj, cell):
+        """Grid hook: obj was filed under cell (it spawned or moved in)"""
+        sleepers = self.watchers.get(cell)
+        if not sleepers:
+            return
+        object_cells = self.grid.object_cells
+        for sleeper in sleepers[:]:
+            if sleeper.owner != obj.owner:
+                self.wake(sleeper)
+            elif obj.is_moving:
+                home_x, home_y = object_cells[sleeper]
+                if abs(cell[0] - home_x) <= 1 and abs(cell[1] - home_y) <= 1:
+                    self.wake(sleeper)
+    
+    def active_by_owner(self, owner):
+        return self.by_owner.setdefault(owner, [])
+    
+    def refresh(self):
+        """Drop the units that fell asleep and add the ones woken; returns True if any joined"""
+        dozed = self.dozed
+        if dozed:
+            self.dozed = False
+            listed = self.listed
+            awake = []
+            for unit in self.active:
+                if unit.asleep:
+                    listed.discard(unit)
+                else:
+                    awake.append(unit)
+            self.active = awake
+        joined = [unit for unit in dict.fromkeys(self.woken) if not unit.asleep and unit not in self.listed]
+        self.woken.clear()
+        if joined:
+            self.listed.update(joined)
+            self.active = sorted(self.active + joined, key=attrgetter('unit_id'))
+        
+        # The per-owner lists only change with the awake list, not every tick
+        if dozed or joined:
+            by_owner = self.by_owner
+            for units in by_owner.values():
+                units.clear()
+            for unit in self.active:
+                by_owner.setdefault(unit.owner, []).append(unit)
+        return bool(joined)
+    
+    def _unwatch(self, unit):
+        for cell in self.watched.pop(unit, ()):
+            sleepers = self.watchers[cell]
+            sleepers.remove(unit)
+            if not sleepers:
+                del self.watchers[cell]
\ No newline at end of file
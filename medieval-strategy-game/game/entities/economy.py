@@ -0,0 +1,165 @@
+from collections import deque
+import numpy as np
+
+ECONOMY_INTERVAL = 0.5    # Seconds between economy ticks (harvest, arrivals, unloading, new jobs)
+CARRY_CAPACITY = 10       # What a peasant brings home per trip
+WORKERS_PER_RESOURCE = 3  # Peasants on one resource before the next nearest is used
+ASSIGN_PER_TICK = 32      # Jobs handed out per economy tick
+ARRIVE_REACH = 48         # How close to a resource counts as there (steering spreads a crowd out)
+
+class Worker:
+    """A peasant's harvest job: the resource it works and the load it carries"""
+    
+    def __init__(self, unit):
+        self.unit = unit
+        self.queued = True  # Waiting in the job queue
+        self.resource = None  # None while queued, or once its resource ran out
+        self.carried = 0
+        self.carry_type = 'gold'
+        self.returning = False  # Walking home with a load
+        self.dest_x = unit.x
+        self.dest_y = unit.y
+
+class Economy:
+    """Peasants harvesting resources and carrying them back to the player castle.
+    
+    A recruited peasant is hired into the job queue. A job is the nearest
+    resource (through ResourceManager's spatial index) that is not fully
+    staffed and has no enemy in reach on the influence map. Everything else is
+    one batch every ECONOMY_INTERVAL: arrivals for all workers at once with
+    NumPy, then workers at their resource harvest it (Resource.harvest), full
+    ones head home and unload into the castle, and the queue gets new jobs.
+    Workers still walking cost nothing in between. A player order, joining a
+    squad or dying takes a peasant off work.
+    """
+    
+    def __init__(self, influence):
+        self.influence = influence
+        self.workers = {}    # unit -> Worker, in hiring order
+        self.jobs = deque()  # Workers waiting for a resource
+        self.claims = {}     # resource -> workers sent to it
+        self.timer = 0.0
+    
+    def clear(self):
+        self.workers.clear()
+        self.jobs.clear()
+        self.claims.clear()
+        self.timer = 0.0
+    
+    def hire(self, unit):
+        if unit not in self.workers:
+            worker = Worker(unit)
+            self.workers[unit] = worker
+            self.jobs.append(worker)
+    
+    def dismiss(self, unit):
+        """A peasant was ordered elsewhere or left play"""
+        worker = self.workers.pop(unit, None)
+        if worker is None:
+            return
+        self._release(worker)
+        if worker.queued:
+            self.jobs.remove(worker)
+    
+    def update(self, dt, castle, resource_manager):
+        self.timer += dt
+        if self.timer < ECONOMY_INTERVAL:
+            return
+        self.timer = 0.0
+        if self.workers and castle is not None and castle.is_alive():
+            self.tick(castle, resource_manager)
+    
+    def tick(self, castle, resource_manager):
+        """One batch: arrivals, harvesting and unloading for every worker, then new jobs"""
+        # Peasants a commander took along are soldiers now
+        for unit in [unit for unit in self.workers if unit.squad is not None or unit.health <= 0]:
+            self.dismiss(unit)
+        
+        # Which workers are where they were going, all at once
+        working = [worker for worker in self.workers.values() if not worker.queued]
+        if working:
+            count = len(working)
+            dx = (np.fromiter((worker.unit.x for worker in working), dtype=np.float64, count=count) -
+                  np.fromiter((worker.dest_x for worker in working), dtype=np.float64, count=count))
+            dy = (np.fromiter((worker.unit.y for worker in working), dtype=np.float64, count=count) -
+                  np.fromiter((worker.dest_y for worker in working), dtype=np.float64, count=count))
+            reach = np.where(np.fromiter((worker.returning for worker in working), dtype=bool, count=count),
+                             castle.size // 2, ARRIVE_REACH)
+            arrived = (dx * dx + dy * dy <= reach * reach).tolist()
+            for worker, there in zip(working, arrived):
+                if there:
+                    self._arrive(worker, castle)
+                elif not _gone(worker.resource) or worker.returning:
+                    # Knocked off the way (a fight, or woken elsewhere): carry on once free
+                    unit = worker.unit
+                    if not unit.is_moving and unit.target_enemy is None:
+                        unit.move_to(worker.dest_x, worker.dest_y)
+                else:
+                    self._requeue(worker)
+        
+        # Hand out jobs, first come first served
+        jobs = self.jobs
+        for _ in range(min(ASSIGN_PER_TICK, len(jobs))):
+            worker = jobs[0]
+            resource = resource_manager.nearest(worker.unit.x, worker.unit.y, self._open)
+            if resource is None:
+                break  # Nothing free and safe anywhere: the queue waits for the next tick
+            jobs.popleft()
+            worker.queued = False
+            worker.resource = resource
+            self.claims[resource] = self.claims.get(resource, 0) + 1
+            self._send(worker, resource.x + resource.size // 2, resource.y + resource.size // 2)
+    
+    def _arrive(self, worker, castle):
+        resource = worker.resource
+        if worker.returning:
+            # Unload (regrown wood and food come in fractions; only whole units count)
+            castle.add_resources(worker.carry_type, int(worker.carried))
+            worker.carried = 0
+            worker.returning = False
+            if _gone(resource) or resource.is_depleted():
+                self._requeue(worker)
+            else:
+                self._send(worker, resource.x + resource.size // 2, resource.y + resource.size // 2)
+            return
+        
+        if not _gone(resource):
+            worker.carried += resource.harvest(worker.unit)
+            worker.carry_type = resource.resource_type
+        if worker.carried >= CARRY_CAPACITY or _gone(resource) or resource.is_depleted():
+            if worker.carried > 0:
+                worker.returning = True
+                self._send(worker, castle.x + castle.size // 2, castle.y + castle.size // 2)
+            else:
+                self._requeue(worker)
+    
+    def _send(self, worker, x, y):
+        """Walk the worker so its center ends on (x, y)"""
+        unit = worker.unit
+        worker.dest_x = x - unit.size // 2
+        worker.dest_y = y - unit.size // 2
+        unit.move_to(worker.dest_x, worker.dest_y)
+    
+    def _requeue(self, worker):
+        self._release(worker)
+        worker.queued = True
+        self.jobs.append(worker)
+    
+    def _release(self, worker):
+        resource = worker.resource
+        if resource is not None:
+            worker.resource = None
+            claims = self.claims[resource] - 1
+            if claims:
+                self.claims[resource] = claims
+            else:
+                del self.claims[resource]
+    
+    def _open(self, resource):
+        """A resource a new worker may be sent to"""
+        return (not resource.is_depleted() and self.claims.get(resource, 0) < WORKERS_PER_RESOURCE and
+                self.influence.threat('player', resource.x, resource.y) == 0)
+
+def _gone(resource):
+    """No resource, or one used up for good (the resource manager dropped it)"""
+    return resource is None or (resource.is_depleted() and not resource.can_regenerate)
\ No newline at end of file
@@ -0,0 +1,170 @@
+import math
+import numpy as np
+
+OWNERS = ('player', 'enemy')
+CELL_SIZE = 64          # Influence cell in world pixels (a 25x25 grid on the 1600 px map)
+UPDATE_INTERVAL = 0.5   # Seconds between refreshes
+ENGAGE_RADIUS = 200     # How close units come before they fight
+VALUE_REACH = 6         # Cells over which a castle or resource's value fades out
+CASTLE_VALUE = 400      # Value of an undamaged castle; a castle near falling is worth twice that
+
+class InfluenceMap:
+    """Coarse NumPy grids of who is strong where and what is worth taking.
+    
+    strength[side] sums the fighting power (attack damage scaled by health) of
+    each side's units per cell. field[side] spreads that over a box convolution
+    that reaches ENGAGE_RADIUS plus as far as two of the fastest units alive can
+    close in before the next refresh, so field[side][cell] is 0 only where no
+    unit of that side can be within engage range until then: threat to a unit
+    is the other side's field at its cell. The field errs on the wide side (it
+    is > 0 in places nobody is in range yet), so it can rule searches out but
+    not in. New units and stat upgrades call invalidate() to refresh on the next
+    update rather than wait for the interval.
+    
+    worth[side] holds what that side would like to take, per cell: the other
+    side's castles (more the weaker they are) and the resources the other
+    side's peasants are working. value[side] blurs it with a falloff, and
+    objective(side) is the cell holding something worth taking where value
+    minus the other side's field is highest, so a bare castle or an unguarded
+    harvest beats a well defended one. All grids are refreshed together every
+    UPDATE_INTERVAL and read in O(1) by unit, wave and economy decisions
+    instead of each unit scanning for itself.
+    Arrays are indexed [side, cell_x, cell_y] like the minimap's.
+    """
+    
+    def __init__(self, world_width=1600, world_height=1600):
+        self.set_world(world_width, world_height)
+    
+    def set_world(self, world_width, world_height):
+        self.width = max(1, math.ceil(world_width / CELL_SIZE))
+        self.height = max(1, math.ceil(world_height / CELL_SIZE))
+        shape = (len(OWNERS), self.width, self.height)
+        self.strength = np.zeros(shape)
+        self.field = np.zeros(shape)
+        self.worth = np.zeros(shape)
+        self.value = np.zeros(shape)
+        self.clear()
+    
+    def clear(self):
+        self.strength.fill(0)
+        self.field.fill(0)
+        self.worth.fill(0)
+        self.value.fill(0)
+        self.objectives = [None] * len(OWNERS)
+        self.reach = _reach_cells(ENGAGE_RADIUS)  # Cells the field spreads over, set by refresh()
+        self.invalidate()
+    
+    def invalidate(self):
+        """Refresh on the next update (units were added or got faster)"""
+        self.timer = UPDATE_INTERVAL
+    
+    def cell_of(self, x, y):
+        cell_x = min(max(int(x // CELL_SIZE), 0), self.width - 1)
+        cell_y = min(max(int(y // CELL_SIZE), 0), self.height - 1)
+        return cell_x, cell_y
+    
+    def friendly(self, owner, x, y):
+        """Strength of owner's side around (x, y)"""
+        cell_x, cell_y = self.cell_of(x, y)
+        return self.field[OWNERS.index(owner), cell_x, cell_y]
+    
+    def threat(self, owner, x, y):
+        """Strength of the other side around (x, y)"""
+        cell_x, cell_y = self.cell_of(x, y)
+        return self.field[1 - OWNERS.index(owner), cell_x, cell_y]
+    
+    def worth_taking(self, owner, x, y):
+        """How much owner's side would gain around (x, y)"""
+        cell_x, cell_y = self.cell_of(x, y)
+        return self.value[OWNERS.index(owner), cell_x, cell_y]
+    
+    def objective(self, owner):
+        """Center of the cell most worth attacking for owner's side, or None if nothing is"""
+        return self.objectives[OWNERS.index(owner)]
+    
+    def hotspot(self, owner):
+        """Center of the cell where owner's side is strongest, or None if it has no units"""
+        strength = self.strength[OWNERS.index(owner)]
+        if not strength.any():
+            return None
+        cell_x, cell_y = np.unravel_index(int(np.argmax(strength)), strength.shape)
+        return ((cell_x + 0.5) * CELL_SIZE, (cell_y + 0.5) * CELL_SIZE)
+    
+    def update(self, dt, unit_index, player_castle=None, enemy_castles=(), harvested=()):
+        """Refresh every layer once UPDATE_INTERVAL has passed"""
+        self.timer += dt
+        if self.timer < UPDATE_INTERVAL:
+            return
+        self.timer = 0
+        castles = ([player_castle] if player_castle is not None else []) + list(enemy_castles or ())
+        self.refresh(unit_index, castles, harvested)
+    
+    def refresh(self, unit_index, castles=(), harvested=()):
+        """harvested: resources the player's peasants are working (worth raiding for the enemy)"""
+        cells = self.width * self.height
+        fastest = 0
+        for side, owner in enumerate(OWNERS):
+            units = unit_index.owner(owner)
+            count = len(units)
+            fastest = max([fastest] + [unit.speed for unit in units])
+            x = np.fromiter((unit.x for unit in units), dtype=np.float64, count=count)
+            y = np.fromiter((unit.y for unit in units), dtype=np.float64, count=count)
+            power = np.fromiter((unit.attack_damage * unit.health / max(1, unit.max_health) for unit in units),
+                                dtype=np.float64, count=count)
+            self.strength[side] = np.bincount(self._cell_index(x, y), weights=power,
+                                              minlength=cells).reshape(self.width, self.height)
+        # Until the next refresh a unit and its enemy can each walk toward the other
+        self.reach = _reach_cells(ENGAGE_RADIUS + 2 * fastest * UPDATE_INTERVAL)
+        
+        # Worth: the other side's castles, and the resources the player lives on for the enemy
+        self.worth.fill(0)
+        for castle in castles:
+            if castle.owner in OWNERS and castle.is_alive():
+                cell_x, cell_y = self.cell_of(castle.x + castle.size // 2, castle.y + castle.size // 2)
+                damage = 1 - castle.health / castle.max_health
+                self.worth[1 - OWNERS.index(castle.owner), cell_x, cell_y] += CASTLE_VALUE * (1 + damage)
+        for resource in harvested:
+            if not resource.is_depleted():
+                cell_x, cell_y = self.cell_of(resource.x + resource.size // 2, resource.y + resource.size // 2)
+                self.worth[OWNERS.index('enemy'), cell_x, cell_y] += resource.amount
+        self.spread()
+    
+    def spread(self):
+        """Field, value and objectives from strength and worth (also after a snapshot restores them)"""
+        self.field = _convolve(self.strength, np.ones(2 * self.reach + 1))
+        falloff = np.concatenate([np.arange(1, VALUE_REACH + 2), np.arange(VALUE_REACH, 0, -1)]) / (VALUE_REACH + 1)
+        self.value = _convolve(self.worth, falloff)
+        for side in range(len(OWNERS)):
+            if not self.worth[side].any():
+                self.objectives[side] = None
+                continue
+            # Only cells that hold something are candidates; the other side's strength counts against them
+            score = np.where(self.worth[side] > 0, self.value[side] - self.field[1 - side], -np.inf)
+            cell_x, cell_y = np.unravel_index(int(np.argmax(score)), score.shape)
+            self.objectives[side] = ((cell_x + 0.5) * CELL_SIZE, (cell_y + 0.5) * CELL_SIZE)
+    
+    def _cell_index(self, x, y):
+        cell_x = np.clip((x // CELL_SIZE).astype(np.int64), 0, self.width - 1)
+        cell_y = np.clip((y // CELL_SIZE).astype(np.int64), 0, self.height - 1)
+        return cell_x * self.height + cell_y
+
+def _reach_cells(distance):
+    """Cells a box must reach so any two points distance apart along an axis fall inside it"""
+    return int(distance // CELL_SIZE) + 1
+
+def _convolve(layers, kernel):
+    """Separable convolution of [side, x, y] layers by a 1D kernel along x then y (zero past the map edge).
+    
+    Done as a weighted sum of shifted copies, so cells nothing reaches stay exactly 0.
+    """
+    radius = len(kernel) // 2
+    for axis in (1, 2):
+        padding = [(0, 0)] * 3
+        padding[axis] = (radius, radius)
+        padded = np.pad(layers, padding)
+        size = layers.shape[axis]
+        result = np.zeros_like(layers)
+        for offset, weight in enumerate(kernel):
+            result += weight * np.take(padded, range(offset, offset + size), axis=axis)
+        layers = result
+    return layers
\ No newline at end of file
@@ -0,0 +1,157 @@
+import math
+import numpy as np
+
+# Flight settings per projectile kind; the index in PROJECTILE_KINDS is what
+# the arrays (and snapshots) store
+PROJECTILE_TYPES = {
+    'arrow': {'speed': 450, 'arc': 12, 'splash': 0},       # Archers
+    'bullet': {'speed': 900, 'arc': 0, 'splash': 0},       # Muskets
+    'stone': {'speed': 260, 'arc': 60, 'splash': 60},      # Catapults (lobbed high)
+    'cannonball': {'speed': 550, 'arc': 15, 'splash': 45},  # Cannons
+    'bolt': {'speed': 700, 'arc': 0, 'splash': 0},         # Player castle defenses (radius set by the castle)
+}
+PROJECTILE_KINDS = tuple(PROJECTILE_TYPES)
+OWNERS = ('player', 'enemy')
+_ARCS = np.array([settings['arc'] for settings in PROJECTILE_TYPES.values()], dtype=np.float64)
+
+class ProjectileSystem:
+    """Every shot in flight, stored column by column in NumPy arrays.
+    
+    Shots fly in a straight line to where the target was when they were fired
+    and deal their damage on arrival, if the target is still alive; shots with
+    a splash radius also hurt other enemies around the impact. Live shots
+    are packed at the front of the arrays; landed ones are compacted away, and
+    the arrays only grow (doubling) when more shots are in the air than ever
+    before, so firing allocates nothing per shot.
+    """
+    
+    def __init__(self, capacity=256):
+        self.count = 0
+        self.kinds = np.zeros(capacity, dtype=np.uint8)
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.remaining = np.zeros(capacity)    # Seconds until impact
+        self.flight_time = np.zeros(capacity)  # Total seconds in the air (for the arc)
+        self.damage = np.zeros(capacity, dtype=np.int32)
+        self.targets = np.empty(capacity, dtype=object)       # Unit or castle hit on impact
+        self.target_ids = np.full(capacity, -1, dtype=np.int64)  # unit_id when fired (-1 for castles)
+        self.owners = np.zeros(capacity, dtype=np.uint8)  # Index in OWNERS of the shooter (splash spares them)
+        self.splash = np.zeros(capacity)  # Splash radius, 0 for a single-target shot
+        self.fired = 0   # Shots fired since the last clear (for stats)
+        self.landed = 0  # Shots that hit a live target
+    
+    def __len__(self):
+        return self.count
+    
+    def launch(self, kind, x, y, target, target_x, target_y, damage, owner="player", splash=None):
+        """Fire a shot from (x, y) at the target's current position (splash None: the kind's radius)"""
+        if self.count == len(self.x):
+            self._grow()
+        index = self.count
+        self.count += 1
+        self.fired += 1
+        
+        dx = target_x - x
+        dy = target_y - y
+        flight_time = max(1e-3, math.sqrt(dx * dx + dy * dy) / PROJECTILE_TYPES[kind]['speed'])
+        self.kinds[index] = PROJECTILE_KINDS.index(kind)
+        self.x[index] = x
+        self.y[index] = y
+        self.vx[index] = dx / flight_time
+        self.vy[index] = dy / flight_time
+        self.remaining[index] = flight_time
+        self.flight_time[index] = flight_time
+        self.damage[index] = damage
+        self.targets[index] = target
+        self.target_ids[index] = getattr(target, 'unit_id', -1)
+        self.owners[index] = OWNERS.index(owner)
+        self.splash[index] = PROJECTILE_TYPES[kind]['splash'] if splash is None else splash
+    
+    def restore(self, kind_index, x, y, vx, vy, remaining, flight_time, damage, target, owner_index, splash):
+        """Put back a shot exactly as a snapshot recorded it (target None: it lands on nothing)"""
+        if self.count == len(self.x):
+            self._grow()
+        index = self.count
+        self.count += 1
+        self.kinds[index] = kind_index
+        self.x[index] = x
+        self.y[index] = y
+        self.vx[index] = vx
+        self.vy[index] = vy
+        self.remaining[index] = remaining
+        self.flight_time[index] = flight_time
+        self.damage[index] = damage
+        self.targets[index] = target
+        self.target_ids[index] = getattr(target, 'unit_id', -1)
+        self.owners[index] = owner_index
+        self.splash[index] = splash
+    
+    def update(self, dt, area_damage=None, castles=()):
+        """Move every shot; landed ones hit their target and, with area_damage, splash the rest"""
+        count = self.count
+        if not count:
+            return
+        
+        # Move every shot at once
+        self.x[:count] += self.vx[:count] * dt
+        self.y[:count] += self.vy[:count] * dt
+        self.remaining[:count] -= dt
+        
+        landed = self.remaining[:count] <= 0
+        if not landed.any():
+            return
+        
+        # Resolve impacts in launch order, so replays apply damage the same way
+        indices = np.flatnonzero(landed)
+        for index, target, target_id, damage, radius in zip(
+                indices.tolist(), self.targets[indices].tolist(), self.target_ids[indices].tolist(),
+                self.damage[indices].tolist(), self.splash[indices].tolist()):
+            # A pooled unit may have been recycled since the shot was fired
+            if target is not None and (target.health <= 0 or getattr(target, 'unit_id', -1) != target_id):
+                target = None
+            if target is not None:
+                target.take_damage(damage)
+                self.landed += 1
+            if radius > 0 and area_damage is not None:
+                # The target took the full hit; everything else nearby gets the falloff
+                area_damage.apply(float(self.x[index]), float(self.y[index]), radius, damage,
+                                  OWNERS[self.owners[index]], castles, exclude=target)
+        
+        # Compact the shots still in flight to the front
+        keep = np.flatnonzero(~landed)
+        new_count = len(keep)
+        for column in (self.kinds, self.x, self.y, self.vx, self.vy, self.remaining,
+                       self.flight_time, self.damage, self.targets, self.target_ids, self.owners, self.splash):
+            column[:new_count] = column[keep]
+        self.targets[new_count:count] = None
+        self.count = new_count
+    
+    def clear(self):
+        self.targets[:self.count] = None
+        self.count = 0
+        self.fired = 0
+        self.landed = 0
+    
+    def heights(self):
+        """Visual height above the ground of each shot in flight (a parabola over the flight)"""
+        count = self.count
+        progress = 1.0 - self.remaining[:count] / self.flight_time[:count]
+        return _ARCS[self.kinds[:count]] * 4.0 * progress * (1.0 - progress)
+    
+    def _grow(self):
+        """Double the capacity of every column"""
+        capacity = len(self.x)
+        self.kinds = np.concatenate([self.kinds, np.zeros(capacity, dtype=np.uint8)])
+        self.x = np.concatenate([self.x, np.zeros(capacity)])
+        self.y = np.concatenate([self.y, np.zeros(capacity)])
+        self.vx = np.concatenate([self.vx, np.zeros(capacity)])
+        self.vy = np.concatenate([self.vy, np.zeros(capacity)])
+        self.remaining = np.concatenate([self.remaining, np.zeros(capacity)])
+        self.flight_time = np.concatenate([self.flight_time, np.zeros(capacity)])
+        self.damage = np.concatenate([self.damage, np.zeros(capacity, dtype=np.int32)])
+        self.targets = np.concatenate([self.targets, np.empty(capacity, dtype=object)])
+        self.target_ids = np.concatenate([self.target_ids, np.full(capacity, -1, dtype=np.int64)])
+        self.owners = np.concatenate([self.owners, np.zeros(capacity, dtype=np.uint8)])
+        self.splash = np.concatenate([self.splash, np.zeros(capacity)])
\ No newline at end of file
@@ -0,0 +1,313 @@
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+from operator import attrgetter
+
+# Unit fields copied into the shared input block, one float64 row each
+COLUMNS = ('x', 'y', 'target_x', 'target_y', 'speed', 'is_moving', 'health', 'attack_range', 'size', 'combat_flash')
+_GETTERS = [attrgetter(name) for name in COLUMNS]
+X, Y, TARGET_X, TARGET_Y, SPEED, MOVING, HEALTH, RANGE, SIZE, FLASH = range(len(COLUMNS))
+OWNER_CODES = {'player': 0, 'enemy': 1, 'neutral': 2}
+OWNERS_COUNT = len(OWNER_CODES)
+
+SEARCH_CELL = 48           # Cell size of the per-region target search (one unit)
+CELL_OFFSET = 1 << 20      # Keeps cell numbers positive in the sort keys (maps far off the origin still fit)
+NEAREST_KEPT = 2           # Enemies in range kept per unit, nearest first, in case the nearest dies before its turn
+PARALLEL_MIN_UNITS = 1000  # Below this, one region in this process beats handing work out
+NOT_SEARCHED = -2
+UNKNOWN = object()         # nearest_hostile(): no precomputed answer, search the grid instead
+
+def _layout(capacity):
+    """(name, dtype, shape) of every array in a block for `capacity` units"""
+    return (
+        ('inputs', np.float64, (len(COLUMNS), capacity)),
+        ('owner', np.int64, (capacity,)),
+        ('unit_id', np.int64, (capacity,)),
+        ('order', np.int64, (capacity,)),    # Unit slots sorted by x before moving
+        ('lock', np.int64, (capacity,)),     # Slot of the unit's locked target, -1 for none (or a castle)
+        ('outputs', np.float64, (4, capacity)),  # x, y, is_moving, combat_flash after moving
+        ('nearest', np.int64, (NEAREST_KEPT, capacity)),  # Slots of the nearest enemies in attack range, -1 past
+                                                          # the last, NOT_SEARCHED for units that kept their target
+    )
+
+def _block_size(capacity):
+    return sum(int(np.prod(shape)) * np.dtype(dtype).itemsize for _, dtype, shape in _layout(capacity))
+
+def _views(buffer, capacity):
+    views = {}
+    offset = 0
+    for name, dtype, shape in _layout(capacity):
+        views[name] = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        offset += int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return views
+
+# Worker side: the block this process has attached, kept across ticks
+_attached = {}
+
+def _attach(name, capacity):
+    if name not in _attached:
+        for shm, _ in _attached.values():
+            shm.close()
+        _attached.clear()
+        shm = shared_memory.SharedMemory(name=name)
+        _attached[name] = (shm, _views(shm.buf, capacity))
+    return _attached[name][1]
+
+def _step_region(name, capacity, count, region, regions, dt, margin, hysteresis, castle, views=None):
+    """Move one region's units and find each one's nearest enemy in attack range.
+    
+    Regions are runs of units sorted by x. A region also moves the units within
+    `margin` of its edges (the same arithmetic, so the same result as their own
+    region gets) and searches them too, so enemies across a border are found
+    exactly. It only writes its own units' slots, so regions never overlap.
+    
+    Units about to keep their current target skip the search (see
+    UnitManager.combat_target): enemies in reach of the player castle, whose
+    center is `castle` (None once it falls), and units whose locked target is
+    alive and within attack range plus `hysteresis`.
+    """
+    if views is None:
+        views = _attach(name, capacity)
+    start = region * count // regions
+    end = (region + 1) * count // regions
+    if start == end:
+        return
+    inputs = views['inputs']
+    order = views['order'][:count]
+    sorted_x = inputs[X][order]
+    low = int(np.searchsorted(sorted_x, sorted_x[start] - margin, 'left'))
+    high = int(np.searchsorted(sorted_x, sorted_x[end - 1] + margin, 'right'))
+    near = order[low:high]
+    own = slice(start - low, end - low)
+    
+    # Movement, exactly as Unit.update does it
+    x = inputs[X][near]
+    y = inputs[Y][near]
+    target_x = inputs[TARGET_X][near]
+    target_y = inputs[TARGET_Y][near]
+    moving = inputs[MOVING][near]
+    flash = inputs[FLASH][near]
+    alive = inputs[HEALTH][near] > 0
+    flash = np.where(alive & (flash > 0), flash - dt, flash)
+    dx = target_x - x
+    dy = target_y - y
+    distance = np.sqrt(dx * dx + dy * dy)
+    walking = alive & (moving != 0)
+    going = walking & (distance > 2)
+    arrived = walking & ~going
+    step = inputs[SPEED][near] * dt
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = np.where(going, x + (dx / distance) * step, np.where(arrived, target_x, x))
+        y = np.where(going, y + (dy / distance) * step, np.where(arrived, target_y, y))
+    moving = np.where(arrived, 0.0, moving)
+    outputs = views['outputs']
+    own_slots = near[own]
+    outputs[0][own_slots] = x[own]
+    outputs[1][own_slots] = y[own]
+    outputs[2][own_slots] = moving[own]
+    outputs[3][own_slots] = flash[own]
+    
+    owner = views['owner'][near]
+    attack_range = inputs[RANGE][near]
+    half = np.floor_divide(inputs[SIZE][near], 2)
+    center_x = x + half
+    center_y = y + half
+    
+    # Who needs a new target: not the units that will keep fighting what they fight now
+    searching = alive[own].copy()
+    own_x = x[own]
+    own_y = y[own]
+    own_range = attack_range[own]
+    position = np.full(count, -1, dtype=np.int64)
+    position[near] = np.arange(len(near))
+    lock = views['lock'][own_slots]
+    locked = np.flatnonzero(lock >= 0)
+    target = position[lock[locked]]
+    visible = target >= 0  # A target beyond the margin is out of reach anyway
+    locked = locked[visible]
+    target = target[visible]
+    gap_x = own_x[locked] - center_x[target]
+    gap_y = own_y[locked] - center_y[target]
+    holding = alive[target] & (np.sqrt(gap_x * gap_x + gap_y * gap_y) <= own_range[locked] + hysteresis)
+    searching[locked[holding]] = False
+    if castle is not None:
+        gap_x = own_x - castle[0]
+        gap_y = own_y - castle[1]
+        searching &= ~((owner[own] == OWNER_CODES['enemy']) & (np.sqrt(gap_x * gap_x + gap_y * gap_y) <= own_range))
+    
+    # Target search: live units here, sorted by owner, then by the cell their center is in
+    nearest = views['nearest']
+    nearest[:, own_slots] = NOT_SEARCHED
+    nearest[:, own_slots[searching]] = -1
+    candidates = np.flatnonzero(alive)
+    searchers = np.flatnonzero(searching) + own.start
+    if not len(candidates) or not len(searchers):
+        return
+    keys = _cell_key(owner[candidates], _cell(center_x[candidates]), _cell(center_y[candidates]))
+    by_cell = np.argsort(keys, kind='stable')
+    keys = keys[by_cell]
+    candidates = candidates[by_cell]
+    
+    # A searcher looks through every column of cells in reach, cut down to the circle of
+    # its attack range, once per other owner; each of those is one run of the sorted keys
+    reach = np.ceil(attack_range[searchers] / SEARCH_CELL).astype(np.int64)
+    widths = 2 * reach + 1
+    column_searcher = np.repeat(np.arange(len(searchers)), widths)
+    offset = _ramp(widths) - reach[column_searcher]
+    side = np.maximum(np.abs(offset) - 1, 0) * SEARCH_CELL
+    column_range = attack_range[searchers][column_searcher]
+    height = np.ceil(np.sqrt(np.maximum(column_range * column_range - side * side, 0)) / SEARCH_CELL)
+    column_searcher = np.repeat(column_searcher, OWNERS_COUNT - 1)
+    height = np.repeat(height.astype(np.int64), OWNERS_COUNT - 1)
+    seeker = searchers[column_searcher]
+    hostile_owner = (owner[seeker] + 1 + _ramp(np.full(len(offset), OWNERS_COUNT - 1))) % OWNERS_COUNT
+    home = _cell_key(hostile_owner, _cell(x[seeker]) + np.repeat(offset, OWNERS_COUNT - 1), _cell(y[seeker]))
+    lows = np.searchsorted(keys, home - height, 'left')
+    lengths = np.searchsorted(keys, home + height, 'right') - lows
+    
+    # Every (searcher, enemy) pair, grouped by searcher
+    pair_searcher = np.repeat(column_searcher, lengths)
+    found = candidates[np.repeat(lows, lengths) + _ramp(lengths)]
+    seeker = searchers[pair_searcher]
+    gap_x = x[seeker] - center_x[found]
+    gap_y = y[seeker] - center_y[found]
+    distances = np.sqrt(gap_x * gap_x + gap_y * gap_y)
+    in_range = distances <= attack_range[seeker]
+    pair_searcher = pair_searcher[in_range]
+    found = found[in_range]
+    distances = distances[in_range]
+    if not len(found):
+        return
+    
+    # Keep the NEAREST_KEPT closest per searcher; equal distances go to the older unit,
+    # as in UnitManager._nearest_hostile
+    unit_id = views['unit_id'][near][found]
+    new_group = np.diff(pair_searcher, prepend=-1) != 0
+    starts = np.flatnonzero(new_group)
+    group = np.cumsum(new_group) - 1
+    slots = near[searchers[pair_searcher[starts]]]
+    for rank in range(NEAREST_KEPT):
+        best = np.minimum.reduceat(distances, starts)
+        tied_id = np.where(distances == best[group], unit_id, np.iinfo(np.int64).max)
+        best_id = np.minimum.reduceat(tied_id, starts)
+        has = np.isfinite(best)
+        winner = (tied_id == best_id[group]) & has[group]
+        nearest[rank, slots[has]] = near[found[winner]]
+        distances = np.where(winner, np.inf, distances)
+
+def _cell(coordinates):
+    return np.floor(coordinates / SEARCH_CELL).astype(np.int64)
+
+def _cell_key(owners, column, row):
+    """Sort key of (owner, cell column, cell row); the cells of a column are consecutive keys"""
+    return (owners << 56) + ((column + CELL_OFFSET) << 28) + row + CELL_OFFSET
+
+def _ramp(lengths):
+    """0..n-1 for every n in lengths, concatenated"""
+    total = int(lengths.sum())
+    return np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+class RegionSimulator:
+    """Unit movement and target search split into map regions, one per core.
+    
+    Every tick the unit fields the work needs are copied into a shared memory
+    block, units are sorted by x into equal-sized regions, and each region is
+    stepped in a worker process (region 0 in this one). Everything a region
+    reads is what the block held at the start of the tick and everything it
+    writes belongs to its own units, so the merge is just reading the block
+    back in unit order: the result does not depend on how many regions there
+    are, and matches the single-core path bit for bit.
+    """
+    
+    def __init__(self, workers):
+        self.regions = max(1, workers)
+        self.executor = None
+        if self.regions > 1:
+            self.executor = ProcessPoolExecutor(self.regions - 1, mp_context=get_context("spawn"))
+        self.shm = None
+        self.views = None
+        self.capacity = 0
+        self.units = []   # Units in slot order, as of the last step
+        self.slots = {}
+        self.valid = False  # Cleared when a unit joins: it could be nearer than the precomputed answers
+        self.last_ms = 0.0
+    
+    def step(self, units, dt, hysteresis=0, castle=None):
+        """Move every unit and find the nearest enemies in attack range of those that need a target;
+        returns the new (x, y, is_moving, combat_flash) columns as lists in unit order"""
+        start_time = time.perf_counter()
+        count = len(units)
+        if count > self.capacity:
+            self._allocate(max(count, self.capacity * 2, 1024))
+        views = self.views
+        self.units = list(units)
+        self.slots = {unit: slot for slot, unit in enumerate(self.units)}
+        if count:
+            inputs = views['inputs']
+            for row, getter in enumerate(_GETTERS):
+                inputs[row, :count] = np.fromiter(map(getter, units), dtype=np.float64, count=count)
+            views['owner'][:count] = np.fromiter((OWNER_CODES[unit.owner] for unit in units), dtype=np.int64, count=count)
+            views['unit_id'][:count] = np.fromiter((unit.unit_id for unit in units), dtype=np.int64, count=count)
+            slots = self.slots
+            views['lock'][:count] = np.fromiter((slots.get(unit.target_enemy, -1) for unit in units), dtype=np.int64,
+                                                count=count)
+            inputs = views['inputs'][:, :count]
+            views['order'][:count] = np.argsort(inputs[X], kind='stable')
+            
+            # Far enough for a searcher and a target to both move a step toward each other
+            margin = inputs[RANGE].max() + inputs[SIZE].max() + 2 * (inputs[SPEED].max() * dt + 2)
+            regions = self.regions if self.executor is not None and count >= PARALLEL_MIN_UNITS else 1
+            futures = [self.executor.submit(_step_region, self.shm.name, self.capacity, count, region, regions, dt, margin,
+                                            hysteresis, castle)
+                       for region in range(1, regions)]
+            _step_region(self.shm.name, self.capacity, count, 0, regions, dt, margin, hysteresis, castle, views)
+            for future in futures:
+                future.result()
+        self.valid = True
+        self.last_ms = (time.perf_counter() - start_time) * 1000.0
+        if not count:
+            return [[], [], [], []]
+        return [column.tolist() for column in views['outputs'][:, :count]]
+    
+    def nearest_hostile(self, unit):
+        """The nearest live enemy in attack range found by the last step, None if there is none,
+        or UNKNOWN if the last step cannot tell (the unit is new, or every enemy it kept has died)"""
+        if not self.valid:
+            return UNKNOWN
+        slot = self.slots.get(unit)
+        if slot is None:
+            return UNKNOWN
+        nearest = self.views['nearest']
+        for rank in range(NEAREST_KEPT):
+            index = int(nearest[rank, slot])
+            if index == NOT_SEARCHED:
+                return UNKNOWN
+            if index < 0:
+                return None  # Every enemy that was in range is dead
+            target = self.units[index]
+            if target.health > 0:
+                return target
+        return UNKNOWN
+    
+    def _allocate(self, capacity):
+        self._release_block()
+        self.shm = shared_memory.SharedMemory(create=True, size=_block_size(capacity))
+        self.views = _views(self.shm.buf, capacity)
+        self.capacity = capacity
+    
+    def _release_block(self):
+        if self.shm is not None:
+            self.views = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+    
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        self._release_block()
+        self.units = []
+        self.slots = {}
+        self.valid = False
\ No newline at end of file
@@ -1,5 +1,7 @@
 import pygame
 import random
+from ..ui.sprite_cache import sprite_cache
+from ..world.spatial_grid import SpatialGrid
 
 class Resource:
     def __init__(self, x, y, resource_type, amount=None):
@@ -39,19 +41,25 @@ class Resource:
     def render(self, screen, camera):
         if self.amount > 0 and camera.is_visible(self.x, self.y, self.size, self.size):
             screen_x, screen_y = camera.world_to_screen(self.x, self.y)
+            size = max(2, int(self.size * camera.zoom))
             
-            # Draw resource
-            pygame.draw.circle(screen, self.color, 
-                             (screen_x + self.size // 2, screen_y + self.size // 2), 
-                             self.size // 2)
+            # Draw resource (sprite pre-rendered once per type and zoom step)
+            sprite = sprite_cache.get_mip(('resource', self.resource_type, self.size), camera.zoom, self._build_sprite)
+            screen.blit(sprite, (screen_x, screen_y))
             
-            # Draw amount indicator
-            if self.amount < self.max_amount:
+            # Draw amount indicator (unreadable when zoomed out)
+            if self.amount < self.max_amount and camera.zoom >= 1.0:
                 font = pygame.font.Font(None, 16)
                 amount_text = font.render(str(int(self.amount)), True, (255, 255, 255))
-                text_rect = amount_text.get_rect(center=(screen_x + self.size // 2, screen_y + self.size // 2))
+                text_rect = amount_text.get_rect(center=(screen_x + size // 2, screen_y + size // 2))
                 screen.blit(amount_text, text_rect)
     
+    def _build_sprite(self, zoom):
+        size = max(2, int(self.size * zoom))
+        sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, self.color, (size // 2, size // 2), size // 2)
+        return sprite
+    
     def get_bounds(self):
         return pygame.Rect(self.x, self.y, self.size, self.size)
     
@@ -65,8 +73,22 @@ class ResourceManager:
     def __init__(self, game_map):
         self.game_map = game_map
         self.resources = []
+        self.grid = SpatialGrid(128)  # Resources by position, for picking and the nearest free one
+        self.spawn_resources()
+    
+    def reset(self):
+        """Replace all resources with a fresh random set"""
+        self.clear()
         self.spawn_resources()
     
+    def clear(self):
+        self.resources.clear()
+        self.grid.clear()
+    
+    def add(self, resource):
+        self.resources.append(resource)
+        self.grid.insert(resource, resource.x, resource.y)
+    
     def spawn_resources(self):
         # Spawn resources randomly on the map
         for _ in range(100):  # Spawn 100 resources
@@ -76,7 +98,7 @@ class ResourceManager:
             # Check if location is valid (not water or mountain)
             if self.game_map.is_walkable(x, y):
                 resource_type = random.choice(['gold', 'wood', 'stone', 'food'])
-                self.resources.append(Resource(x, y, resource_type))
+                self.add(Resource(x, y, resource_type))
     
     def update(self, dt):
         # Update all resources
@@ -85,17 +107,42 @@ class ResourceManager:
             # Remove depleted non-regenerating resources
             if resource.is_depleted() and not resource.can_regenerate:
                 self.resources.remove(resource)
+                self.grid.remove(resource)
     
     def render(self, screen, camera):
         for resource in self.resources:
             resource.render(screen, camera)
     
     def get_resource_at(self, world_x, world_y):
-        for resource in self.resources:
+        # Resources are filed by their top-left corner, so look up to one size back
+        for resource in self.grid.query_rect(world_x - 32, world_y - 32, 32, 32):
             if resource.contains_point(world_x, world_y) and not resource.is_depleted():
                 return resource
         return None
     
+    def nearest(self, x, y, accept):
+        """Closest resource to (x, y) that accept(resource) allows, or None (ties go to the top-left one).
+        
+        Searches the grid in widening circles, so a nearby answer only looks at a few cells.
+        """
+        radius = self.grid.cell_size
+        limit = self.game_map.world_width + self.game_map.world_height
+        while True:
+            best = None
+            best_key = None
+            for resource in self.grid.query_radius(x, y, radius):
+                dx = resource.x - x
+                dy = resource.y - y
+                distance = dx * dx + dy * dy
+                if distance <= radius * radius:
+                    key = (distance, resource.x, resource.y)
+                    if (best_key is None or key < best_key) and accept(resource):
+                        best = resource
+                        best_key = key
+            if best is not None or radius >= limit:
+                return best
+            radius *= 2
+    
     def harvest_resource_at(self, world_x, world_y, harvester):
         resource = self.get_resource_at(world_x, world_y)
         if resource:
@@ -0,0 +1,95 @@
+import math
+from operator import attrgetter
+
+SLOT_SLACK = 8       # A member re-forms once it is headed this far from its slot
+SLOT_SPACING = 44    # Gap between slots of a commanded squad (wider than the units push apart at)
+
+# Formation slots around the leader, front row first
+BATTALION_SLOTS = ((-30, -30), (30, -30), (-60, 0), (60, 0), (-30, 30), (30, 30))
+DRAGOON_SLOTS = ((-40, -40), (40, -40), (-80, 0), (80, 0), (-40, 40), (40, 40))
+
+class Squad:
+    """A group that moves and fights as one: battalions, dragoons and commanded units.
+    
+    Only the leader runs the unit AI (target search and pathing). Each member
+    holds a formation slot, an offset from where the leader is headed, and
+    joins the leader's fight once it locks onto something; keeping a slot is a
+    distance check, not a search. Members still attack whatever they are locked
+    onto through UnitManager.combat_target.
+    """
+    
+    def __init__(self, leader):
+        self.leader = leader
+        self.members = []
+        self.offsets = {}  # member -> (dx, dy) from the leader's destination
+        leader.squad = self
+    
+    def add(self, unit, offset_x, offset_y):
+        if unit.squad is not None:
+            unit.squad.remove(unit)
+        unit.squad = self
+        self.members.append(unit)
+        self.offsets[unit] = (offset_x, offset_y)
+    
+    def remove(self, unit):
+        """Take a unit out (it left play or was ordered on its own); the oldest member takes over a lost leader"""
+        if unit.squad is not self:
+            return
+        unit.squad = None
+        if unit is self.leader:
+            if not self.members:
+                return
+            leader = min(self.members, key=attrgetter('unit_id'))
+            shift_x, shift_y = self.offsets.pop(leader)
+            self.members.remove(leader)
+            self.leader = leader
+            # Slots stay where they were around the old leader's spot
+            for member, (offset_x, offset_y) in self.offsets.items():
+                self.offsets[member] = (offset_x - shift_x, offset_y - shift_y)
+        else:
+            self.members.remove(unit)
+            del self.offsets[unit]
+        if not self.members:
+            self.leader.squad = None  # A squad of one is just a unit
+    
+    def disband(self):
+        for member in self.members:
+            member.squad = None
+        self.members.clear()
+        self.offsets.clear()
+        self.leader.squad = None
+    
+    def focus(self, member):
+        """What a member should close in on: its own lock, else the leader's (None: keep the slot)"""
+        for target in (member.target_enemy, self.leader.target_enemy):
+            if target is not None and target.health > 0:
+                return target
+        return None
+    
+    def keep_slot(self, member):
+        """Send a member to its slot if it is not already there or on the way"""
+        leader = self.leader
+        if leader.is_moving:
+            anchor_x, anchor_y = leader.target_x, leader.target_y
+        else:
+            anchor_x, anchor_y = leader.x, leader.y
+        offset_x, offset_y = self.offsets[member]
+        slot_x = anchor_x + offset_x
+        slot_y = anchor_y + offset_y
+        if member.is_moving:
+            dx = slot_x - member.target_x
+            dy = slot_y - member.target_y
+        else:
+            dx = slot_x - member.x
+            dy = slot_y - member.y
+        if math.sqrt(dx * dx + dy * dy) > SLOT_SLACK:
+            member.move_to(slot_x, slot_y)
+
+def formation_offsets(count, spacing=SLOT_SPACING):
+    """Slots for count members in rows under the leader, as square a block as possible"""
+    columns = max(1, math.ceil(math.sqrt(count)))
+    offsets = []
+    for index in range(count):
+        row, column = divmod(index, columns)
+        offsets.append(((column - (columns - 1) / 2) * spacing, (row + 1) * spacing))
+    return offsets
\ No newline at end of file
@@ -0,0 +1,131 @@
+import math
+import numpy as np
+from operator import attrgetter
+
+SEPARATION_SHARE = 0.4  # Two units push apart while their centers are closer than this share of their summed sizes
+MOVING_PUSH = 0.8       # Strongest push per tick, as a share of the unit's own step
+IDLE_PUSH = 0.4         # Same for idle units with nothing to fight, so parked groups spread out
+ARRIVAL_RADIUS = 60     # Pushes on a moving unit fade out over the last stretch, so it still reaches its slot
+GOLDEN_ANGLE = math.pi * (3 - math.sqrt(5))  # Direction for units exactly on top of each other
+
+_X = attrgetter('x')
+_Y = attrgetter('y')
+_SIZE = attrgetter('size')
+_SPEED = attrgetter('speed')
+_HEALTH = attrgetter('health')
+_MOVING = attrgetter('is_moving')
+_TARGET_X = attrgetter('target_x')
+_TARGET_Y = attrgetter('target_y')
+_UNIT_ID = attrgetter('unit_id')
+
+class Steering:
+    """Local avoidance: units push apart from the neighbors they overlap.
+    
+    Moving units are steered away from whoever they overlap on the way, with
+    the push fading out near their destination (arrival), and idle units that
+    are not locked onto a target slowly spread out. Neighbors come from a
+    spatial hash built with NumPy each tick (units sorted by cell, a 3x3 block
+    of cells per unit), so the pass is vectorized and linear in the number of
+    units instead of checking every pair.
+    """
+    
+    def __init__(self):
+        self.pushed = 0  # Units moved apart in the last update (for stats)
+    
+    def update(self, dt, units, grid):
+        """Push overlapping units apart; grid is kept in sync with the moved ones"""
+        self.pushed = 0
+        count = len(units)
+        if count < 2:
+            return
+        moving = np.fromiter(map(_MOVING, units), dtype=bool, count=count)
+        alive = np.fromiter(map(_HEALTH, units), dtype=np.float64, count=count) > 0
+        free = np.fromiter((unit.target_enemy is None for unit in units), dtype=bool, count=count)
+        steered = alive & (moving | free)
+        if not steered.any():
+            return
+        
+        x = np.fromiter(map(_X, units), dtype=np.float64, count=count)
+        y = np.fromiter(map(_Y, units), dtype=np.float64, count=count)
+        size = np.fromiter(map(_SIZE, units), dtype=np.float64, count=count)
+        center_x = x + size / 2
+        center_y = y + size / 2
+        
+        # Spatial hash of the live units: sorted by cell, one cell as wide as the widest push
+        cell_size = size.max() * 2 * SEPARATION_SHARE
+        others = np.flatnonzero(alive)
+        cell_x = np.floor(center_x / cell_size).astype(np.int64)
+        cell_y = np.floor(center_y / cell_size).astype(np.int64)
+        keys = _cell_key(cell_x[others], cell_y[others])
+        by_cell = np.argsort(keys, kind='stable')
+        keys = keys[by_cell]
+        others = others[by_cell]
+        
+        # Each steered unit looks at three columns of three cells around its own
+        seekers = np.flatnonzero(steered)
+        column_seeker = np.repeat(seekers, 3)
+        column = cell_x[column_seeker] + np.tile(np.arange(-1, 2), len(seekers))
+        lows = np.searchsorted(keys, _cell_key(column, cell_y[column_seeker] - 1), 'left')
+        lengths = np.searchsorted(keys, _cell_key(column, cell_y[column_seeker] + 1), 'right') - lows
+        pair_seeker = np.repeat(column_seeker, lengths)
+        pair_other = others[np.repeat(lows, lengths) + _spans(lengths)]
+        apart = pair_seeker != pair_other
+        pair_seeker = pair_seeker[apart]
+        pair_other = pair_other[apart]
+        
+        gap_x = center_x[pair_seeker] - center_x[pair_other]
+        gap_y = center_y[pair_seeker] - center_y[pair_other]
+        distance = np.sqrt(gap_x * gap_x + gap_y * gap_y)
+        reach = (size[pair_seeker] + size[pair_other]) * SEPARATION_SHARE
+        close = distance < reach
+        if not close.any():
+            return
+        pair_seeker = pair_seeker[close]
+        gap_x = gap_x[close]
+        gap_y = gap_y[close]
+        distance = distance[close]
+        overlap = 1.0 - distance / reach[close]
+        
+        # Stacked exactly: split along an angle both units agree on, in opposite directions
+        stacked = distance == 0
+        if stacked.any():
+            ids = np.fromiter(map(_UNIT_ID, units), dtype=np.int64, count=count)
+            first = ids[pair_seeker[stacked]]
+            second = ids[pair_other[close][stacked]]
+            angle = np.minimum(first, second) * GOLDEN_ANGLE + np.where(first < second, 0.0, math.pi)
+            gap_x[stacked] = np.cos(angle)
+            gap_y[stacked] = np.sin(angle)
+            distance[stacked] = 1.0
+        
+        push_x = np.bincount(pair_seeker, weights=gap_x / distance * overlap, minlength=count)
+        push_y = np.bincount(pair_seeker, weights=gap_y / distance * overlap, minlength=count)
+        length = np.sqrt(push_x * push_x + push_y * push_y)
+        pushed = np.flatnonzero(length > 0)
+        
+        # At most a share of the unit's own step per tick; moving units ease off near their destination
+        speed = np.fromiter(map(_SPEED, units), dtype=np.float64, count=count)[pushed]
+        share = np.where(moving[pushed], MOVING_PUSH, IDLE_PUSH)
+        walkers = np.flatnonzero(moving[pushed])
+        if len(walkers):
+            walking = [units[index] for index in pushed[walkers].tolist()]
+            left_x = np.fromiter(map(_TARGET_X, walking), dtype=np.float64, count=len(walking)) - x[pushed[walkers]]
+            left_y = np.fromiter(map(_TARGET_Y, walking), dtype=np.float64, count=len(walking)) - y[pushed[walkers]]
+            share[walkers] *= np.minimum(np.sqrt(left_x * left_x + left_y * left_y) / ARRIVAL_RADIUS, 1.0)
+        step = speed * dt * share / np.maximum(length[pushed], 1.0)
+        new_x = x[pushed] + push_x[pushed] * step
+        new_y = y[pushed] + push_y[pushed] * step
+        
+        for index, unit_x, unit_y in zip(pushed.tolist(), new_x.tolist(), new_y.tolist()):
+            unit = units[index]
+            unit.x = unit_x
+            unit.y = unit_y
+            grid.move(unit, unit_x, unit_y)
+        self.pushed = len(pushed)
+
+def _cell_key(column, row):
+    """Sort key of a hash cell; the cells of a column are consecutive keys"""
+    return ((column + (1 << 20)) << 28) + row + (1 << 20)
+
+def _spans(lengths):
+    """0..n-1 for every n in lengths, concatenated"""
+    return np.arange(int(lengths.sum())) - np.repeat(np.cumsum(lengths) - lengths, lengths)
\ No newline at end of file
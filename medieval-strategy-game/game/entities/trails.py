@@ -0,0 +1,96 @@
+import numpy as np
+
+TRAIL_LENGTH = 5              # Positions kept per trail
+TRAIL_SAMPLE_INTERVAL = 0.05  # Seconds between samples (20 Hz)
+
+class TrailBuffer:
+    """Movement trails for every moving unit, kept in one ring-buffer array.
+    
+    A unit only owns a slot while it is moving; stopping, dying or leaving play
+    hands the slot back, so idle units cost no trail memory at all. Positions
+    are sampled for all moving units at once at a fixed rate instead of every
+    frame.
+    """
+    
+    def __init__(self, length=TRAIL_LENGTH, sample_interval=TRAIL_SAMPLE_INTERVAL, capacity=64):
+        self.length = length
+        self.sample_interval = sample_interval
+        self.sample_timer = 0.0
+        
+        self.points = np.zeros((capacity, length, 2), dtype=np.float32)  # world positions
+        self.heads = np.zeros(capacity, dtype=np.int32)   # next write index per slot
+        self.counts = np.zeros(capacity, dtype=np.int32)  # samples stored per slot
+        self.offsets = np.zeros(capacity, dtype=np.float32)  # half the unit size (trail follows the center)
+        
+        self.slots = {}  # unit -> slot
+        self.colors = [None] * capacity  # slot -> unit color, for the renderer
+        self.free_slots = list(range(capacity - 1, -1, -1))
+    
+    def update(self, dt, units):
+        self.sample_timer += dt
+        if self.sample_timer < self.sample_interval:
+            return
+        self.sample_timer = 0.0
+        
+        moving = [unit for unit in units if unit.is_moving and unit.health > 0]
+        
+        # Units that stopped give their slot back (even when as many others just started)
+        if self.slots:
+            moving_set = set(moving)
+            for unit in [unit for unit in self.slots if unit not in moving_set]:
+                self.release(unit)
+        
+        if not moving:
+            return
+        slots = np.fromiter((self._slot_for(unit) for unit in moving), dtype=np.int32, count=len(moving))
+        heads = self.heads[slots]
+        self.points[slots, heads, 0] = np.fromiter((unit.x for unit in moving), dtype=np.float32, count=len(moving))
+        self.points[slots, heads, 1] = np.fromiter((unit.y for unit in moving), dtype=np.float32, count=len(moving))
+        self.heads[slots] = (heads + 1) % self.length
+        self.counts[slots] = np.minimum(self.counts[slots] + 1, self.length)
+    
+    def release(self, unit):
+        slot = self.slots.pop(unit, None)
+        if slot is not None:
+            self.counts[slot] = 0
+            self.heads[slot] = 0
+            self.colors[slot] = None
+            self.free_slots.append(slot)
+    
+    def clear(self):
+        for unit in list(self.slots):
+            self.release(unit)
+        self.sample_timer = 0.0
+    
+    def active_trails(self):
+        """(points, valid mask, center offsets, colors) for every trail with two or more samples"""
+        if not self.slots:
+            return None
+        slots = np.fromiter(self.slots.values(), dtype=np.int32, count=len(self.slots))
+        slots = slots[self.counts[slots] > 1]
+        if not len(slots):
+            return None
+        valid = np.arange(self.length)[None, :] < self.counts[slots][:, None]
+        colors = [self.colors[slot] for slot in slots.tolist()]
+        return self.points[slots], valid, self.offsets[slots], colors
+    
+    def _slot_for(self, unit):
+        slot = self.slots.get(unit)
+        if slot is None:
+            if not self.free_slots:
+                self._grow()
+            slot = self.free_slots.pop()
+            self.slots[unit] = slot
+            self.colors[slot] = unit.colors
+            self.offsets[slot] = unit.size / 2
+        return slot
+    
+    def _grow(self):
+        """Double the number of slots"""
+        capacity = len(self.heads)
+        self.points = np.concatenate([self.points, np.zeros_like(self.points)])
+        self.heads = np.concatenate([self.heads, np.zeros_like(self.heads)])
+        self.counts = np.concatenate([self.counts, np.zeros_like(self.counts)])
+        self.offsets = np.concatenate([self.offsets, np.zeros_like(self.offsets)])
+        self.colors.extend([None] * capacity)
+        self.free_slots.extend(range(capacity * 2 - 1, capacity - 1, -1))
\ No newline at end of file
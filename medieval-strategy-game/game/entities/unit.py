@@ -1,10 +1,182 @@
 import pygame
+import gc
 import math
 import random
-import os
+from operator import attrgetter
+from ..ui.sprite_cache import sprite_cache, scale_surface
+from ..ui.unit_renderer import UnitRenderer
+from ..ui.projectile_renderer import ProjectileRenderer
+from ..world.spatial_grid import SpatialGrid
+from ..world.fog import FogOfWar, sight_radius
+from .trails import TrailBuffer
+from .projectiles import ProjectileSystem
+from .area_damage import AreaDamage
+from .ai_scheduler import AIScheduler
+from .regions import RegionSimulator, UNKNOWN
+from .steering import Steering
+from .dormancy import Dormancy
+from .unit_index import UnitIndex
+from .influence import InfluenceMap
+from .economy import Economy
+from .squad import Squad, BATTALION_SLOTS, DRAGOON_SLOTS, formation_offsets
+
+# Units keep attacking a locked target until it is this much beyond their range
+TARGET_HYSTERESIS = 40
+
+# Base stats for each unit type (shared, never mutated). Ranged types name the
+# projectile they fire; their damage lands when it arrives (see projectiles.py)
+UNIT_STATS = {
+    'peasant': {
+        'max_health': 60,
+        'speed': 100,
+        'attack_damage': 25,
+        'attack_range': 20,
+        'cost': {'gold': 10, 'food': 5}
+    },
+    'knight': {
+        'max_health': 130,
+        'speed':45,
+        'attack_damage': 55,
+        'attack_range': 20,
+        'cost': {'gold': 40, 'food': 20, 'stone': 10}
+    },
+    'archer': {
+        'max_health': 60,
+        'speed': 70,
+        'attack_damage': 40,
+        'attack_range': 100,
+        'projectile': 'arrow',
+        'cost': {'gold': 30, 'food': 15, 'wood': 10}
+    },
+    'cavalry': {
+        'max_health': 150, #150
+        'speed': 180,
+        'attack_damage': 80, #80
+        'attack_range': 30,
+        'cost': {'gold': 0, 'food': 0, 'stone': 0}
+    },
+    'catapult': {
+        'max_health': 250,
+        'speed': 30,
+        'attack_damage': 60,
+        'attack_range': 200,
+        'projectile': 'stone',
+        'cost': {'gold': 100, 'food': 30, 'wood': 40, 'stone': 20}
+    },
+    'musket': {
+        'max_health': 60,
+        'speed': 60,
+        'attack_damage': 50,
+        'attack_range': 300,
+        'projectile': 'bullet',
+        'cost': {'gold': 30, 'food': 25, 'wood': 15, 'stone': 10}
+    },
+    'cannon': {
+        'max_health': 200,
+        'speed': 25,
+        'attack_damage': 200,
+        'attack_range': 175,
+        'projectile': 'cannonball',
+        'cost': {'gold': 80, 'food': 30, 'wood': 34, 'stone': 25}
+    },
+    'battalion': {
+        'max_health': 125,  #  150 to high Battalion commander health
+        'speed': 80,
+        'attack_damage': 45, #60 to high,
+        'attack_range': 35,
+        'cost': {'gold': 0, 'food': 0, 'wood': 0, 'stone': 0}
+    },
+    'dragoons': {
+        'max_health': 80,  # Dragoon commander health
+        'speed': 180,
+        'attack_damage': 15,
+        'attack_range': 35,
+        'cost': {'gold': 100, 'food': 40, 'wood': 0, 'stone': 0}
+    },
+    'commander': {
+        'max_health': 120,  # Commander health
+        'speed': 180,
+        'attack_damage': 150,
+        'attack_range': 25,
+        'cost': {'gold': 80, 'food': 20, 'wood': 5, 'stone': 5}
+    },
+    'giant': {
+        'max_health': 300,  # Giant health - very high
+        'speed': 40,         # Very slow
+        'attack_damage': 150, # Massive damage
+        'attack_range': 20,   # Good reach
+        'cost': {'gold': 100, 'food': 50, 'wood': 0, 'stone': 15}
+    }
+}
+
+# Base colors for each unit type
+UNIT_COLORS = {
+    'peasant': {
+        'player': (100, 150, 255),    # Light blue
+        'enemy': (255, 150, 100),     # Light red/orange
+        'neutral': (150, 150, 150)   # Gray
+    },
+    'knight': {
+        'player': (50, 100, 200),     # Dark blue
+        'enemy': (200, 100, 50),      # Dark red
+        'neutral': (100, 100, 100)   # Dark gray
+    },
+    'archer': {
+        'player': (100, 255, 100),    # Green
+        'enemy': (255, 100, 255),     # Magenta
+        'neutral': (150, 200, 150)   # Light gray-green
+    },
+    'cavalry': {
+        'player': (150, 100, 255),    # Purple
+        'enemy': (255, 100, 150),     # Pink
+        'neutral': (175, 125, 175)   # Light purple-gray
+    },
+    'catapult': {
+        'player': (200, 200, 100),    # Yellow
+        'enemy': (200, 100, 200),     # Purple
+        'neutral': (150, 150, 100)   # Brown-gray
+    },
+    'musket': {
+        'player': (128, 128, 128),    # Gray
+        'enemy': (169, 169, 169),     # Dark gray
+        'neutral': (105, 105, 105)   # Dim gray
+    },
+    'cannon': {
+        'player': (60, 60, 60),       # Dark gray
+        'enemy': (80, 80, 80),        # Darker gray
+        'neutral': (50, 50, 50)       # Very dark gray
+    },
+    'battalion': {
+        'player': (255, 215, 0),      # Gold
+        'enemy': (255, 140, 0),       # Dark orange
+        'neutral': (218, 165, 32)     # Golden rod
+    },
+    'dragoons': {
+        'player': (138, 43, 226),     # Blue violet
+        'enemy': (148, 0, 211),       # Dark violet
+        'neutral': (186, 85, 211)     # Medium orchid
+    },
+    'commander': {
+        'player': (255, 215, 0),      # Gold
+        'enemy': (255, 140, 0),       # Dark orange
+        'neutral': (218, 165, 32)     # Golden rod
+    },
+    'giant': {
+        'player': (139, 69, 19),      # Brown
+        'enemy': (160, 82, 45),       # Saddle brown
+        'neutral': (205, 133, 63)     # Peru
+    }
+}
+
 
 class Unit:
     def __init__(self, x, y, unit_type, owner="player", upgrade_bonus=1.0):
+        # Lists are created once; reset() clears them so pooled units can be reused
+        self.targeted_by = []  # Units whose target_enemy is this unit
+        self.reset(x, y, unit_type, owner, upgrade_bonus)
+    
+    def reset(self, x, y, unit_type, owner="player", upgrade_bonus=1.0):
+        """Set up every field for a fresh unit (used by __init__ and UnitPool)"""
         self.x = x
         self.y = y
         self.unit_type = unit_type
@@ -41,16 +213,21 @@ class Unit:
         self.target_x = x
         self.target_y = y
         self.is_moving = False
-        self.target_enemy = None
+        self.target_enemy = None  # Locked combat target (unit or castle), see set_target
+        self.targeted_by.clear()
+        self.ai_scheduler = None  # Set by UnitManager.add_unit; taking damage wakes the unit's AI
+        self.dormancy = None  # Set by UnitManager.add_unit; orders and damage wake a sleeping unit
+        self.unit_index = None  # Set by UnitManager.add_unit; a unit leaves the live indexes when it dies
+        self.asleep = False
         self.last_attack_time = 0
         self.attack_cooldown = 1  # 1 second between attacks
+        self.cooling = False  # Set by attack(); the match's cooldown-ready event clears it
         
         # Selection
         self.selected = False
         
         # Visual effects
-        self.combat_flash = 0
-        self.movement_trail = []
+        self.combat_flash = 0  # Movement trails live in UnitManager.trails
         
         # Colors based on unit type and owner
         self.colors = self._get_unit_colors(unit_type, owner)
@@ -61,11 +238,14 @@ class Unit:
         
         # Special battalion properties
         self.is_battalion = (unit_type == 'battalion')
-        self.spawned_knights = []  # Track spawned knights for battalions
+        self.is_elite = False  # Knight spawned by a battalion
         
         # Special dragoons properties
         self.is_dragoons = (unit_type == 'dragoons')
-        self.spawned_cavalry = []  # Track spawned cavalry for dragoons
+        self.is_dragoon_cavalry = False  # Cavalry spawned by dragoons
+        
+        # Squad this unit leads or belongs to (battalions, dragoons, commanded units)
+        self.squad = None
         
         # Special commander properties
         self.is_commander = (unit_type == 'commander')
@@ -73,164 +253,27 @@ class Unit:
         self.command_target = None  # Target enemy castle for leading attack
     
     def _get_unit_stats(self, unit_type):
-        stats = {
-            'peasant': {
-                'max_health': 60,
-                'speed': 100,
-                'attack_damage': 25,
-                'attack_range': 20,
-                'cost': {'gold': 10, 'food': 5}
-            },
-            'knight': {
-                'max_health': 130,
-                'speed':45,
-                'attack_damage': 55,
-                'attack_range': 20,
-                'cost': {'gold': 40, 'food': 20, 'stone': 10}
-            },
-            'archer': {
-                'max_health': 60,
-                'speed': 70,
-                'attack_damage': 40,
-                'attack_range': 100,
-                'cost': {'gold': 30, 'food': 15, 'wood': 10}
-            },
-            'cavalry': {
-                'max_health': 150, #150
-                'speed': 180,
-                'attack_damage': 80, #80
-                'attack_range': 30,
-                'cost': {'gold': 0, 'food': 0, 'stone': 0}
-            },
-            'catapult': {
-                'max_health': 250,
-                'speed': 30,
-                'attack_damage': 60,
-                'attack_range': 200,
-                'cost': {'gold': 100, 'food': 30, 'wood': 40, 'stone': 20}
-            },
-            'musket': {
-                'max_health': 60,
-                'speed': 60,
-                'attack_damage': 50,
-                'attack_range': 300,
-                'cost': {'gold': 30, 'food': 25, 'wood': 15, 'stone': 10}
-            },
-            'cannon': {
-                'max_health': 200,
-                'speed': 25,
-                'attack_damage': 200,
-                'attack_range': 175,
-                'cost': {'gold': 80, 'food': 30, 'wood': 34, 'stone': 25}
-            },
-            'battalion': {
-                'max_health': 125,  #  150 to high Battalion commander health
-                'speed': 80,
-                'attack_damage': 45, #60 to high,
-                'attack_range': 35,
-                'cost': {'gold': 0, 'food': 0, 'wood': 0, 'stone': 0}
-            },
-            'dragoons': {
-                'max_health': 80,  # Dragoon commander health
-                'speed': 180,
-                'attack_damage': 15,
-                'attack_range': 35,
-                'cost': {'gold': 100, 'food': 40, 'wood': 0, 'stone': 0}
-            },
-            'commander': {
-                'max_health': 120,  # Commander health
-                'speed': 180,
-                'attack_damage': 150,
-                'attack_range': 25,
-                'cost': {'gold': 80, 'food': 20, 'wood': 5, 'stone': 5}
-            },
-            'giant': {
-                'max_health': 300,  # Giant health - very high
-                'speed': 40,         # Very slow
-                'attack_damage': 150, # Massive damage
-                'attack_range': 20,   # Good reach
-                'cost': {'gold': 100, 'food': 50, 'wood': 0, 'stone': 15}
-            }
-        }
-        return stats.get(unit_type, stats['peasant'])
+        return UNIT_STATS.get(unit_type, UNIT_STATS['peasant'])
     
     def _get_unit_colors(self, unit_type, owner):
-        # Base colors for each unit type
-        type_colors = {
-            'peasant': {
-                'player': (100, 150, 255),    # Light blue
-                'enemy': (255, 150, 100),     # Light red/orange
-                'neutral': (150, 150, 150)   # Gray
-            },
-            'knight': {
-                'player': (50, 100, 200),     # Dark blue
-                'enemy': (200, 100, 50),      # Dark red
-                'neutral': (100, 100, 100)   # Dark gray
-            },
-            'archer': {
-                'player': (100, 255, 100),    # Green
-                'enemy': (255, 100, 255),     # Magenta
-                'neutral': (150, 200, 150)   # Light gray-green
-            },
-            'cavalry': {
-                'player': (150, 100, 255),    # Purple
-                'enemy': (255, 100, 150),     # Pink
-                'neutral': (175, 125, 175)   # Light purple-gray
-            },
-            'catapult': {
-                'player': (200, 200, 100),    # Yellow
-                'enemy': (200, 100, 200),     # Purple
-                'neutral': (150, 150, 100)   # Brown-gray
-            },
-            'musket': {
-                'player': (128, 128, 128),    # Gray
-                'enemy': (169, 169, 169),     # Dark gray
-                'neutral': (105, 105, 105)   # Dim gray
-            },
-            'cannon': {
-                'player': (60, 60, 60),       # Dark gray
-                'enemy': (80, 80, 80),        # Darker gray
-                'neutral': (50, 50, 50)       # Very dark gray
-            },
-            'battalion': {
-                'player': (255, 215, 0),      # Gold
-                'enemy': (255, 140, 0),       # Dark orange
-                'neutral': (218, 165, 32)     # Golden rod
-            },
-            'dragoons': {
-                'player': (138, 43, 226),     # Blue violet
-                'enemy': (148, 0, 211),       # Dark violet
-                'neutral': (186, 85, 211)     # Medium orchid
-            },
-            'commander': {
-                'player': (255, 215, 0),      # Gold
-                'enemy': (255, 140, 0),       # Dark orange
-                'neutral': (218, 165, 32)     # Golden rod
-            },
-            'giant': {
-                'player': (139, 69, 19),      # Brown
-                'enemy': (160, 82, 45),       # Saddle brown
-                'neutral': (205, 133, 63)     # Peru
-            }
-        }
-        
-        return type_colors.get(unit_type, type_colors['peasant']).get(owner, (128, 128, 128))
+        return UNIT_COLORS.get(unit_type, UNIT_COLORS['peasant']).get(owner, (128, 128, 128))
     
     def _load_unit_image(self, unit_type):
-        try:
-            # Get the path to the images folder
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            images_dir = os.path.join(current_dir, '..', 'ui', 'images')
-            image_path = os.path.join(images_dir, f"{unit_type}.jpeg")
-            
-            # Load and scale image
-            image = pygame.image.load(image_path)
-            # Scale to unit size (16x16 pixels)
-            scaled_image = pygame.transform.scale(image, (self.size, self.size))
-            return scaled_image
-        except pygame.error:
-            print(f"Could not load image for {unit_type}")
-            return None
+        # Loaded and scaled once per unit type, shared by every unit
+        return sprite_cache.load_image(f"{unit_type}.jpeg", (self.size, self.size))
+    
+    def _get_sprite(self, zoom):
+        """Tinted unit image at a zoom step, built once per type and owner"""
+        def build(zoom):
+            if self.owner == "enemy":
+                tinted_image = self._apply_color_tint(self.image, (255, 150, 150))  # Red tint
+            elif self.owner == "player":
+                tinted_image = self._apply_color_tint(self.image, (150, 150, 255))  # Blue tint
+            else:
+                tinted_image = self.image
+            return scale_surface(tinted_image, zoom)
+        
+        return sprite_cache.get_mip(('unit', self.unit_type, self.owner), zoom, build)
     
     def _apply_color_tint(self, image, tint_color):
         """Apply a color tint to an image while preserving transparency"""
@@ -253,10 +296,14 @@ class Unit:
         self.target_x = target_x
         self.target_y = target_y
         self.is_moving = True
-    
-    def attack(self, target):
-        current_time = pygame.time.get_ticks() / 1000.0
-        if current_time - self.last_attack_time >= self.attack_cooldown:
+        if self.asleep:
+            self.dormancy.wake(self)
+    
+    def attack(self, target, current_time=None, projectiles=None):
+        # Callers running a fixed simulation clock pass it in; otherwise use wall time
+        if current_time is None:
+            current_time = pygame.time.get_ticks() / 1000.0
+        if not self.cooling:
             # Calculate distance to target center
             target_x = target.x
             target_y = target.y
@@ -268,16 +315,47 @@ class Unit:
             
             distance = math.sqrt((self.x - target_x)**2 + (self.y - target_y)**2)
             if distance <= self.attack_range:
-                target.take_damage(self.attack_damage)
+                projectile = self.stats.get('projectile')
+                if projectile and projectiles is not None:
+                    # Shoot at the target's center from ours
+                    target_size = getattr(target, 'size', 0)
+                    projectiles.launch(projectile, self.x + self.size / 2, self.y + self.size / 2, target,
+                                       target.x + target_size / 2, target.y + target_size / 2, self.attack_damage,
+                                       self.owner)
+                else:
+                    target.take_damage(self.attack_damage)
                 self.last_attack_time = current_time
+                self.cooling = True  # Until cooldown_ready, due attack_cooldown from now
                 self.combat_flash = 0.3  # Flash for 0.3 seconds
                 return True
         return False
     
+    def cooldown_ready(self, unit_id):
+        """Scheduled callback: the unit can attack again (unless it was recycled as another unit since)"""
+        if self.unit_id == unit_id:
+            self.cooling = False
+    
+    def set_target(self, target):
+        """Lock onto a combat target (None to drop the lock), keeping the target's back-links in sync"""
+        old_target = self.target_enemy
+        if old_target is target:
+            return
+        if old_target is not None and hasattr(old_target, 'targeted_by'):
+            old_target.targeted_by.remove(self)
+        self.target_enemy = target
+        if target is not None and hasattr(target, 'targeted_by'):
+            target.targeted_by.append(self)
+    
     def take_damage(self, damage):
+        if self.asleep:
+            self.dormancy.wake(self)  # Also when it dies, so the update loop removes it
         self.health -= damage
         if self.health <= 0:
             self.health = 0
+            if self.unit_index is not None:
+                self.unit_index.discard(self)
+        elif self.ai_scheduler is not None:
+            self.ai_scheduler.wake(self)
     
     def is_alive(self):
         return self.health > 0
@@ -292,14 +370,9 @@ class Unit:
         
         # Movement
         if self.is_moving:
-            # Add to movement trail
-            self.movement_trail.append((self.x, self.y))
-            if len(self.movement_trail) > 5:  # Keep last 5 positions
-                self.movement_trail.pop(0)
-            
             dx = self.target_x - self.x
             dy = self.target_y - self.y
-            distance = math.sqrt(dx**2 + dy**2)
+            distance = math.sqrt(dx * dx + dy * dy)  # Not dx**2: the region kernel must match bit for bit
             
             if distance > 2:  # Still moving
                 move_distance = self.speed * dt
@@ -309,10 +382,6 @@ class Unit:
                 self.x = self.target_x
                 self.y = self.target_y
                 self.is_moving = False
-        else:
-            # Clear movement trail when not moving
-            if self.movement_trail:
-                self.movement_trail.clear()
         
         # Combat AI for both player and enemy units
         if not self.is_moving:
@@ -344,128 +413,6 @@ class Unit:
         # For now, return None to avoid errors
         return None
     
-    def render(self, screen, camera):
-        if self.is_alive() and camera.is_visible(self.x, self.y, self.size, self.size):
-            screen_x, screen_y = camera.world_to_screen(self.x, self.y)
-            
-            # Draw movement trail
-            self._draw_movement_trail(screen, camera)
-            
-            # Draw unit shadow
-            self._draw_shadow(screen, screen_x, screen_y)
-            
-            # Draw unit
-            if self.image:
-                # Apply color tint for enemy units
-                if self.owner == "enemy":
-                    tinted_image = self._apply_color_tint(self.image, (255, 150, 150))  # Red tint
-                elif self.owner == "player":
-                    tinted_image = self._apply_color_tint(self.image, (150, 150, 255))  # Blue tint
-                else:
-                    tinted_image = self.image
-                
-                # Apply combat flash effect
-                if self.combat_flash > 0:
-                    flash_surface = pygame.Surface((self.size, self.size), pygame.SRCALPHA)
-                    flash_surface.fill((255, 255, 255, int(self.combat_flash * 255)))
-                    screen.blit(tinted_image, (screen_x, screen_y))
-                    screen.blit(flash_surface, (screen_x, screen_y))
-                else:
-                    screen.blit(tinted_image, (screen_x, screen_y))
-            else:
-                # Fallback to colored circle if image fails to load
-                color = self.colors
-                if self.combat_flash > 0:
-                    # Make brighter during combat flash
-                    color = tuple(min(255, c + int(self.combat_flash * 100)) for c in color)
-                pygame.draw.circle(screen, color, 
-                                 (screen_x + self.size // 2, screen_y + self.size // 2), 
-                                 self.size // 2)
-            
-            # Draw selection indicator with glow effect
-            if self.selected:
-                # Animated selection ring
-                import time
-                pulse = abs(math.sin(time.time() * 3)) * 0.3 + 0.7
-                selection_color = (int(255 * pulse), int(255 * pulse), 0)
-                pygame.draw.circle(screen, selection_color, 
-                                 (screen_x + self.size // 2, screen_y + self.size // 2), 
-                                 self.size // 2 + 4, 3)
-                # Inner glow
-                glow_surface = pygame.Surface((self.size + 16, self.size + 16), pygame.SRCALPHA)
-                pygame.draw.circle(glow_surface, (255, 255, 0, 30), 
-                                 (self.size // 2 + 8, self.size // 2 + 8), self.size // 2 + 8)
-                screen.blit(glow_surface, (screen_x - 8, screen_y - 8))
-            
-            # Draw enhanced health bar
-            if self.health < self.max_health:
-                self._draw_enhanced_health_bar(screen, screen_x, screen_y)
-    
-    def _draw_movement_trail(self, screen, camera):
-        """Draw a trail showing unit movement"""
-        if len(self.movement_trail) > 1:
-            for i, (trail_x, trail_y) in enumerate(self.movement_trail):
-                if camera.is_visible(trail_x, trail_y, 4, 4):
-                    screen_x, screen_y = camera.world_to_screen(trail_x, trail_y)
-                    alpha = int((i / len(self.movement_trail)) * 100)  # Fade trail
-                    trail_color = (*self.colors[:3], alpha) if isinstance(self.colors, tuple) else (100, 100, 100, alpha)
-                    pygame.draw.circle(screen, trail_color[:3], 
-                                     (screen_x + self.size // 2, screen_y + self.size // 2), 
-                                     2)
-    
-    def _draw_shadow(self, screen, screen_x, screen_y):
-        """Draw unit shadow for depth"""
-        shadow_offset_x = 3
-        shadow_offset_y = 3
-        shadow_surface = pygame.Surface((self.size, self.size), pygame.SRCALPHA)
-        
-        # Create shadow shape
-        if self.image:
-            # Shadow based on image shape (simplified as oval)
-            pygame.draw.ellipse(shadow_surface, (0, 0, 0, 60), 
-                              (4, 4, self.size - 8, self.size // 2))
-        else:
-            # Shadow for circle units
-            pygame.draw.circle(shadow_surface, (0, 0, 0, 60), 
-                             (self.size // 2, self.size // 2), self.size // 2 - 2)
-        
-        screen.blit(shadow_surface, (screen_x + shadow_offset_x, screen_y + shadow_offset_y))
-    
-    def _draw_enhanced_health_bar(self, screen, screen_x, screen_y):
-        """Draw enhanced health bar with gradient and border"""
-        bar_width = self.size
-        bar_height = 6
-        bar_y = screen_y - 10
-        
-        # Health bar background with border
-        pygame.draw.rect(screen, (0, 0, 0), (screen_x - 1, bar_y - 1, bar_width + 2, bar_height + 2))
-        pygame.draw.rect(screen, (60, 60, 60), (screen_x, bar_y, bar_width, bar_height))
-        
-        # Health bar fill with gradient effect
-        health_width = int((self.health / self.max_health) * bar_width)
-        if health_width > 0:
-            health_percent = self.health / self.max_health
-            
-            # Color based on health percentage
-            if health_percent > 0.6:
-                start_color = (0, 200, 0)
-                end_color = (0, 255, 0)
-            elif health_percent > 0.3:
-                start_color = (200, 200, 0)
-                end_color = (255, 255, 0)
-            else:
-                start_color = (200, 0, 0)
-                end_color = (255, 0, 0)
-            
-            # Draw gradient health bar
-            for i in range(health_width):
-                progress = i / bar_width if bar_width > 0 else 0
-                r = int(start_color[0] + (end_color[0] - start_color[0]) * progress)
-                g = int(start_color[1] + (end_color[1] - start_color[1]) * progress)
-                b = int(start_color[2] + (end_color[2] - start_color[2]) * progress)
-                pygame.draw.line(screen, (r, g, b), 
-                               (screen_x + i, bar_y), (screen_x + i, bar_y + bar_height - 1))
-    
     def get_bounds(self):
         return pygame.Rect(self.x, self.y, self.size, self.size)
     
@@ -474,97 +421,226 @@ class Unit:
     
     def spawn_battalion_knights(self, unit_manager, upgrade_bonus=1.0):
         """Spawn 6 elite knights around the battalion commander"""
-        if not self.is_battalion or self.spawned_knights:
+        if not self.is_battalion or self.squad is not None:
             return  # Only spawn once and only for battalions
         
-        knight_positions = [
-            (-30, -30), (30, -30),    # Front row
-            (-60, 0), (0, 0), (60, 0), # Middle row
-            (-30, 30)                  # Back row
-        ]
-        
-        for i, (offset_x, offset_y) in enumerate(knight_positions):
+        squad = Squad(self)
+        for offset_x, offset_y in BATTALION_SLOTS:
             knight_x = self.x + offset_x
             knight_y = self.y + offset_y
             
             # Create elite knight with enhanced stats and upgrade bonuses
-            knight = Unit(knight_x, knight_y, 'knight', self.owner, upgrade_bonus)
+            knight = unit_manager.spawn_unit(knight_x, knight_y, 'knight', self.owner, upgrade_bonus)
             knight.health = int(knight.health * 1.5)  # 50% more health
             knight.max_health = int(knight.max_health * 1.5)
             knight.attack_damage = int(knight.attack_damage * 1.3)  # 30% more damage
             knight.speed = int(knight.speed * 1.2)  # 20% faster
             
             # Mark as elite knight
-            knight.is_elite = True
-            knight.battalion_commander = self
-            
-            self.spawned_knights.append(knight)
-            unit_manager.add_unit(knight)
+            unit_manager.index.tag(knight, 'elite')
+            squad.add(knight, offset_x, offset_y)
     
     def spawn_dragoon_cavalry(self, unit_manager, upgrade_bonus=1.0):
         """Spawn 6 cavalry around the dragoon commander"""
-        if not self.is_dragoons or self.spawned_cavalry:
+        if not self.is_dragoons or self.squad is not None:
             return  # Only spawn once and only for dragoons
         
-        cavalry_positions = [
-            (-40, -40), (40, -40),    # Front row
-            (-80, 0), (0, 0), (80, 0), # Middle row
-            (-40, 40)                  # Back row
-        ]
-        
-        for i, (offset_x, offset_y) in enumerate(cavalry_positions):
+        squad = Squad(self)
+        for offset_x, offset_y in DRAGOON_SLOTS:
             cavalry_x = self.x + offset_x
             cavalry_y = self.y + offset_y
             
             # Create cavalry unit with upgrade bonuses
-            cavalry = Unit(cavalry_x, cavalry_y, 'cavalry', self.owner, upgrade_bonus)
+            cavalry = unit_manager.spawn_unit(cavalry_x, cavalry_y, 'cavalry', self.owner, upgrade_bonus)
             
             # Mark as dragoon cavalry
             cavalry.is_dragoon_cavalry = True
-            cavalry.dragoon_commander = self
-            
-            self.spawned_cavalry.append(cavalry)
-            unit_manager.add_unit(cavalry)
+            squad.add(cavalry, offset_x, offset_y)
     
     def start_command_attack(self, target_castle, unit_manager):
-        """Start commanding nearby units to attack target castle"""
+        """Lead the free player units nearby against target castle, as one squad"""
         if not self.is_commander:
             return
-            
+        
+        self.stop_command_attack()
         self.command_mode = True
         self.command_target = target_castle
         
-        # Find all player units within command range and order them to attack
+        # Player units within command range (through the grid, in id order) that are not in a squad yet
         command_range = 300
-        for unit in unit_manager.units:
-            if (unit.owner == "player" and unit != self and 
+        recruits = []
+        for unit in sorted(unit_manager.grid.query_radius(self.x, self.y, command_range), key=attrgetter('unit_id')):
+            if (unit.owner == "player" and unit is not self and unit.squad is None and
                 not unit.is_commander and unit.is_alive()):
-                distance = ((self.x - unit.x)**2 + (self.y - unit.y)**2)**0.5
+                distance = math.sqrt((self.x - unit.x)**2 + (self.y - unit.y)**2)
                 if distance <= command_range:
-                    # Order unit to attack the target castle
-                    castle_center_x = target_castle.x + target_castle.size // 2
-                    castle_center_y = target_castle.y + target_castle.size // 2
-                    unit.move_to(castle_center_x, castle_center_y)
-                    unit.command_target = target_castle
+                    recruits.append(unit)
+        if recruits:
+            squad = Squad(self)
+            for unit, (offset_x, offset_y) in zip(recruits, formation_offsets(len(recruits))):
+                unit.set_target(None)
+                squad.add(unit, offset_x, offset_y)
+        
+        # The commander marches on the castle and the squad forms up on its destination
+        self.set_target(None)
+        self.move_to(target_castle.x + target_castle.size // 2, target_castle.y + target_castle.size // 2)
+        if self.squad is not None:
+            unit_manager.follow_leader(self.squad)
     
     def stop_command_attack(self):
         """Stop commanding units"""
         self.command_mode = False
         self.command_target = None
+        if self.squad is not None and self.squad.leader is self:
+            self.squad.disband()
+
+def _distance_to_center(unit, target):
+    """From a unit to the center of a unit or castle, as Unit.attack measures it"""
+    return math.sqrt((unit.x - (target.x + target.size // 2))**2 + (unit.y - (target.y + target.size // 2))**2)
+
+class UnitPool:
+    """Keeps dead units by type and resets them in place for the next spawn.
+    
+    Reusing a unit reuses its lists and attribute dict, so heavy fighting does
+    not churn allocations (and trigger GC passes) for every spawn and death.
+    """
+    
+    def __init__(self, max_per_type=512):
+        self.max_per_type = max_per_type
+        self.free = {}  # unit_type -> list of released units
+        self.hits = 0
+        self.misses = 0
+    
+    def acquire(self, x, y, unit_type, owner="player", upgrade_bonus=1.0):
+        free = self.free.get(unit_type)
+        if free:
+            self.hits += 1
+            unit = free.pop()
+            unit.reset(x, y, unit_type, owner, upgrade_bonus)
+            return unit
+        self.misses += 1
+        return Unit(x, y, unit_type, owner, upgrade_bonus)
+    
+    def release(self, unit):
+        """Take back a unit that has left play; nothing else may keep using it"""
+        # Leave its squad so the squad does not point at a recycled unit
+        if unit.squad is not None:
+            unit.squad.remove(unit)
+        unit.command_target = None
+        
+        free = self.free.setdefault(unit.unit_type, [])
+        if len(free) < self.max_per_type:
+            free.append(unit)
+    
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+    
+    def stats(self):
+        """Pool counters plus the interpreter's GC collection counts per generation"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hit_rate(),
+            'pooled': sum(len(free) for free in self.free.values()),
+            'gc_collections': tuple(generation['collections'] for generation in gc.get_stats()),
+        }
 
 class UnitManager:
     def __init__(self):
         self.units = []
         self.selected_units = []
-    
-    def add_unit(self, unit):
+        self.next_unit_id = 0  # Stable ids so recorded commands can refer to units
+        self.pool = UnitPool()
+        self.grid = SpatialGrid(128)  # Units by position, for view culling and neighbor queries
+        self.trails = TrailBuffer()  # Movement trails, only for units that are moving
+        self.projectiles = ProjectileSystem()  # Arrows, shot and stones in flight
+        self.area_damage = AreaDamage(self.grid)  # Splash from siege shots and castle bolts
+        self.ai_scheduler = AIScheduler()  # Target re-evaluation, a slice of units per tick
+        self.steering = Steering()  # Overlapping units push apart (neighbors through a NumPy spatial hash)
+        # Idle units with no enemy near sleep; they watch for enemies farther out than anyone
+        # engages (200) or shoots, plus a step, so they are awake before they can be hit
+        watch_radius = max([200] + [stats['attack_range'] for stats in UNIT_STATS.values()]) + 64
+        self.dormancy = Dormancy(self.grid, watch_radius)
+        self.index = UnitIndex()  # Live units by owner, type and flag
+        self.influence = InfluenceMap()  # Strength, threat and value per coarse cell, for the AI
+        self.fog = FogOfWar()  # What the player's units and castle can see
+        self.economy = Economy(self.influence)  # Peasants harvesting and carrying resources home
+        self.regions = None  # RegionSimulator once use_regions() is called: movement and target search on several cores
+        self.renderer = UnitRenderer()
+        self.projectile_renderer = ProjectileRenderer()
+    
+    def spawn_unit(self, x, y, unit_type, owner="player", upgrade_bonus=1.0):
+        """Create a unit (recycled from the pool when possible) and add it"""
+        unit = self.pool.acquire(x, y, unit_type, owner, upgrade_bonus)
+        self.add_unit(unit)
+        self.influence.invalidate()  # The AI should know about it before its next decision
+        return unit
+    
+    def add_unit(self, unit, unit_id=None, watch=True):
+        # unit_id: keep an id given elsewhere (units mirrored from the simulation process)
+        # watch=False: the caller stamps the unit's sight itself (FogOfWar.look_all after a snapshot restore)
+        if unit_id is None:
+            unit_id = self.next_unit_id
+        unit.unit_id = unit_id
+        self.next_unit_id = max(self.next_unit_id, unit_id + 1)
         self.units.append(unit)
+        self.dormancy.add(unit)
+        self.index.add(unit)
+        unit.unit_index = self.index
+        if watch and unit.owner == "player":
+            self.fog.look(unit, unit.x + unit.size / 2, unit.y + unit.size / 2, sight_radius(unit))
+        self.grid.insert(unit, unit.x, unit.y)
+        unit.ai_scheduler = self.ai_scheduler
+        if self.regions is not None:
+            self.regions.valid = False
+    
+    def use_regions(self, workers):
+        """Split movement and target search over this many cores (0 or 1: one region, no worker processes)"""
+        self.close_regions()
+        self.regions = RegionSimulator(workers)
+    
+    def close_regions(self):
+        if self.regions is not None:
+            self.regions.close()
+            self.regions = None
+    
+    def clear(self):
+        """Remove every unit (used when a level restarts); they go back to the pool"""
+        self.deselect_all()
+        for unit in self.units:
+            self.pool.release(unit)
+        self.units.clear()
+        self.grid.clear()
+        self.trails.clear()
+        self.projectiles.clear()
+        self.ai_scheduler.clear()
+        self.dormancy.clear()
+        self.index.clear()
+        self.influence.clear()
+        self.fog.clear()
+        self.economy.clear()
+        self.next_unit_id = 0
     
     def remove_unit(self, unit):
-        if unit in self.units:
-            self.units.remove(unit)
+        # Nobody keeps a lock on a unit that left play (or on its recycled successor)
+        unit.set_target(None)
+        for attacker in unit.targeted_by[:]:
+            attacker.set_target(None)
         if unit in self.selected_units:
             self.selected_units.remove(unit)
+        if unit in self.units:
+            self.units.remove(unit)
+            self.grid.remove(unit)
+            self.trails.release(unit)
+            self.ai_scheduler.forget(unit)
+            unit.ai_scheduler = None
+            self.dormancy.forget(unit)
+            self.index.discard(unit)
+            unit.unit_index = None
+            self.fog.forget(unit)
+            self.economy.dismiss(unit)
+            self.pool.release(unit)
     
     def select_unit(self, unit):
         if unit not in self.selected_units:
@@ -582,11 +658,26 @@ class UnitManager:
         self.selected_units.clear()
     
     def move_selected_units(self, target_x, target_y):
-        for i, unit in enumerate(self.selected_units):
+        # Squad members go with their leader's order; one picked out without its leader leaves the squad
+        ordered = []
+        for unit in self.selected_units:
+            squad = unit.squad
+            if squad is not None and unit is not squad.leader:
+                if squad.leader.selected:
+                    unit.set_target(None)
+                    continue
+                squad.remove(unit)
+            ordered.append(unit)
+        
+        for i, unit in enumerate(ordered):
             # Spread units out in formation
             offset_x = (i % 3 - 1) * 20
             offset_y = (i // 3 - 1) * 20
             unit.move_to(target_x + offset_x, target_y + offset_y)
+            unit.set_target(None)  # A player order overrides the current target (and a peasant's job)
+            self.economy.dismiss(unit)
+            if unit.squad is not None:
+                self.follow_leader(unit.squad)
     
     def get_unit_at(self, world_x, world_y):
         for unit in self.units:
@@ -595,82 +686,256 @@ class UnitManager:
         return None
     
     def update(self, dt, player_castle=None, enemy_castles=None):
+        # Everything below only looks at units that are awake; the ones woken since last tick join now
+        if self.dormancy.refresh() and self.regions is not None:
+            self.regions.valid = False
+        
+        # Who is strong where, refreshed a couple of times a second for the AI below
+        self.influence.update(dt, self.index, player_castle, enemy_castles, self.economy.claims)
+        
+        # Idle units pick targets a slice at a time, within the AI budget
+        self.ai_scheduler.run(self.dormancy.active, lambda unit: self._choose_target(unit, player_castle, enemy_castles))
+        
+        # Spread out units that overlap, before anyone moves (the region step then sees the same positions)
+        self.steering.update(dt, self.dormancy.active, self.grid)
+        
         # Update all units
-        for unit in self.units[:]:
-            # Set AI target for enemy units
-            if unit.owner == "enemy" and not unit.is_moving:
+        if self.regions is not None:
+            self._update_regions(dt, player_castle)
+        else:
+            for unit in self.dormancy.active[:]:
+                unit.update(dt)
+                if not unit.is_alive():
+                    self._remove_dead(unit)
+                else:
+                    self.grid.move(unit, unit.x, unit.y)
+        
+        # Player units that crossed a fog cell move their sight with them
+        self.fog.follow(self.dormancy.active_by_owner("player"))
+        
+        # Sample movement trails (throttled internally)
+        self.trails.update(dt, self.dormancy.active)
+    
+    def _update_regions(self, dt, player_castle):
+        """Unit.update for every awake unit at once, through the region simulator"""
+        castle = None
+        if player_castle is not None and player_castle.is_alive():
+            castle = (player_castle.x + player_castle.size // 2, player_castle.y + player_castle.size // 2)
+        grid = self.grid
+        units = self.dormancy.active[:]
+        for unit, x, y, moving, flash in zip(units, *self.regions.step(units, dt, TARGET_HYSTERESIS, castle)):
+            if unit.health <= 0:
+                self._remove_dead(unit)
+                continue
+            if unit.is_moving:
+                unit.x = x
+                unit.y = y
+                unit.is_moving = moving != 0
+                grid.move(unit, x, y)
+            if unit.combat_flash > 0:
+                unit.combat_flash = flash
+    
+    def _remove_dead(self, unit):
+        # Enemies that may have been fighting it look for a new target straight away
+        # (in id order: grid order depends on history, replays need the same queue)
+        nearby = sorted(self.grid.query_radius(unit.x, unit.y, 200), key=attrgetter('unit_id'))
+        for other in nearby:
+            if other.owner != unit.owner and other.health > 0:
+                self.ai_scheduler.wake(other)
+        self.remove_unit(unit)
+    
+    def follow_leader(self, squad):
+        """Slot keeping for every member of a squad, after its leader decided where to go"""
+        for member in squad.members:
+            self._follow_squad(member, squad)
+    
+    def _follow_squad(self, member, squad):
+        # Members do not search: they close in on their own or the leader's target, else keep their slot
+        target = squad.focus(member)
+        if target is not None:
+            self._close_in(member, target)
+        else:
+            squad.keep_slot(member)
+    
+    def _close_in(self, unit, target):
+        """Move toward a locked target if it stepped out of reach"""
+        if isinstance(target, Unit):
+            target = (target.x, target.y)
+        else:
+            target = (target.x + target.size // 2, target.y + target.size // 2)
+        if math.sqrt((unit.x - target[0])**2 + (unit.y - target[1])**2) > unit.attack_range:
+            unit.move_to(target[0], target[1])
+    
+    def _choose_target(self, unit, player_castle, enemy_castles):
+        """AI for one unit (run by the AI scheduler); a squad leader decides for its whole squad"""
+        squad = unit.squad
+        if squad is None:
+            self._decide(unit, player_castle, enemy_castles)
+        elif unit is squad.leader:
+            self._decide(unit, player_castle, enemy_castles)
+            self.follow_leader(squad)
+            if unit.asleep:
+                # Members at rest sleep with their leader
+                for member in squad.members:
+                    self.dormancy.try_sleep(member)
+        # Squad members are steered through their leader's turn
+    
+    def _decide(self, unit, player_castle, enemy_castles):
+        """Target choice for one idle unit"""
+        if unit.is_moving:
+            return
+        
+        # Locked on: just close in if the target stepped out of reach
+        locked = unit.target_enemy
+        if locked is not None and locked.health > 0:
+            self._close_in(unit, locked)
+            return
+        
+        # Set AI target for enemy units: the player units close by if the fight is at least even
+        # (read off the influence map, no search), else press on to the player castle
+        if unit.owner == "enemy":
+            target = None
+            threat = self.influence.threat(unit.owner, unit.x, unit.y)
+            if 0 < threat <= self.influence.friendly(unit.owner, unit.x, unit.y):
+                defender = self._nearest_hostile(unit, 200)
+                if defender is not None:
+                    target = (defender.x, defender.y)
+            if target is None:
                 target = self._find_nearest_target_for_enemy(unit, player_castle)
-                if target:
-                    distance = math.sqrt((unit.x - target[0])**2 + (unit.y - target[1])**2)
-                    if distance > unit.attack_range:
-                        unit.move_to(target[0], target[1])
-            
-            # Set AI target for player units
-            elif unit.owner == "player" and not unit.is_moving:
-                target = self._find_nearest_target_for_player(unit, player_castle, enemy_castles)
-                if target:
-                    distance = math.sqrt((unit.x - target[0])**2 + (unit.y - target[1])**2)
-                    if distance <= 200 and distance > unit.attack_range:  # Only engage within 200 units
-                        unit.move_to(target[0], target[1])
-            
-            unit.update(dt)
-            # Remove dead units
-            if not unit.is_alive():
-                self.remove_unit(unit)
+            if target:
+                distance = math.sqrt((unit.x - target[0])**2 + (unit.y - target[1])**2)
+                if distance > unit.attack_range:
+                    unit.move_to(target[0], target[1])
+        
+        # Set AI target for player units
+        elif unit.owner == "player":
+            target = self._find_nearest_target_for_player(unit, player_castle, enemy_castles)
+            if target:
+                distance = math.sqrt((unit.x - target[0])**2 + (unit.y - target[1])**2)
+                if distance <= 200 and distance > unit.attack_range:  # Only engage within 200 units
+                    unit.move_to(target[0], target[1])
+            else:
+                # Nothing to fight nearby: rest until an order, a hit or an enemy coming close
+                self.dormancy.try_sleep(unit)
     
     def _find_nearest_target_for_enemy(self, enemy_unit, player_castle):
-        # Always prioritize attacking the player castle
+        # Go for what the influence map rates most worth taking against the defense around it:
+        # usually the player castle, but a peasant harvest when the castle is well guarded
+        objective = self.influence.objective("enemy")
         if player_castle and player_castle.is_alive():
             castle_center_x = player_castle.x + player_castle.size // 2
             castle_center_y = player_castle.y + player_castle.size // 2
-            return (castle_center_x, castle_center_y)
-        
-        # Fallback to player units if castle is destroyed
-        nearest_target = None
-        nearest_distance = float('inf')
-        
-        for unit in self.units:
-            if unit.owner == "player" and unit.is_alive():
-                distance = math.sqrt((enemy_unit.x - unit.x)**2 + (enemy_unit.y - unit.y)**2)
-                if distance < nearest_distance:
-                    nearest_distance = distance
-                    nearest_target = (unit.x, unit.y)
+            # The castle itself rather than its cell (or nothing rated yet, before the first refresh)
+            castle_cell = self.influence.cell_of(castle_center_x, castle_center_y)
+            if objective is None or self.influence.cell_of(*objective) == castle_cell:
+                return (castle_center_x, castle_center_y)
+        if objective is not None:
+            return objective
         
-        return nearest_target
+        # Fallback to where the player's army is strongest if castle is destroyed
+        return self.influence.hotspot("player")
     
     def _find_nearest_target_for_player(self, player_unit, player_castle, enemy_castles=None):
         """Find nearest enemy unit or enemy castle for player units to attack"""
         nearest_target = None
         nearest_distance = float('inf')
         
-        # Check enemy units first (priority target)
-        for unit in self.units:
-            if unit.owner == "enemy" and unit.is_alive():
-                distance = math.sqrt((player_unit.x - unit.x)**2 + (player_unit.y - unit.y)**2)
-                if distance < nearest_distance and distance <= 200:  # Only within 200 units
-                    nearest_distance = distance
-                    nearest_target = (unit.x, unit.y)
+        # Check enemy units first (priority target), only within 200 units and out of the fog; no
+        # search where the influence map rules out any enemy in reach
+        if self.influence.threat(player_unit.owner, player_unit.x, player_unit.y) > 0:
+            enemy = self._nearest_hostile(player_unit, 200)
+            if enemy is not None and self.fog.is_visible(enemy.x + enemy.size / 2, enemy.y + enemy.size / 2):
+                return (enemy.x, enemy.y)
         
         # If no enemy units in range, target enemy castles
-        if nearest_target is None and enemy_castles:
+        if enemy_castles:
             for castle in enemy_castles:
                 if castle.is_alive():
                     # Target castle center
                     castle_center_x = castle.x + castle.size // 2
                     castle_center_y = castle.y + castle.size // 2
                     distance = math.sqrt((player_unit.x - castle_center_x)**2 + (player_unit.y - castle_center_y)**2)
-                    if distance < nearest_distance and distance <= 200:  # Only within 200 units
+                    if (distance < nearest_distance and distance <= 200 and  # Only within 200 units
+                            self.fog.is_explored(castle_center_x, castle_center_y)):
                         nearest_distance = distance
                         nearest_target = (castle_center_x, castle_center_y)
         
         return nearest_target
     
+    def _nearest_hostile(self, unit, radius, to_center=False):
+        """Closest live unit of another owner within radius, through the grid (ties go to the older unit).
+        
+        Distance is between top-left corners, or from this unit to the other's
+        center with to_center (the measure Unit.attack uses).
+        """
+        nearest = None
+        nearest_key = None
+        x = unit.x
+        y = unit.y
+        owner = unit.owner
+        for other in self.grid.query_radius(x, y, radius + unit.size):
+            if other.owner == owner or other.health <= 0:
+                continue
+            if to_center:
+                dx = x - (other.x + other.size // 2)
+                dy = y - (other.y + other.size // 2)
+            else:
+                dx = x - other.x
+                dy = y - other.y
+            distance = math.sqrt(dx * dx + dy * dy)
+            if distance <= radius:
+                key = (distance, other.unit_id)
+                if nearest_key is None or key < nearest_key:
+                    nearest = other
+                    nearest_key = key
+        return nearest
+    
+    def combat_target(self, unit, player_castle, enemy_castles):
+        """What this unit attacks now: its locked target while that stays in reach, else the nearest in range.
+        
+        Steady fighting is a single distance check; a search (through the grid)
+        only happens when the lock is lost.
+        """
+        # Enemy units always turn on the player castle once it is in range
+        if unit.owner == "enemy" and player_castle is not None and player_castle.is_alive():
+            if _distance_to_center(unit, player_castle) <= unit.attack_range:
+                unit.set_target(player_castle)
+                return player_castle
+        
+        target = unit.target_enemy
+        if target is not None:
+            if target.health > 0 and _distance_to_center(unit, target) <= unit.attack_range + TARGET_HYSTERESIS:
+                return target
+            unit.set_target(None)
+        
+        # Lock onto the nearest enemy unit in range, then (player units) an enemy castle
+        target = self.regions.nearest_hostile(unit) if self.regions is not None else UNKNOWN
+        if target is UNKNOWN:
+            target = self._nearest_hostile(unit, unit.attack_range, to_center=True)
+        if target is None and unit.owner == "player" and enemy_castles:
+            for castle in enemy_castles:
+                if castle.is_alive() and _distance_to_center(unit, castle) <= unit.attack_range:
+                    target = castle
+                    break
+        if target is not None:
+            unit.set_target(target)
+        return target
+    
     def render(self, screen, camera):
-        for unit in self.units:
-            unit.render(screen, camera)
+        # Batched: only units in view, a few blits calls per frame
+        self.renderer.render(screen, camera, self)
+        self.projectile_renderer.render(screen, camera, self.projectiles)
     
     def get_units_by_owner(self, owner):
-        return [unit for unit in self.units if unit.owner == owner and unit.is_alive()]
+        """Live view of the owner's living units, in id order (see UnitIndex)"""
+        return self.index.owner(owner)
+    
+    def get_awake_units_by_owner(self, owner):
+        """The owner's awake units in id order, not copied: callers skip any that died or fell asleep this tick"""
+        return self.dormancy.active_by_owner(owner)
+    
+    def get_selected_commanders(self):
+        return [unit for unit in self.index.flagged('commander') if unit.selected]
     
     def apply_upgrade_bonus_to_existing_units(self, upgrade_bonus):
         """Apply upgrade bonuses to all existing player units"""
@@ -681,4 +946,5 @@ class UnitManager:
                 unit.max_health = int(unit.max_health * 1.15)
                 unit.attack_damage = int(unit.attack_damage * 1.15)
                 unit.speed = int(unit.speed * 1.15)
-                unit.attack_range = int(unit.attack_range * 1.15)
\ No newline at end of file
+                unit.attack_range = int(unit.attack_range * 1.15)
+        self.influence.invalidate()  # Faster units reach farther before the next refresh
\ No newline at end of file
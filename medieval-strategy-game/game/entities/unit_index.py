@@ -0,0 +1,51 @@
+class UnitIndex:
+    """Live units by owner, type and flag, updated as units join, die and leave.
+    
+    Each index is a dict used as an ordered set: a unit goes in or out in
+    constant time and every view keeps the order units joined in (id order,
+    like UnitManager.units). Views are the dicts' own key views, so nothing is
+    copied or filtered per frame; a unit leaving while one is iterated raises,
+    so take a list() first if the loop can add or remove units.
+    """
+    
+    FLAGS = ('commander', 'battalion', 'elite')
+    
+    def __init__(self):
+        self.by_owner = {}  # owner -> {unit: None}
+        self.by_type = {}   # unit_type -> {unit: None}
+        self.by_flag = {flag: {} for flag in self.FLAGS}
+    
+    def add(self, unit):
+        self.by_owner.setdefault(unit.owner, {})[unit] = None
+        self.by_type.setdefault(unit.unit_type, {})[unit] = None
+        for flag in self.FLAGS:
+            if getattr(unit, 'is_' + flag, False):
+                self.by_flag[flag][unit] = None
+    
+    def discard(self, unit):
+        """A unit died or left play (safe to call twice)"""
+        self.by_owner.get(unit.owner, {}).pop(unit, None)
+        self.by_type.get(unit.unit_type, {}).pop(unit, None)
+        for members in self.by_flag.values():
+            members.pop(unit, None)
+    
+    def tag(self, unit, flag):
+        """Set a flag that comes after spawning (elite knights)"""
+        setattr(unit, 'is_' + flag, True)
+        if unit.health > 0:
+            self.by_flag[flag][unit] = None
+    
+    def clear(self):
+        # Emptied in place, so views handed out earlier stay live
+        for index in (self.by_owner, self.by_type, self.by_flag):
+            for members in index.values():
+                members.clear()
+    
+    def owner(self, owner):
+        return self.by_owner.setdefault(owner, {}).keys()
+    
+    def of_type(self, unit_type):
+        return self.by_type.setdefault(unit_type, {}).keys()
+    
+    def flagged(self, flag):
+        return self.by_flag[flag].keys()
\ No newline at end of file
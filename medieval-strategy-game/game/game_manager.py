@@ -1,26 +1,39 @@
 import pygame
+import gc
+import time
 from .states.menu_state import MenuState
 from .states.game_state import GameState
+from .states.loading_state import LoadingState
+from .ui.asset_loader import AssetLoader
+from .ui.sprite_cache import sprite_cache
 
 class GameManager:
-    def __init__(self, screen, screen_width, screen_height):
+    def __init__(self, screen, screen_width, screen_height, use_sim_process=False, sim_workers=0):
         self.screen = screen
+        self.use_sim_process = use_sim_process  # Run matches in a worker process (see game/sim_process.py)
+        self.sim_workers = sim_workers  # Cores for region-split unit updates (see game/entities/regions.py)
         self.screen_width = screen_width
         self.screen_height = screen_height
         
-        # Initialize states
+        # Decode images in the background while the loading screen runs
+        self.assets = AssetLoader(sprite_cache)
+        self.assets.queue_game_assets(screen_width, screen_height)
+        
+        # Initialize states (the game state is built when a level starts)
         self.states = {
+            "loading": LoadingState(self, "menu"),
             "menu": MenuState(self),
-            "game": GameState(self)
+            "game": None
         }
         
-        # Start with menu state
-        self.current_state = self.states["menu"]
+        # Start with loading screen
+        self.current_state = self.states["loading"]
         self.current_state.enter()
         
         # Level system
         self.current_level = 1
         self.current_level_info = None
+        self.level_start_time = None
     
     def change_state(self, state_name):
         if state_name in self.states:
@@ -39,10 +52,34 @@ class GameManager:
     
     def start_level(self, level_num, level_info):
         """Start a specific level with given difficulty parameters"""
+        # Used by GameState to report first-frame latency
+        self.level_start_time = time.perf_counter()
         self.current_level = level_num
         self.current_level_info = level_info
-        # Recreate game state with new difficulty
-        self.states["game"] = GameState(self)
+        # Anything the menu did not finish preloading is needed now
+        self.assets.finish_all()
+        # Build the game world once, then only reset the simulation
+        if self.states["game"] is None:
+            self.states["game"] = GameState(self)
+            # Everything loaded so far lives for the whole session; keep it out of GC passes.
+            # Collect first so no garbage gets frozen with it, and freeze only this once:
+            # later matches leave cycles (target and squad links) that GC must still reach.
+            gc.collect()
+            gc.freeze()
+        else:
+            self.states["game"].reset(level_info)
+    
+    def shutdown(self):
+        """Stop background loader threads and finish pending saves before exiting"""
+        self.assets.shutdown()
+        if self.states["game"]:
+            if self.current_state is self.states["game"]:
+                self.states["game"].save_replay()
+            self.states["game"].snapshot_writer.flush()
+            self.states["game"].game_map.close()
+            if self.states["game"].sim_process:
+                self.states["game"].sim_process.stop()
+            self.states["game"].unit_manager.close_regions()
     
     def level_completed(self):
         """Called when a level is completed successfully"""
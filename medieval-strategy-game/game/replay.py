@@ -0,0 +1,279 @@
+import array
+import hashlib
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+from .snapshot import capture_snapshot, restore_snapshot, read_snapshot_file
+
+# Replay logs hold everything needed to re-run a match headless:
+#   header       magic, version, RNG seed, level, screen size, hash interval
+#   level info   spawn rate and enemy multiplier
+#   snapshot     the match as it was when recording started (see snapshot.py)
+#   ticks        the dt of every simulation tick, as doubles
+#   AI steps     target evaluations the AI scheduler ran in each tick (its
+#                time budget is the one thing the clock decides, so it is recorded)
+#   commands     player commands tagged with the tick they were issued before
+#   hashes       state hashes taken every hash_interval ticks
+REPLAY_MAGIC = b'KHRP'
+REPLAY_VERSION = 10
+REPLAY_FILE = "last_match.khr"
+
+_HEADER = struct.Struct('<4sHIHHHH')
+_LEVEL_INFO = struct.Struct('<dd')
+_COUNT = struct.Struct('<I')
+_COMMAND = struct.Struct('<IB')
+_MOVE = struct.Struct('<dd')
+_CLICK = struct.Struct('<hh')
+_HASH = struct.Struct('<I16s')
+
+# Command kinds
+CMD_SELECT = 0  # selection replaced by a list of unit ids
+CMD_MOVE = 1    # F key: move selected units to a world position
+CMD_CLICK = 2   # HUD click (recruit, upgrade, ATTACK!) at a screen position
+
+def state_hash(game_state):
+    """Hash everything the simulation depends on (not the camera or selection)"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(struct.pack('<Id', game_state.sim_tick, game_state.sim_time))
+    digest.update(array.array('I', random.getstate()[1]).tobytes())
+    
+    for castle in [game_state.player_castle] + game_state.enemy_castles:
+        digest.update(struct.pack('<iii', int(castle.health), castle.level, len(castle.garrison)))
+        digest.update(repr(sorted(castle.resources.items())).encode())
+    
+    units = game_state.unit_manager.units
+    digest.update(array.array('d', [value for unit in units
+                                    for value in (unit.x, unit.y, unit.target_x, unit.target_y, unit.last_attack_time)]).tobytes())
+    digest.update(array.array('i', [int(unit.health) for unit in units]).tobytes())
+    digest.update(''.join(unit.unit_type[0] + unit.owner[0] for unit in units).encode())
+    digest.update(array.array('d', [resource.amount for resource in game_state.resource_manager.resources]).tobytes())
+    
+    projectiles = game_state.unit_manager.projectiles
+    count = projectiles.count
+    digest.update(projectiles.x[:count].tobytes())
+    digest.update(projectiles.y[:count].tobytes())
+    digest.update(projectiles.damage[:count].tobytes())
+    return digest.digest()
+
+class ReplayLog:
+    """A recorded match: starting snapshot, per-tick dt, commands and checkpoints"""
+    
+    def __init__(self, seed=0, level=1, level_info=None, screen_size=(0, 0), hash_interval=60, snapshot=b''):
+        self.seed = seed
+        self.level = level
+        self.level_info = level_info or {'spawn_rate': 1.0, 'enemy_mult': 1.0}
+        self.screen_size = screen_size
+        self.hash_interval = hash_interval
+        self.snapshot = snapshot
+        self.ticks = array.array('d')
+        self.ai_steps = array.array('I')
+        self.commands = []  # (tick, kind, payload)
+        self.hashes = []    # (tick, digest) taken after that many ticks
+    
+    def encode(self):
+        parts = [_LEVEL_INFO.pack(self.level_info['spawn_rate'], self.level_info['enemy_mult']),
+                 _COUNT.pack(len(self.snapshot)), self.snapshot,
+                 _COUNT.pack(len(self.ticks)), self.ticks.tobytes(), self.ai_steps.tobytes(),
+                 _COUNT.pack(len(self.commands))]
+        for tick, kind, payload in self.commands:
+            parts.append(_COMMAND.pack(tick, kind))
+            if kind == CMD_SELECT:
+                parts.append(_COUNT.pack(len(payload)))
+                parts.append(array.array('I', payload).tobytes())
+            elif kind == CMD_MOVE:
+                parts.append(_MOVE.pack(*payload))
+            else:
+                parts.append(_CLICK.pack(*payload))
+        parts.append(_COUNT.pack(len(self.hashes)))
+        parts.extend(_HASH.pack(tick, digest) for tick, digest in self.hashes)
+        
+        header = _HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, self.level,
+                              self.screen_size[0], self.screen_size[1], self.hash_interval)
+        return header + zlib.compress(b''.join(parts), 6)
+    
+    @classmethod
+    def decode(cls, data):
+        magic, version, seed, level, width, height, hash_interval = _HEADER.unpack_from(data, 0)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError("Not a Kingdom Heroes replay (or an unsupported version)")
+        payload = zlib.decompress(data[_HEADER.size:])
+        
+        spawn_rate, enemy_mult = _LEVEL_INFO.unpack_from(payload, 0)
+        offset = _LEVEL_INFO.size
+        log = cls(seed, level, {'spawn_rate': spawn_rate, 'enemy_mult': enemy_mult}, (width, height), hash_interval)
+        
+        size = _COUNT.unpack_from(payload, offset)[0]
+        offset += _COUNT.size
+        log.snapshot = payload[offset:offset + size]
+        offset += size
+        
+        count = _COUNT.unpack_from(payload, offset)[0]
+        offset += _COUNT.size
+        log.ticks.frombytes(payload[offset:offset + count * log.ticks.itemsize])
+        offset += count * log.ticks.itemsize
+        log.ai_steps.frombytes(payload[offset:offset + count * log.ai_steps.itemsize])
+        offset += count * log.ai_steps.itemsize
+        
+        count = _COUNT.unpack_from(payload, offset)[0]
+        offset += _COUNT.size
+        for _ in range(count):
+            tick, kind = _COMMAND.unpack_from(payload, offset)
+            offset += _COMMAND.size
+            if kind == CMD_SELECT:
+                id_count = _COUNT.unpack_from(payload, offset)[0]
+                offset += _COUNT.size
+                ids = array.array('I')
+                ids.frombytes(payload[offset:offset + id_count * ids.itemsize])
+                offset += id_count * ids.itemsize
+                command = tuple(ids)
+            elif kind == CMD_MOVE:
+                command = _MOVE.unpack_from(payload, offset)
+                offset += _MOVE.size
+            else:
+                command = _CLICK.unpack_from(payload, offset)
+                offset += _CLICK.size
+            log.commands.append((tick, kind, command))
+        
+        count = _COUNT.unpack_from(payload, offset)[0]
+        offset += _COUNT.size
+        for _ in range(count):
+            log.hashes.append(_HASH.unpack_from(payload, offset))
+            offset += _HASH.size
+        return log
+
+class InputRecorder:
+    """Records the player's command stream and per-tick dt while a match runs.
+    
+    GameState calls start() whenever a match begins (or a save is loaded), which
+    captures the starting snapshot; the log only covers play since then.
+    """
+    
+    def __init__(self, hash_interval=60):
+        self.enabled = True
+        self.hash_interval = hash_interval
+        self.log = None
+        self.last_selection = ()
+    
+    def start(self, game_state, seed):
+        if not self.enabled:
+            return
+        game_manager = game_state.game_manager
+        self.log = ReplayLog(seed, getattr(game_manager, 'current_level', 1),
+                             getattr(game_manager, 'current_level_info', None),
+                             (game_state.screen_width, game_state.screen_height),
+                             self.hash_interval, capture_snapshot(game_state))
+        self.last_selection = ()
+    
+    def record_tick(self, game_state, dt):
+        """Called after each simulation tick"""
+        if not self.enabled or self.log is None:
+            return
+        self.log.ticks.append(dt)
+        self.log.ai_steps.append(game_state.unit_manager.ai_scheduler.last_steps)
+        if len(self.log.ticks) % self.hash_interval == 0:
+            self.log.hashes.append((len(self.log.ticks), state_hash(game_state)))
+    
+    def record_selection(self, selected_units):
+        """Record the selection if it changed since the last recorded command"""
+        if not self.enabled or self.log is None:
+            return
+        selection = tuple(unit.unit_id for unit in selected_units)
+        if selection != self.last_selection:
+            self.last_selection = selection
+            self.log.commands.append((len(self.log.ticks), CMD_SELECT, selection))
+    
+    def record_move(self, world_x, world_y):
+        if self.enabled and self.log is not None:
+            self.log.commands.append((len(self.log.ticks), CMD_MOVE, (world_x, world_y)))
+    
+    def record_click(self, mouse_x, mouse_y):
+        if self.enabled and self.log is not None:
+            self.log.commands.append((len(self.log.ticks), CMD_CLICK, (mouse_x, mouse_y)))
+
+class HeadlessManager:
+    """The bits of GameManager a GameState needs, without a window or menu"""
+    
+    def __init__(self, screen_size, level=1, level_info=None):
+        import pygame
+        self.screen_width, self.screen_height = screen_size
+        self.screen = pygame.Surface(screen_size)
+        self.current_level = level
+        self.current_level_info = dict(level_info or {'spawn_rate': 1.0, 'enemy_mult': 1.0}, name="Headless")
+        self.level_start_time = None
+        self.states = {}
+    
+    def change_state(self, state_name):
+        pass
+    
+    def level_completed(self):
+        pass
+
+def run_replay(log, check=True):
+    """Re-run a recorded match headless as fast as possible.
+    
+    Returns (ticks run, seconds taken, list of ticks whose state hash differs).
+    """
+    from .states.game_state import GameState
+    
+    game_state = GameState(HeadlessManager(log.screen_size, log.level, log.level_info))
+    game_state.recorder.enabled = False
+    game_state.player_castle.persist_upgrades = False
+    restore_snapshot(game_state, log.snapshot)
+    
+    ai_scheduler = game_state.unit_manager.ai_scheduler
+    expected = dict(log.hashes) if check else {}
+    mismatches = []
+    commands = log.commands
+    next_command = 0
+    start = time.perf_counter()
+    for tick, dt in enumerate(log.ticks):
+        # Commands recorded before this tick
+        while next_command < len(commands) and commands[next_command][0] <= tick:
+            _, kind, payload = commands[next_command]
+            next_command += 1
+            if kind == CMD_SELECT:
+                units_by_id = {unit.unit_id: unit for unit in game_state.unit_manager.units}
+                game_state.unit_manager.deselect_all()
+                for unit_id in payload:
+                    if unit_id in units_by_id:
+                        game_state.unit_manager.select_unit(units_by_id[unit_id])
+            elif kind == CMD_MOVE:
+                game_state.move_selected_units(*payload)
+            else:
+                game_state.click_hud(*payload)
+        
+        # Same amount of AI work as the recorded tick, whatever this machine's speed
+        ai_scheduler.forced_steps = log.ai_steps[tick]
+        game_state.simulate(dt)
+        
+        digest = expected.get(tick + 1)
+        if digest is not None and state_hash(game_state) != digest:
+            mismatches.append(tick + 1)
+    
+    return len(log.ticks), time.perf_counter() - start, mismatches
+
+def main(argv=None):
+    """python -m game.replay [last_match.khr]"""
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else REPLAY_FILE
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    
+    import pygame
+    pygame.init()
+    log = ReplayLog.decode(read_snapshot_file(path))
+    ticks, seconds, mismatches = run_replay(log)
+    match_seconds = sum(log.ticks)
+    print(f"Replayed {ticks} ticks ({match_seconds:.1f} s of play, seed {log.seed}) in {seconds:.2f} s "
+          f"({match_seconds / max(seconds, 1e-9):.0f}x real time)")
+    if mismatches:
+        print(f"DESYNC: state hash differs at ticks {mismatches[:10]}")
+    else:
+        print(f"Deterministic: {len(log.hashes)} state hashes matched")
+    pygame.quit()
+    return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
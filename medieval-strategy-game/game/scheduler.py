@@ -0,0 +1,42 @@
+import heapq
+
+class EventScheduler:
+    """Calls callbacks at simulation times, so nothing polls a clock every tick.
+    
+    Attack cooldowns, castle bolts, resource income and enemy waves are all
+    events in one heap ordered by due time (then by when they were added).
+    Times are simulation seconds: ticks vary in length, so a tick count would
+    not mean a fixed time. run() fires everything due by the current tick.
+    """
+    
+    def __init__(self):
+        self.queue = []  # (due time, sequence, callback, args)
+        self.sequence = 0
+        self.fired = 0  # Events fired by the last run (for stats)
+    
+    def at(self, time, callback, *args):
+        heapq.heappush(self.queue, (time, self.sequence, callback, args))
+        self.sequence += 1
+    
+    def run(self, now):
+        """Fire every event due by now in due order (events they add fire too if already due)"""
+        queue = self.queue
+        fired = 0
+        while queue and queue[0][0] <= now:
+            _, _, callback, args = heapq.heappop(queue)
+            callback(*args)
+            fired += 1
+        self.fired = fired
+        return fired
+    
+    def due(self, callback):
+        """When callback is next due, or None (for snapshots)"""
+        times = [time for time, _, queued, _ in self.queue if queued == callback]
+        return min(times) if times else None
+    
+    def clear(self):
+        self.queue.clear()
+        self.sequence = 0
+    
+    def __len__(self):
+        return len(self.queue)
\ No newline at end of file
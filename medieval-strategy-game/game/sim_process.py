@@ -0,0 +1,396 @@
+import multiprocessing
+import os
+import queue
+import time
+import traceback
+import numpy as np
+from multiprocessing import shared_memory
+from .snapshot import UNIT_TYPES, OWNERS, RESOURCE_TYPES
+
+# Optional mode (python main.py --sim-process): the match runs in a worker
+# process at a fixed tick and publishes every frame into shared memory; the
+# pygame process mirrors the latest frame onto its own units and castles,
+# draws them and forwards the player's commands.
+SIM_TICK = 1 / 60
+PARENT_CHECK_INTERVAL = 1.0  # Seconds between checks that the game window is still there
+MAX_UNITS = 16384        # Units and shots past these caps are simulated but not drawn
+MAX_PROJECTILES = 16384  # (the renderer warns once when a frame leaves some out)
+MAX_CASTLES = 4  # Player castle, then the enemy castle pool
+
+# Frame header slots
+HEADER_GENERATION = 0  # Matches started or loaded by the worker (older frames are stale)
+HEADER_TICK = 1
+HEADER_TIME = 2
+HEADER_UNITS = 3
+HEADER_PROJECTILES = 4
+HEADER_TICK_MS = 5
+HEADER_ALL_UNITS = 6        # Units and shots in the match, including any past the caps
+HEADER_ALL_PROJECTILES = 7
+
+# Castle columns
+CASTLE_COLUMNS = ('in_play', 'health', 'max_health', 'level', 'size', 'x', 'y', 'upgrade_bonus',
+                  'defense_flash') + RESOURCE_TYPES
+
+FLAG_MOVING = 1
+
+# Every field of a frame is an array at a fixed offset in the shared block
+_FRAME_FIELDS = (
+    ('header', np.float64, (8,)),
+    ('castles', np.float64, (MAX_CASTLES, len(CASTLE_COLUMNS))),
+    ('unit_id', np.int64, (MAX_UNITS,)),
+    ('unit_x', np.float64, (MAX_UNITS,)),
+    ('unit_y', np.float64, (MAX_UNITS,)),
+    ('unit_health', np.int32, (MAX_UNITS,)),
+    ('unit_max_health', np.int32, (MAX_UNITS,)),
+    ('unit_flash', np.float32, (MAX_UNITS,)),
+    ('unit_type', np.uint8, (MAX_UNITS,)),
+    ('unit_owner', np.uint8, (MAX_UNITS,)),
+    ('unit_flags', np.uint8, (MAX_UNITS,)),
+    ('shot_x', np.float64, (MAX_PROJECTILES,)),
+    ('shot_y', np.float64, (MAX_PROJECTILES,)),
+    ('shot_vx', np.float64, (MAX_PROJECTILES,)),
+    ('shot_vy', np.float64, (MAX_PROJECTILES,)),
+    ('shot_remaining', np.float64, (MAX_PROJECTILES,)),
+    ('shot_flight_time', np.float64, (MAX_PROJECTILES,)),
+    ('shot_kind', np.uint8, (MAX_PROJECTILES,)),
+)
+
+def _field_offsets():
+    """Byte offset of every field in a frame (8-byte aligned) and the frame size"""
+    offsets = {}
+    size = 0
+    for name, dtype, shape in _FRAME_FIELDS:
+        offsets[name] = size
+        size += int(np.prod(shape)) * np.dtype(dtype).itemsize
+        size = (size + 7) // 8 * 8
+    return offsets, size
+
+_OFFSETS, FRAME_SIZE = _field_offsets()
+_CONTROL_SIZE = 64  # front frame index, then a sequence number per frame
+
+class FrameBuffers:
+    """Two frames in one shared memory block, handed over with a sequence lock.
+    
+    The writer fills the back frame (its sequence number is odd meanwhile),
+    then makes it the front one. The reader copies the front frame and keeps
+    the copy only if the sequence number did not change while it read.
+    """
+    
+    def __init__(self, name=None):
+        self.is_owner = name is None
+        if self.is_owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=_CONTROL_SIZE + FRAME_SIZE * 2)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.control = np.ndarray((3,), dtype=np.int64, buffer=self.shm.buf)
+        self.frames = [self._frame_views(_CONTROL_SIZE + index * FRAME_SIZE) for index in range(2)]
+        self.last_read = None  # (front, sequence) of the frame returned last
+        self.back = 0
+    
+    def _frame_views(self, base):
+        return {name: np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=base + _OFFSETS[name])
+                for name, dtype, shape in _FRAME_FIELDS}
+    
+    def begin_write(self):
+        """Frame to fill for the next publish"""
+        self.back = 1 - int(self.control[0])
+        self.control[1 + self.back] += 1  # Odd: being written
+        return self.frames[self.back]
+    
+    def end_write(self):
+        self.control[1 + self.back] += 1
+        self.control[0] = self.back
+    
+    def read(self):
+        """Copy of the newest complete frame, or None if there is nothing new"""
+        front = int(self.control[0])
+        sequence = int(self.control[1 + front])
+        if sequence == 0 or sequence % 2 or (front, sequence) == self.last_read:
+            return None
+        frame = self.frames[front]
+        header = frame['header'].copy()
+        units = int(header[HEADER_UNITS])
+        shots = int(header[HEADER_PROJECTILES])
+        copy = {'header': header, 'castles': frame['castles'].copy()}
+        for name, _, _ in _FRAME_FIELDS[2:]:
+            copy[name] = frame[name][:shots if name.startswith('shot_') else units].copy()
+        if int(self.control[1 + front]) != sequence:
+            return None  # Overwritten while copying; the next frame will do
+        self.last_read = (front, sequence)
+        return copy
+    
+    def close(self):
+        # Views into the block must go before it can be closed
+        self.control = None
+        self.frames = None
+        self.shm.close()
+        if self.is_owner:
+            self.shm.unlink()
+
+def publish_frame(buffers, game_state, generation, tick_ms):
+    """Write the match as the renderer needs it into the back frame"""
+    frame = buffers.begin_write()
+    unit_manager = game_state.unit_manager
+    units = unit_manager.units[:MAX_UNITS]
+    count = len(units)
+    frame['unit_id'][:count] = np.fromiter((unit.unit_id for unit in units), dtype=np.int64, count=count)
+    frame['unit_x'][:count] = np.fromiter((unit.x for unit in units), dtype=np.float64, count=count)
+    frame['unit_y'][:count] = np.fromiter((unit.y for unit in units), dtype=np.float64, count=count)
+    frame['unit_health'][:count] = np.fromiter((unit.health for unit in units), dtype=np.int32, count=count)
+    frame['unit_max_health'][:count] = np.fromiter((unit.max_health for unit in units), dtype=np.int32, count=count)
+    frame['unit_flash'][:count] = np.fromiter((unit.combat_flash for unit in units), dtype=np.float32, count=count)
+    frame['unit_type'][:count] = np.fromiter((_TYPE_INDEX[unit.unit_type] for unit in units), dtype=np.uint8, count=count)
+    frame['unit_owner'][:count] = np.fromiter((_OWNER_INDEX[unit.owner] for unit in units), dtype=np.uint8, count=count)
+    frame['unit_flags'][:count] = np.fromiter((FLAG_MOVING if unit.is_moving else 0 for unit in units),
+                                              dtype=np.uint8, count=count)
+    
+    projectiles = unit_manager.projectiles
+    shots = min(projectiles.count, MAX_PROJECTILES)
+    frame['shot_x'][:shots] = projectiles.x[:shots]
+    frame['shot_y'][:shots] = projectiles.y[:shots]
+    frame['shot_vx'][:shots] = projectiles.vx[:shots]
+    frame['shot_vy'][:shots] = projectiles.vy[:shots]
+    frame['shot_remaining'][:shots] = projectiles.remaining[:shots]
+    frame['shot_flight_time'][:shots] = projectiles.flight_time[:shots]
+    frame['shot_kind'][:shots] = projectiles.kinds[:shots]
+    
+    castles = frame['castles']
+    for index, castle in enumerate([game_state.player_castle] + game_state.enemy_castle_pool):
+        in_play = castle is game_state.player_castle or castle in game_state.enemy_castles
+        castles[index] = ((in_play, castle.health, castle.max_health, castle.level, castle.size, castle.x, castle.y,
+                           castle.upgrade_bonus, max(0.0, getattr(castle, 'defense_flash', 0.0)))
+                          + tuple(castle.resources.get(name, 0) for name in RESOURCE_TYPES))
+    
+    header = frame['header']
+    header[HEADER_GENERATION] = generation
+    header[HEADER_TICK] = game_state.sim_tick
+    header[HEADER_TIME] = game_state.sim_time
+    header[HEADER_UNITS] = count
+    header[HEADER_PROJECTILES] = shots
+    header[HEADER_TICK_MS] = tick_ms
+    header[HEADER_ALL_UNITS] = len(unit_manager.units)
+    header[HEADER_ALL_PROJECTILES] = projectiles.count
+    buffers.end_write()
+
+_TYPE_INDEX = {unit_type: index for index, unit_type in enumerate(UNIT_TYPES)}
+_OWNER_INDEX = {owner: index for index, owner in enumerate(OWNERS)}
+
+def _run_simulation(shm_name, commands, screen_size, sim_workers):
+    """Worker process: run matches at a fixed tick and publish every frame"""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+    from .replay import HeadlessManager
+    from .states.game_state import GameState
+    pygame.init()
+    buffers = FrameBuffers(shm_name)
+    game_manager = HeadlessManager(screen_size)
+    game_manager.sim_workers = sim_workers
+    game_state = GameState(game_manager)
+    units_by_id = {}
+    generation = 0
+    running = False
+    next_tick = time.perf_counter()
+    next_parent_check = next_tick
+    parent = multiprocessing.parent_process()
+    try:
+        while True:
+            # Not a daemon (the region workers are its children), so stop if the game window is gone
+            if time.perf_counter() >= next_parent_check:
+                next_parent_check = time.perf_counter() + PARENT_CHECK_INTERVAL
+                if not parent.is_alive():
+                    return
+            
+            # Apply every command that arrived since the last tick
+            while True:
+                try:
+                    command = commands.get(timeout=PARENT_CHECK_INTERVAL if not running else 0)
+                except queue.Empty:
+                    break
+                kind = command[0]
+                if kind == 'stop':
+                    game_state.save_replay()
+                    game_state.snapshot_writer.flush()
+                    return
+                elif kind == 'reset':
+                    _, game_manager.current_level, game_manager.current_level_info = command
+                    game_state.reset(game_manager.current_level_info)
+                    generation += 1
+                    running = True
+                    next_tick = time.perf_counter()
+                elif kind == 'pause':
+                    running = False
+                elif kind == 'select':
+                    units_by_id = {unit.unit_id: unit for unit in game_state.unit_manager.units}
+                    game_state.unit_manager.deselect_all()
+                    for unit_id in command[1]:
+                        if unit_id in units_by_id:
+                            game_state.unit_manager.select_unit(units_by_id[unit_id])
+                elif kind == 'move':
+                    game_state.move_selected_units(*command[1:])
+                elif kind == 'click':
+                    game_state.click_hud(*command[1:])
+                elif kind == 'save':
+                    game_state.save_snapshot(command[1])
+                elif kind == 'load':
+                    game_state.load_snapshot(command[1])
+                    generation += 1
+                elif kind == 'save_replay':
+                    game_state.save_replay()
+            if not running:
+                continue
+            
+            # Fixed tick at real-time pace; after a long stall, do not try to catch up
+            now = time.perf_counter()
+            if now < next_tick:
+                time.sleep(next_tick - now)
+            next_tick = max(next_tick + SIM_TICK, time.perf_counter() - 0.25)
+            start = time.perf_counter()
+            if not game_state.game_over:
+                game_state.update(SIM_TICK)
+            publish_frame(buffers, game_state, generation, (time.perf_counter() - start) * 1000)
+    except Exception:
+        traceback.print_exc()
+    finally:
+        game_state.unit_manager.close_regions()
+        buffers.close()
+
+class SimulationProcess:
+    """The pygame side of --sim-process: starts the worker, sends it commands and mirrors its frames"""
+    
+    def __init__(self, screen_size, sim_workers=0):
+        self.buffers = FrameBuffers()
+        context = multiprocessing.get_context("spawn")
+        self.commands = context.Queue()
+        self.process = context.Process(target=_run_simulation, name="simulation",
+                                       args=(self.buffers.shm.name, self.commands, screen_size, sim_workers))
+        self.process.start()
+        self.generation = 0  # Frames from before the last reset or load are ignored
+        self.shown_generation = 0
+        self.sim_tick = 0
+        self.tick_ms = 0.0
+        self.reported_exit = False
+        self.reported_cap = False
+    
+    def reset(self, level, level_info):
+        self.generation += 1
+        self.commands.put(('reset', level, level_info))
+    
+    def pause(self):
+        self.commands.put(('pause',))
+    
+    def select(self, units):
+        self.commands.put(('select', tuple(unit.unit_id for unit in units)))
+    
+    def move(self, world_x, world_y):
+        self.commands.put(('move', world_x, world_y))
+    
+    def click(self, mouse_x, mouse_y):
+        self.commands.put(('click', mouse_x, mouse_y))
+    
+    def save(self, path):
+        self.commands.put(('save', path))
+    
+    def load(self, path):
+        self.generation += 1
+        self.commands.put(('load', path))
+    
+    def save_replay(self):
+        self.commands.put(('save_replay',))
+    
+    def stop(self):
+        if self.process.is_alive():
+            self.commands.put(('stop',))
+            self.process.join(5)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.buffers.close()
+    
+    def sync(self, game_state):
+        """Mirror the newest published frame onto the local units, shots and castles; True if there was one"""
+        if not self.process.is_alive() and not self.reported_exit:
+            self.reported_exit = True
+            print(f"Simulation process exited (code {self.process.exitcode})")
+        frame = self.buffers.read()
+        if frame is None or frame['header'][HEADER_GENERATION] < self.generation:
+            return False
+        header = frame['header']
+        if header[HEADER_GENERATION] != self.shown_generation:
+            # A new or loaded match: unit ids start over, so nothing carries across
+            self.shown_generation = header[HEADER_GENERATION]
+            game_state.unit_manager.clear()
+        self.sim_tick = int(header[HEADER_TICK])
+        self.tick_ms = float(header[HEADER_TICK_MS])
+        if not self.reported_cap and (header[HEADER_ALL_UNITS] > header[HEADER_UNITS] or
+                                      header[HEADER_ALL_PROJECTILES] > header[HEADER_PROJECTILES]):
+            self.reported_cap = True
+            print(f"Warning: the match has {int(header[HEADER_ALL_UNITS])} units and "
+                  f"{int(header[HEADER_ALL_PROJECTILES])} projectiles; only the first {MAX_UNITS} and "
+                  f"{MAX_PROJECTILES} are shown in --sim-process mode")
+        game_state.sim_tick = self.sim_tick
+        game_state.sim_time = float(header[HEADER_TIME])
+        
+        self._sync_units(game_state.unit_manager, frame)
+        self._sync_projectiles(game_state.unit_manager.projectiles, frame)
+        
+        # Castles: stats and resources; enemy castles still in play
+        columns = {name: index for index, name in enumerate(CASTLE_COLUMNS)}
+        castles = [game_state.player_castle] + game_state.enemy_castle_pool
+        enemy_castles = []
+        for castle, row in zip(castles, frame['castles'].tolist()):
+            castle.health = int(row[columns['health']])
+            castle.max_health = int(row[columns['max_health']])
+            castle.level = int(row[columns['level']])
+            castle.size = int(row[columns['size']])
+            castle.x, castle.y = int(row[columns['x']]), int(row[columns['y']])
+            castle.upgrade_bonus = row[columns['upgrade_bonus']]
+            if hasattr(castle, 'defense_flash'):
+                castle.defense_flash = row[columns['defense_flash']]
+            castle.resources = {name: int(row[columns[name]]) for name in RESOURCE_TYPES}
+            if castle is not game_state.player_castle and row[columns['in_play']]:
+                enemy_castles.append(castle)
+        game_state.enemy_castles = enemy_castles
+        return True
+    
+    def _sync_units(self, unit_manager, frame):
+        by_id = {unit.unit_id: unit for unit in unit_manager.units}
+        ids = frame['unit_id'].tolist()
+        
+        # Units the worker no longer has
+        live_ids = set(ids)
+        for unit in [unit for unit in unit_manager.units if unit.unit_id not in live_ids]:
+            unit.health = 0
+            unit_manager.remove_unit(unit)
+        
+        grid = unit_manager.grid
+        for unit_id, x, y, health, max_health, flash, unit_type, owner, flags in zip(
+                ids, frame['unit_x'].tolist(), frame['unit_y'].tolist(), frame['unit_health'].tolist(),
+                frame['unit_max_health'].tolist(), frame['unit_flash'].tolist(), frame['unit_type'].tolist(),
+                frame['unit_owner'].tolist(), frame['unit_flags'].tolist()):
+            unit = by_id.get(unit_id)
+            if unit is None:
+                unit = unit_manager.pool.acquire(x, y, UNIT_TYPES[unit_type], OWNERS[owner])
+                unit_manager.add_unit(unit, unit_id)
+            else:
+                unit.x = x
+                unit.y = y
+                grid.move(unit, x, y)
+            unit.health = health
+            if health <= 0:
+                unit_manager.index.discard(unit)
+            unit.max_health = max_health
+            unit.combat_flash = flash
+            unit.is_moving = bool(flags & FLAG_MOVING)
+    
+    def _sync_projectiles(self, projectiles, frame):
+        count = len(frame['shot_x'])
+        while len(projectiles.x) < count:
+            projectiles._grow()
+        projectiles.x[:count] = frame['shot_x']
+        projectiles.y[:count] = frame['shot_y']
+        projectiles.vx[:count] = frame['shot_vx']
+        projectiles.vy[:count] = frame['shot_vy']
+        projectiles.remaining[:count] = frame['shot_remaining']
+        projectiles.flight_time[:count] = frame['shot_flight_time']
+        projectiles.kinds[:count] = frame['shot_kind']
+        projectiles.count = count
\ No newline at end of file
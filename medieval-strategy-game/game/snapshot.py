@@ -0,0 +1,480 @@
+import array
+import os
+import queue
+import random
+import struct
+import threading
+import zlib
+import numpy as np
+from .entities.unit import UNIT_STATS
+from .entities.squad import Squad
+from .entities.resource import Resource
+from .entities.economy import Worker
+
+# Binary match snapshot layout (native byte order, little-endian on every
+# platform the game ships on):
+#   header  magic, version, flags, payload size
+#   payload match record, RNG state, castles, resources, next unit id, unit
+#           columns, projectile columns, the AI scheduler queue, the
+#           influence map (refresh timer, reach, strength and worth grids), the
+#           fog's explored mask (what is visible now follows from positions),
+#           then the economy (timer, worker columns, job queue)
+# Timed events are not stored one by one: each is rebuilt from the state that
+# scheduled it (next income and wave times, cooling units, reloading castle).
+# Units and resources are stored column by column with the array module, so
+# packing and unpacking is a handful of bulk copies instead of per-field work.
+SNAPSHOT_MAGIC = b'KHSV'
+SNAPSHOT_VERSION = 16
+FLAG_COMPRESSED = 1
+
+UNIT_TYPES = tuple(UNIT_STATS)
+OWNERS = ('player', 'enemy', 'neutral')
+RESOURCE_TYPES = ('gold', 'wood', 'stone', 'food')
+
+_HEADER = struct.Struct('<4sHHI')
+# level, game over flags, camera zoom step, simulation tick, simulation time,
+# next income and enemy wave (simulation time, -1 = not scheduled), enemy spawn
+# interval, enemy multiplier, camera x, camera y
+_MATCH = struct.Struct('<HBBBbIddddddd')
+_COUNT = struct.Struct('<I')
+# pool index (-1 = player castle), x, y, level, health, max health, size,
+# max garrison, upgrade bonus, last defense attack (simulation time), defenses
+# reloading, garrison size
+_CASTLE = struct.Struct('<biiiiiiiddBI')
+_RNG_TAIL = struct.Struct('<iBd')
+_TIMER = struct.Struct('<d')
+
+# Unit flag bits
+FLAG_MOVING = 1
+FLAG_SELECTED = 2
+FLAG_ELITE = 4
+FLAG_DRAGOON_CAVALRY = 8
+FLAG_COMMAND_MODE = 16
+FLAG_ASLEEP = 32
+FLAG_COOLING = 64  # Waiting for its cooldown-ready event, due last_attack_time + attack_cooldown
+
+UNIT_COLUMNS = (
+    ('unit_id', 'i'),         # kept, so recorded commands and id tie-breaks still match after a restore
+    ('unit_type', 'B'), ('owner', 'B'), ('flags', 'B'),
+    ('x', 'd'), ('y', 'd'), ('target_x', 'd'), ('target_y', 'd'),  # exact, so restores stay deterministic
+    ('health', 'i'), ('max_health', 'i'), ('speed', 'i'),
+    ('attack_damage', 'i'), ('attack_range', 'i'),
+    ('combat_flash', 'f'), ('last_attack_time', 'd'),
+    ('leader', 'i'),          # index of the unit's squad leader, -1 if it is not a squad member
+    ('slot_x', 'd'), ('slot_y', 'd'),  # formation slot in that squad
+    ('command_target', 'b'),  # castle index (0 = player, n = enemy pool n-1), -1 if none
+    ('lock_unit', 'i'),       # index of the locked combat target unit, -1 if none
+    ('lock_castle', 'b'),     # castle index of the locked combat target, -1 if none
+)
+
+RESOURCE_COLUMNS = (
+    ('resource_type', 'B'), ('x', 'i'), ('y', 'i'), ('amount', 'd'), ('max_amount', 'd'),
+)
+
+WORKER_COLUMNS = (
+    ('unit', 'i'),           # unit index
+    ('resource', 'i'),       # resource index, -1 while queued or once the resource ran out
+    ('carried', 'd'), ('carry_type', 'B'), ('flags', 'B'),  # flags: 1 = queued, 2 = walking home
+    ('dest_x', 'd'), ('dest_y', 'd'),
+)
+
+PROJECTILE_COLUMNS = (
+    ('kind', 'B'), ('x', 'd'), ('y', 'd'), ('vx', 'd'), ('vy', 'd'),
+    ('remaining', 'd'), ('flight_time', 'd'), ('damage', 'i'),
+    ('target_unit', 'i'),    # unit index, -1 if the target is a castle or gone
+    ('target_castle', 'b'),  # castle index as for units, -1 if the target is a unit or gone
+    ('owner', 'B'), ('splash', 'd'),
+)
+
+def _pack_columns(columns, rows):
+    """Pack a list of per-row tuples into concatenated typed columns"""
+    parts = [_COUNT.pack(len(rows))]
+    for index, (_, code) in enumerate(columns):
+        parts.append(array.array(code, [row[index] for row in rows]).tobytes())
+    return b''.join(parts)
+
+def _unpack_columns(columns, payload, offset):
+    """Inverse of _pack_columns; returns ({name: array}, count, new offset)"""
+    count = _COUNT.unpack_from(payload, offset)[0]
+    offset += _COUNT.size
+    result = {}
+    for name, code in columns:
+        column = array.array(code)
+        size = column.itemsize * count
+        column.frombytes(payload[offset:offset + size])
+        result[name] = column
+        offset += size
+    return result, count, offset
+
+def capture_snapshot(game_state, compress=True):
+    """Encode a running match into compact bytes"""
+    game_manager = game_state.game_manager
+    camera = game_state.camera
+    parts = []
+    
+    # Match record and timers
+    events = game_state.events
+    income_due = events.due(game_state.collect_income)
+    wave_due = events.due(game_state.send_enemy_wave)
+    parts.append(_MATCH.pack(
+        getattr(game_manager, 'current_level', 1),
+        game_state.game_over, game_state.victory, game_state.defeat, camera.zoom_index,
+        game_state.sim_tick, game_state.sim_time,
+        -1.0 if income_due is None else income_due, -1.0 if wave_due is None else wave_due,
+        game_state.enemy_spawn_interval, game_state.enemy_multiplier,
+        camera.x, camera.y))
+    
+    # RNG state: version, 625 state words, gauss_next
+    version, words, gauss_next = random.getstate()
+    parts.append(array.array('I', words).tobytes())
+    parts.append(_RNG_TAIL.pack(version, gauss_next is not None, gauss_next or 0.0))
+    
+    # Castles: the player castle, then every enemy castle still in play
+    castles = [(-1, game_state.player_castle)]
+    castles += [(game_state.enemy_castle_pool.index(castle), castle) for castle in game_state.enemy_castles]
+    castle_index = {id(castle): index for index, castle in enumerate([game_state.player_castle] + game_state.enemy_castle_pool)}
+    parts.append(_COUNT.pack(len(castles)))
+    for pool_index, castle in castles:
+        parts.append(_CASTLE.pack(
+            pool_index, int(castle.x), int(castle.y), castle.level, int(castle.health), castle.max_health,
+            castle.size, castle.max_garrison, castle.upgrade_bonus, getattr(castle, 'last_defense_attack', 0.0),
+            not getattr(castle, 'defense_ready', True), len(castle.garrison)))
+        parts.append(array.array('i', [castle.resources.get(name, 0) for name in RESOURCE_TYPES]).tobytes())
+        parts.append(array.array('B', [UNIT_TYPES.index(unit_type) for unit_type in castle.garrison]).tobytes())
+    
+    # Resources
+    resources = game_state.resource_manager.resources
+    parts.append(_pack_columns(RESOURCE_COLUMNS, [
+        (RESOURCE_TYPES.index(resource.resource_type), resource.x, resource.y, resource.amount, resource.max_amount)
+        for resource in resources]))
+    
+    # Units
+    parts.append(_COUNT.pack(game_state.unit_manager.next_unit_id))
+    units = game_state.unit_manager.units
+    unit_index = {id(unit): index for index, unit in enumerate(units)}
+    rows = []
+    for unit in units:
+        flags = ((FLAG_MOVING if unit.is_moving else 0) |
+                 (FLAG_SELECTED if unit.selected else 0) |
+                 (FLAG_ELITE if getattr(unit, 'is_elite', False) else 0) |
+                 (FLAG_DRAGOON_CAVALRY if getattr(unit, 'is_dragoon_cavalry', False) else 0) |
+                 (FLAG_COMMAND_MODE if unit.command_mode else 0) |
+                 (FLAG_ASLEEP if unit.asleep else 0) |
+                 (FLAG_COOLING if unit.cooling else 0))
+        squad = unit.squad
+        leader = squad.leader if squad is not None and squad.leader is not unit else None
+        slot_x, slot_y = squad.offsets[unit] if leader is not None else (0.0, 0.0)
+        command_target = getattr(unit, 'command_target', None)
+        locked = unit.target_enemy
+        rows.append((
+            unit.unit_id, UNIT_TYPES.index(unit.unit_type), OWNERS.index(unit.owner), flags,
+            unit.x, unit.y, unit.target_x, unit.target_y,
+            int(unit.health), unit.max_health, unit.speed, unit.attack_damage, unit.attack_range,
+            max(0.0, unit.combat_flash), unit.last_attack_time,
+            unit_index.get(id(leader), -1), slot_x, slot_y,
+            castle_index.get(id(command_target), -1),
+            unit_index.get(id(locked), -1), castle_index.get(id(locked), -1)))
+    parts.append(_pack_columns(UNIT_COLUMNS, rows))
+    
+    # Projectiles in flight (shots at units that are already gone keep flying, at nothing)
+    projectiles = game_state.unit_manager.projectiles
+    rows = []
+    for index in range(projectiles.count):
+        target = projectiles.targets[index]
+        target_unit = unit_index.get(id(target), -1)
+        target_castle = castle_index.get(id(target), -1)
+        if target_unit >= 0 and target.unit_id != projectiles.target_ids[index]:
+            target_unit = -1
+        rows.append((
+            int(projectiles.kinds[index]), projectiles.x[index], projectiles.y[index],
+            projectiles.vx[index], projectiles.vy[index], projectiles.remaining[index],
+            projectiles.flight_time[index], int(projectiles.damage[index]), target_unit, target_castle,
+            int(projectiles.owners[index]), projectiles.splash[index]))
+    parts.append(_pack_columns(PROJECTILE_COLUMNS, rows))
+    
+    # AI scheduler: round-robin position and the urgent queue, as unit indices
+    ai_scheduler = game_state.unit_manager.ai_scheduler
+    urgent = [unit_index[id(unit)] for unit in ai_scheduler.urgent if id(unit) in unit_index]
+    parts.append(_COUNT.pack(ai_scheduler.cursor))
+    parts.append(_COUNT.pack(len(urgent)))
+    parts.append(array.array('i', urgent).tobytes())
+    
+    # Influence map as of its last refresh (the AI reads it until the next one)
+    influence = game_state.unit_manager.influence
+    parts.append(_TIMER.pack(influence.timer))
+    parts.append(_COUNT.pack(influence.reach))
+    parts.append(influence.strength.tobytes())
+    parts.append(influence.worth.tobytes())
+    parts.append(game_state.unit_manager.fog.explored.tobytes())
+    
+    # Economy: every worker in hiring order, then the job queue as worker indices
+    economy = game_state.unit_manager.economy
+    resource_index = {id(resource): index for index, resource in enumerate(resources)}
+    workers = list(economy.workers.values())
+    worker_index = {id(worker): index for index, worker in enumerate(workers)}
+    parts.append(_TIMER.pack(economy.timer))
+    parts.append(_pack_columns(WORKER_COLUMNS, [
+        (unit_index[id(worker.unit)], resource_index.get(id(worker.resource), -1), worker.carried,
+         RESOURCE_TYPES.index(worker.carry_type), worker.queued | worker.returning << 1, worker.dest_x, worker.dest_y)
+        for worker in workers]))
+    jobs = [worker_index[id(worker)] for worker in economy.jobs]
+    parts.append(_COUNT.pack(len(jobs)))
+    parts.append(array.array('i', jobs).tobytes())
+    
+    payload = b''.join(parts)
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload, 1)
+        flags |= FLAG_COMPRESSED
+    return _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, flags, len(payload)) + payload
+
+def restore_snapshot(game_state, data):
+    """Replace the running match with one decoded from capture_snapshot() bytes"""
+    magic, version, flags, size = _HEADER.unpack_from(data, 0)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError("Not a Kingdom Heroes snapshot (or an unsupported version)")
+    payload = data[_HEADER.size:_HEADER.size + size]
+    if flags & FLAG_COMPRESSED:
+        payload = zlib.decompress(payload)
+    
+    game_manager = game_state.game_manager
+    camera = game_state.camera
+    offset = 0
+    
+    # Match record and timers
+    (level, game_over, victory, defeat, zoom_index, game_state.sim_tick, game_state.sim_time,
+     income_due, wave_due, game_state.enemy_spawn_interval, game_state.enemy_multiplier,
+     camera_x, camera_y) = _MATCH.unpack_from(payload, offset)
+    offset += _MATCH.size
+    events = game_state.events
+    events.clear()
+    if income_due >= 0:
+        events.at(income_due, game_state.collect_income)
+    if wave_due >= 0:
+        events.at(wave_due, game_state.send_enemy_wave)
+    game_state.game_over, game_state.victory, game_state.defeat = bool(game_over), bool(victory), bool(defeat)
+    game_manager.current_level = level
+    menu_state = getattr(game_manager, 'states', {}).get("menu")
+    if menu_state is not None:
+        game_manager.current_level_info = menu_state.levels.get(level, game_manager.current_level_info)
+    camera.set_zoom_index(zoom_index)
+    camera.x, camera.y = camera_x, camera_y
+    
+    # RNG state
+    words = array.array('I')
+    words.frombytes(payload[offset:offset + 625 * words.itemsize])
+    offset += 625 * words.itemsize
+    rng_version, has_gauss, gauss_next = _RNG_TAIL.unpack_from(payload, offset)
+    offset += _RNG_TAIL.size
+    random.setstate((rng_version, tuple(words), gauss_next if has_gauss else None))
+    
+    # Castles
+    castle_count = _COUNT.unpack_from(payload, offset)[0]
+    offset += _COUNT.size
+    game_state.enemy_castles = []
+    for _ in range(castle_count):
+        (pool_index, x, y, castle_level, health, max_health, castle_size, max_garrison,
+         upgrade_bonus, last_defense_attack, reloading, garrison_size) = _CASTLE.unpack_from(payload, offset)
+        offset += _CASTLE.size
+        castle = game_state.player_castle if pool_index < 0 else game_state.enemy_castle_pool[pool_index]
+        castle.x, castle.y = x, y
+        castle.level, castle.health, castle.max_health = castle_level, health, max_health
+        castle.size, castle.max_garrison, castle.upgrade_bonus = castle_size, max_garrison, upgrade_bonus
+        if hasattr(castle, 'last_defense_attack'):
+            castle.last_defense_attack = last_defense_attack
+            castle.defense_ready = not reloading
+            castle.defense_target = None
+            castle.defense_flash = 0
+            if reloading:
+                events.at(last_defense_attack + castle.defense_cooldown, castle.defense_reloaded)
+        
+        amounts = array.array('i')
+        amounts.frombytes(payload[offset:offset + len(RESOURCE_TYPES) * amounts.itemsize])
+        offset += len(RESOURCE_TYPES) * amounts.itemsize
+        castle.resources = dict(zip(RESOURCE_TYPES, amounts))
+        
+        castle.garrison = [UNIT_TYPES[index] for index in payload[offset:offset + garrison_size]]
+        offset += garrison_size
+        if pool_index >= 0:
+            game_state.enemy_castles.append(castle)
+    castles_by_index = [game_state.player_castle] + game_state.enemy_castle_pool
+    
+    # Resources
+    columns, count, offset = _unpack_columns(RESOURCE_COLUMNS, payload, offset)
+    resource_manager = game_state.resource_manager
+    resource_manager.clear()
+    for resource_type, x, y, amount, max_amount in zip(*(columns[name] for name, _ in RESOURCE_COLUMNS)):
+        resource = Resource(x, y, RESOURCE_TYPES[resource_type], max_amount)
+        resource.amount = amount
+        resource_manager.add(resource)
+    
+    # Units
+    next_unit_id = _COUNT.unpack_from(payload, offset)[0]
+    offset += _COUNT.size
+    columns, count, offset = _unpack_columns(UNIT_COLUMNS, payload, offset)
+    unit_manager = game_state.unit_manager
+    unit_manager.clear()
+    units = []
+    for (unit_id, unit_type, owner, flags, x, y, target_x, target_y, health, max_health, speed,
+         attack_damage, attack_range, combat_flash, last_attack_time, leader, slot_x, slot_y,
+         command_target, lock_unit, lock_castle) in zip(*(columns[name] for name, _ in UNIT_COLUMNS)):
+        unit = unit_manager.pool.acquire(x, y, UNIT_TYPES[unit_type], OWNERS[owner])
+        unit_manager.add_unit(unit, unit_id, watch=False)
+        unit.target_x, unit.target_y = target_x, target_y
+        unit.is_moving = bool(flags & FLAG_MOVING)
+        unit.health, unit.max_health, unit.speed = health, max_health, speed
+        if health <= 0:
+            unit_manager.index.discard(unit)  # Killed in the last combat pass, removed on the next update
+        unit.attack_damage, unit.attack_range = attack_damage, attack_range
+        unit.combat_flash = combat_flash
+        unit.last_attack_time = last_attack_time
+        if flags & FLAG_COOLING:
+            unit.cooling = True
+            events.at(last_attack_time + unit.attack_cooldown, unit.cooldown_ready, unit_id)
+        unit.command_mode = bool(flags & FLAG_COMMAND_MODE)
+        if command_target >= 0:
+            unit.command_target = castles_by_index[command_target]
+        units.append(unit)
+        if flags & FLAG_SELECTED:
+            unit_manager.select_unit(unit)
+    unit_manager.next_unit_id = next_unit_id
+    
+    # Target locks and squads need every unit to exist first
+    for unit, lock_unit, lock_castle in zip(units, columns['lock_unit'], columns['lock_castle']):
+        if lock_unit >= 0:
+            unit.set_target(units[lock_unit])
+        elif lock_castle >= 0:
+            unit.set_target(castles_by_index[lock_castle])
+    for unit, flags, leader, slot_x, slot_y in zip(units, columns['flags'], columns['leader'],
+                                                 columns['slot_x'], columns['slot_y']):
+        if flags & FLAG_ELITE:
+            unit_manager.index.tag(unit, 'elite')
+        unit.is_dragoon_cavalry = bool(flags & FLAG_DRAGOON_CAVALRY)
+        if leader >= 0:
+            squad = units[leader].squad or Squad(units[leader])
+            squad.add(unit, slot_x, slot_y)
+        if flags & FLAG_ASLEEP:
+            unit_manager.dormancy.sleep(unit)
+    
+    # Projectiles in flight
+    columns, count, offset = _unpack_columns(PROJECTILE_COLUMNS, payload, offset)
+    projectiles = unit_manager.projectiles
+    for (kind, x, y, vx, vy, remaining, flight_time, damage, target_unit, target_castle,
+         owner, splash) in zip(*(columns[name] for name, _ in PROJECTILE_COLUMNS)):
+        target = units[target_unit] if target_unit >= 0 else castles_by_index[target_castle] if target_castle >= 0 else None
+        projectiles.restore(kind, x, y, vx, vy, remaining, flight_time, damage, target, owner, splash)
+    
+    # AI scheduler queue
+    ai_scheduler = unit_manager.ai_scheduler
+    ai_scheduler.cursor = _COUNT.unpack_from(payload, offset)[0]
+    offset += _COUNT.size
+    count = _COUNT.unpack_from(payload, offset)[0]
+    offset += _COUNT.size
+    urgent = array.array('i')
+    urgent.frombytes(payload[offset:offset + count * urgent.itemsize])
+    offset += count * urgent.itemsize
+    for index in urgent:
+        ai_scheduler.wake(units[index])
+    
+    # Influence map; field, value and objectives are worked out from strength, reach and worth again
+    influence = unit_manager.influence
+    influence.timer = _TIMER.unpack_from(payload, offset)[0]
+    offset += _TIMER.size
+    influence.reach = _COUNT.unpack_from(payload, offset)[0]
+    offset += _COUNT.size
+    for grid in (influence.strength, influence.worth):
+        grid[...] = np.frombuffer(payload, dtype=grid.dtype, count=grid.size, offset=offset).reshape(grid.shape)
+        offset += grid.nbytes
+    influence.spread()
+    
+    # Fog: the units' sight is stamped in one pass, then the castle's; the explored ground comes back as saved
+    fog = unit_manager.fog
+    fog.look_all([unit for unit in units if unit.owner == "player"])
+    game_state.watch_from_castle()
+    fog.explored[...] = np.frombuffer(payload, dtype=np.uint8, count=fog.explored.size,
+                                      offset=offset).reshape(fog.explored.shape)
+    offset += fog.explored.nbytes
+    
+    # Economy; claims are counted from the workers again
+    economy = unit_manager.economy
+    economy.timer = _TIMER.unpack_from(payload, offset)[0]
+    offset += _TIMER.size
+    columns, count, offset = _unpack_columns(WORKER_COLUMNS, payload, offset)
+    workers = []
+    for unit, resource, carried, carry_type, flags, dest_x, dest_y in zip(*(columns[name] for name, _ in WORKER_COLUMNS)):
+        worker = Worker(units[unit])
+        worker.queued = bool(flags & 1)
+        worker.returning = bool(flags & 2)
+        worker.carried, worker.carry_type = carried, RESOURCE_TYPES[carry_type]
+        worker.dest_x, worker.dest_y = dest_x, dest_y
+        if resource >= 0:
+            worker.resource = resource_manager.resources[resource]
+            economy.claims[worker.resource] = economy.claims.get(worker.resource, 0) + 1
+        economy.workers[worker.unit] = worker
+        workers.append(worker)
+    count = _COUNT.unpack_from(payload, offset)[0]
+    offset += _COUNT.size
+    jobs = array.array('i')
+    jobs.frombytes(payload[offset:offset + count * jobs.itemsize])
+    offset += count * jobs.itemsize
+    economy.jobs.extend(workers[index] for index in jobs)
+    
+    game_state.hud.minimap.clear()
+
+def write_snapshot_file(path, data):
+    """Write bytes atomically: a crash leaves either the old file or the new one"""
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+def read_snapshot_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+class SnapshotWriter:
+    """Writes snapshots to disk on a background thread.
+    
+    The game thread only encodes the snapshot; file I/O happens here. If
+    several saves to the same path queue up, only the newest is written.
+    """
+    
+    def __init__(self):
+        self._latest = {}  # path -> newest bytes not yet written
+        self._lock = threading.Lock()
+        self._wakeup = queue.Queue()
+        self._worker = None
+        self.saves_written = 0
+    
+    def save(self, path, data):
+        with self._lock:
+            already_queued = path in self._latest
+            self._latest[path] = data
+        if not already_queued:
+            self._ensure_worker()
+            self._wakeup.put(path)
+    
+    def flush(self):
+        """Wait until every queued snapshot has been written"""
+        self._wakeup.join()
+    
+    def _ensure_worker(self):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._write_loop, name="snapshot-writer", daemon=True)
+            self._worker.start()
+    
+    def _write_loop(self):
+        while True:
+            path = self._wakeup.get()
+            with self._lock:
+                data = self._latest.pop(path, None)
+            try:
+                if data is not None:
+                    write_snapshot_file(path, data)
+                    self.saves_written += 1
+            except OSError as e:
+                print(f"Could not save snapshot {path}: {e}")
+            finally:
+                self._wakeup.task_done()
\ No newline at end of file
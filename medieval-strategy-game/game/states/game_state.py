@@ -1,57 +1,127 @@
 import pygame
 import random
+import time
 from .base_state import BaseState
 from ..world.map import GameMap
 from ..world.camera import Camera
 from ..world.castle import Castle
 from ..entities.resource import ResourceManager
-from ..entities.unit import UnitManager, Unit
+from ..entities.unit import UnitManager
 from ..ui.hud import HUD
+from ..snapshot import SnapshotWriter, capture_snapshot, restore_snapshot, read_snapshot_file
+from ..replay import InputRecorder, REPLAY_FILE
+from ..scheduler import EventScheduler
+from ..sim_process import SimulationProcess
 
 class GameState(BaseState):
+    # Enemy castle positions, in the order they are added as levels get harder
+    ENEMY_CASTLE_POSITIONS = [(1000, 750), (500, 1250), (1400, 400)]
+    
+    # Match snapshots (see game/snapshot.py)
+    AUTOSAVE_FILE = "autosave.khs"
+    QUICKSAVE_FILE = "quicksave.khs"
+    AUTOSAVE_INTERVAL = 60.0  # Seconds between background autosaves
+    
     def __init__(self, game_manager):
         super().__init__(game_manager)
         
-        # Initialize game world
+        # Initialize game world (kept across level restarts)
         self.game_map = GameMap(50, 50)  # 50x50 tiles (smaller arena)
         self.camera = Camera(self.screen_width, self.screen_height, 
                            self.game_map.world_width, self.game_map.world_height)
         
-        # Initialize player castle
+        # Initialize player castle (upgrades are read from disk once)
         self.player_castle = Castle(200, 150, "player")
         
-        # Initialize enemy castles (scaled by difficulty)
-        level_num = getattr(self.game_manager, 'current_level', 1)
-        if level_num == 1:
-            self.enemy_castles = [Castle(1000, 750, "enemy")]
-        elif level_num == 2:
-            self.enemy_castles = [Castle(1000, 750, "enemy"), Castle(500, 1250, "enemy")]
-        else:
-            self.enemy_castles = [
-                Castle(1000, 750, "enemy"),
-                Castle(500, 1250, "enemy"),
-                Castle(1400, 400, "enemy")
-            ]
+        # Enemy castles are created once and reset for each level
+        self.enemy_castle_pool = [Castle(x, y, "enemy") for x, y in self.ENEMY_CASTLE_POSITIONS]
         
         # Initialize resource manager
         self.resource_manager = ResourceManager(self.game_map)
         
         # Initialize unit manager
         self.unit_manager = UnitManager()
+        self.unit_manager.influence.set_world(self.game_map.world_width, self.game_map.world_height)
+        self.unit_manager.fog.set_world(self.game_map.world_width, self.game_map.world_height)
         
         # Initialize HUD
         self.hud = HUD(self.screen_width, self.screen_height)
+        self.hud.minimap.set_world(self.game_map)
         
         # Game timer for resource generation
-        self.resource_timer = 0
         self.resource_interval = 0.7  # Generate resources every 2 seconds
         
-        # Enemy spawning timer (scaled by difficulty)
-        self.enemy_spawn_timer = 0
-        level_info = getattr(self.game_manager, 'current_level_info', None) or {'spawn_rate': 1.0, 'enemy_mult': 1.0}
+        # Timed events on the simulation clock: attack cooldowns, castle reloads, income, enemy waves
+        self.events = EventScheduler()
+        
+        # First-frame latency after a level start (see GameManager.start_level)
+        self.first_frame_pending = False
+        self.first_frame_latency_ms = None
+        
+        # F3 toggles performance stats (unit pool, GC)
+        self.show_debug = False
+        
+        # Snapshots are encoded here and written to disk on a background thread
+        self.snapshot_writer = SnapshotWriter()
+        
+        # Player commands and tick timings, for headless replays (see game/replay.py)
+        self.recorder = InputRecorder()
+        
+        # --sim-process: the match runs in a worker process and this one only mirrors and draws it
+        # --sim-workers N: unit movement and target search split into regions over N cores
+        sim_workers = getattr(self.game_manager, 'sim_workers', 0)
+        self.sim_process = None
+        if getattr(self.game_manager, 'use_sim_process', False):
+            self.sim_process = SimulationProcess((self.screen_width, self.screen_height), sim_workers)
+            self.recorder.enabled = False  # The worker records the replay
+        elif sim_workers:
+            self.unit_manager.use_regions(sim_workers)
+        
+        self.reset(getattr(self.game_manager, 'current_level_info', None))
+    
+    def reset(self, level_info):
+        """Start a new match, reusing the loaded map, HUD, castles and caches"""
+        # Seed the match so a recording can reproduce it
+        self.match_seed = random.randrange(2**32)
+        random.seed(self.match_seed)
+        
+        # Initialize enemy castles (scaled by difficulty)
+        level_num = getattr(self.game_manager, 'current_level', 1)
+        if level_num == 1:
+            castle_count = 1
+        elif level_num == 2:
+            castle_count = 2
+        else:
+            castle_count = 3
+        self.enemy_castles = self.enemy_castle_pool[:castle_count]
+        for castle in [self.player_castle] + self.enemy_castles:
+            castle.reset()
+        
+        # Fresh units and resources (and fog: only the castle's surroundings are known)
+        self.unit_manager.clear()
+        self.watch_from_castle()
+        self.resource_manager.reset()
+        self.hud.minimap.clear()
+        self.camera.x = 0
+        self.camera.y = 0
+        
+        # Simulation clock (advanced only by simulate(), so replays match)
+        self.sim_tick = 0
+        self.sim_time = 0.0
+        
+        # Background autosave timer (wall clock, not part of the simulation)
+        self.autosave_timer = 0
+        
+        # Enemy spawning (scaled by difficulty)
+        level_info = level_info or {'spawn_rate': 1.0, 'enemy_mult': 1.0}
         self.enemy_spawn_interval = 25.0 * level_info['spawn_rate']  # Spawn enemy units (faster = lower interval)
         self.enemy_multiplier = level_info['enemy_mult']
         
+        # Income and enemy waves reschedule themselves from here on
+        self.events.clear()
+        self.events.at(self.resource_interval, self.collect_income)
+        self.events.at(self.enemy_spawn_interval, self.send_enemy_wave)
+        
         # Game state
         self.game_over = False
         self.victory = False
@@ -62,17 +132,37 @@ class GameState(BaseState):
         self.selecting_units = False
         self.selection_rect = None
         self.move_target = None
+        
+        self.first_frame_pending = True
+        self.recorder.start(self, self.match_seed)
+        if self.sim_process:
+            self.sim_process.reset(level_num, level_info)
+    
+    def exit(self):
+        self.save_replay()
+        if self.sim_process:
+            self.sim_process.pause()
     
     def handle_event(self, event):
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_ESCAPE:
                 self.game_manager.change_state("menu")
+            elif event.key in (pygame.K_EQUALS, pygame.K_PLUS, pygame.K_KP_PLUS):
+                self.camera.zoom_by(1)
+            elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                self.camera.zoom_by(-1)
+            elif event.key == pygame.K_F5:
+                self.save_snapshot(self.QUICKSAVE_FILE)
+            elif event.key == pygame.K_F9:
+                self.load_snapshot(self.QUICKSAVE_FILE)
+            elif event.key == pygame.K_F3:
+                self.show_debug = not self.show_debug
             elif event.key == pygame.K_f:
                 # Move selected units to mouse position
                 if self.unit_manager.selected_units:
                     mouse_x, mouse_y = pygame.mouse.get_pos()
                     world_x, world_y = self.camera.screen_to_world(mouse_x, mouse_y)
-                    self.unit_manager.move_selected_units(world_x, world_y)
+                    self.move_selected_units(world_x, world_y)
                     self.move_target = (world_x, world_y)
         
         elif event.type == pygame.MOUSEBUTTONDOWN:
@@ -80,9 +170,7 @@ class GameState(BaseState):
                 mouse_x, mouse_y = event.pos
                 
                 # Check if clicking on HUD
-                current_level = getattr(self.game_manager, 'current_level', 1)
-                if self.hud.handle_click(mouse_x, mouse_y, self.player_castle, self.unit_manager, current_level, 
-                                       self.enemy_castles, self.unit_manager.selected_units):
+                if self.click_hud(mouse_x, mouse_y):
                     return
                 
                 # Convert screen coordinates to world coordinates
@@ -102,6 +190,10 @@ class GameState(BaseState):
             
             # Right click functionality removed - now using F key for movement
         
+        elif event.type == pygame.MOUSEWHEEL:
+            # Zoom around the mouse cursor
+            self.camera.zoom_by(event.y, pygame.mouse.get_pos())
+        
         elif event.type == pygame.MOUSEBUTTONUP:
             if event.button == 1:  # Left click release
                 if self.selecting_units:
@@ -129,94 +221,179 @@ class GameState(BaseState):
                 for unit in self.unit_manager.units:
                     if unit.owner == "player":
                         unit_screen_x, unit_screen_y = self.camera.world_to_screen(unit.x, unit.y)
-                        unit_screen_rect = pygame.Rect(unit_screen_x, unit_screen_y, unit.size, unit.size)
+                        unit_screen_size = unit.size * self.camera.zoom
+                        unit_screen_rect = pygame.Rect(unit_screen_x, unit_screen_y, unit_screen_size, unit_screen_size)
                         if self.selection_rect.colliderect(unit_screen_rect):
                             self.unit_manager.select_unit(unit)
     
+    def move_selected_units(self, world_x, world_y):
+        """Order the selected units to move (recorded for replays)"""
+        self.recorder.record_selection(self.unit_manager.selected_units)
+        self.recorder.record_move(world_x, world_y)
+        if self.sim_process:
+            self.sim_process.select(self.unit_manager.selected_units)
+            self.sim_process.move(world_x, world_y)
+            return
+        self.unit_manager.move_selected_units(world_x, world_y)
+    
+    def click_hud(self, mouse_x, mouse_y):
+        """Pass a click to the HUD (recruit, upgrade, ATTACK!, minimap); True if it was used"""
+        if self.sim_process and self.hud.button_at(mouse_x, mouse_y):
+            # Buttons change the match, so the worker handles them
+            self.sim_process.select(self.unit_manager.selected_units)
+            self.sim_process.click(mouse_x, mouse_y)
+            return True
+        self.recorder.record_selection(self.unit_manager.selected_units)
+        current_level = getattr(self.game_manager, 'current_level', 1)
+        handled = self.hud.handle_click(mouse_x, mouse_y, self.player_castle, self.unit_manager, current_level,
+                                        self.enemy_castles, self.unit_manager.selected_units, self.camera)
+        if handled:
+            self.recorder.record_click(mouse_x, mouse_y)
+        return handled
+    
     def update(self, dt):
         # Update camera
         self.camera.update(dt)
         
+        # Advance the match (or show the worker's latest frame)
+        if self.sim_process:
+            if self.sim_process.sync(self):
+                self._check_game_over()
+            self.unit_manager.trails.update(dt, self.unit_manager.units)
+            self.unit_manager.fog.follow(self.unit_manager.get_units_by_owner("player"))
+        else:
+            self.simulate(dt)
+        
+        # Autosave in the background while the match is running
+        if not self.game_over and not self.sim_process:
+            self.autosave_timer += dt
+            if self.autosave_timer >= self.AUTOSAVE_INTERVAL:
+                self.autosave_timer = 0
+                self.save_snapshot(self.AUTOSAVE_FILE)
+        
+        # Refresh minimap markers (throttled internally)
+        self.hud.minimap.update(dt, self.unit_manager.units, [self.player_castle] + self.enemy_castles,
+                                self.resource_manager.resources, self.unit_manager.fog)
+    
+    def simulate(self, dt):
+        """Advance the match by one tick: no camera, input or drawing, so replays can run headless"""
+        self.sim_time += dt
+        
+        # Timed events now due: cooldowns and reloads end, income arrives, enemy waves spawn
+        self.events.run(self.sim_time)
+        
         # Update resource manager
         self.resource_manager.update(dt)
         
         # Update unit manager
         self.unit_manager.update(dt, self.player_castle, self.enemy_castles)
         
+        # Peasants harvest, carry home and take new jobs (one batch every economy interval)
+        self.unit_manager.economy.update(dt, self.player_castle, self.resource_manager)
+        
         # Update castle defense system
+        castle = self.player_castle
         enemy_units = self.unit_manager.get_units_by_owner("enemy")
-        self.player_castle.update_defense(dt, enemy_units)
-        
-        # Generate resources periodically
-        self.resource_timer += dt
-        if self.resource_timer >= self.resource_interval:
-            self.resource_timer = 0
-            # Add resources to player castle
-            self.player_castle.add_resources('gold', 5)
-            self.player_castle.add_resources('food', 3)
-            self.player_castle.add_resources('wood', 2)
-            self.player_castle.add_resources('stone', 1)
-        
-        # Spawn enemy units periodically (only if game is not over)
-        if not self.game_over:
-            self.enemy_spawn_timer += dt
-            if self.enemy_spawn_timer >= self.enemy_spawn_interval:
-                self.enemy_spawn_timer = 0
-                self._spawn_enemy_units()
+        if castle.update_defense(dt, enemy_units, self.sim_time, self.unit_manager.projectiles):
+            self.events.at(castle.last_defense_attack + castle.defense_cooldown, castle.defense_reloaded)
+        
+        # Shots in flight move and land (siege shots and bolts splash nearby enemies)
+        self.unit_manager.projectiles.update(dt, self.unit_manager.area_damage,
+                                             [self.player_castle] + self.enemy_castles)
         
         # Simple combat system
         self._handle_combat()
         
         # Check for game over conditions
         self._check_game_over()
+        
+        self.sim_tick += 1
+        self.recorder.record_tick(self, dt)
     
-    def _handle_combat(self):
-        # Simple combat between player and enemy units
-        player_units = self.unit_manager.get_units_by_owner("player")
-        enemy_units = self.unit_manager.get_units_by_owner("enemy")
+    def watch_from_castle(self):
+        """The player castle sees as far as its defenses reach"""
+        castle = self.player_castle
+        self.unit_manager.fog.look(castle, castle.x + castle.size // 2, castle.y + castle.size // 2, castle.defense_range)
+    
+    def collect_income(self):
+        """Scheduled every resource_interval: add resources to the player castle"""
+        self.player_castle.add_resources('gold', 5)
+        self.player_castle.add_resources('food', 3)
+        self.player_castle.add_resources('wood', 2)
+        self.player_castle.add_resources('stone', 1)
+        self.events.at(self.sim_time + self.resource_interval, self.collect_income)
+    
+    def send_enemy_wave(self):
+        """Scheduled every enemy_spawn_interval until the game is over"""
+        if self.game_over:
+            return
+        self._spawn_enemy_units()
+        self.events.at(self.sim_time + self.enemy_spawn_interval, self.send_enemy_wave)
+    
+    def save_snapshot(self, path):
+        """Encode the match now and write it to disk in the background"""
+        if self.sim_process:
+            self.sim_process.save(path)
+            return
+        start = time.perf_counter()
+        data = capture_snapshot(self)
+        self.snapshot_writer.save(path, data)
+        print(f"Saved {path}: {len(self.unit_manager.units)} units, {len(data)} bytes "
+              f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+    
+    def load_snapshot(self, path):
+        """Replace the running match with a saved one"""
+        if self.sim_process:
+            self.sim_process.load(path)
+            self.game_over = self.victory = self.defeat = False
+            self.move_target = None
+            return True
+        try:
+            # Make sure a save still being written is the one we read
+            self.snapshot_writer.flush()
+            start = time.perf_counter()
+            restore_snapshot(self, read_snapshot_file(path))
+        except FileNotFoundError:
+            print(f"No saved game at {path}")
+            return False
+        except Exception as e:
+            print(f"Could not load {path}: {e}")
+            return False
+        
+        # Clear transient input state from before the load
+        self.mouse_drag_start = None
+        self.selecting_units = False
+        self.selection_rect = None
+        self.move_target = None
+        print(f"Loaded {path}: {len(self.unit_manager.units)} units in {(time.perf_counter() - start) * 1000:.1f} ms")
         
-        # Player units attack nearby enemies and enemy castles
-        for player_unit in player_units:
-            attacked = False
-            # Attack enemy units first
-            for enemy_unit in enemy_units:
-                distance = ((player_unit.x - enemy_unit.x)**2 + (player_unit.y - enemy_unit.y)**2)**0.5
-                if distance <= player_unit.attack_range:
-                    player_unit.attack(enemy_unit)
-                    attacked = True
-                    break
-            
-            # If no enemy units in range, attack enemy castles
-            if not attacked:
-                for enemy_castle in self.enemy_castles:
-                    if enemy_castle.is_alive():
-                        # Calculate distance to castle center
-                        castle_center_x = enemy_castle.x + enemy_castle.size // 2
-                        castle_center_y = enemy_castle.y + enemy_castle.size // 2
-                        distance = ((player_unit.x - castle_center_x)**2 + (player_unit.y - castle_center_y)**2)**0.5
-                        if distance <= player_unit.attack_range:
-                            player_unit.attack(enemy_castle)
-                            break
-        
-        # Enemy units prioritize attacking player castle
-        for enemy_unit in enemy_units:
-            attacked = False
-            # Attack player castle first if in range
-            if self.player_castle.is_alive():
-                castle_center_x = self.player_castle.x + self.player_castle.size // 2
-                castle_center_y = self.player_castle.y + self.player_castle.size // 2
-                distance = ((enemy_unit.x - castle_center_x)**2 + (enemy_unit.y - castle_center_y)**2)**0.5
-                if distance <= enemy_unit.attack_range:
-                    enemy_unit.attack(self.player_castle)
-                    attacked = True
-            
-            # If castle not in range, attack player units
-            if not attacked:
-                for player_unit in player_units:
-                    distance = ((enemy_unit.x - player_unit.x)**2 + (enemy_unit.y - player_unit.y)**2)**0.5
-                    if distance <= enemy_unit.attack_range:
-                        enemy_unit.attack(player_unit)
-                        break
+        # Recordings start over from the loaded match
+        self.recorder.start(self, self.match_seed)
+        return True
+    
+    def save_replay(self, path=REPLAY_FILE):
+        """Write the recording of this match in the background"""
+        if self.sim_process:
+            self.sim_process.save_replay()
+            return
+        if self.recorder.enabled and self.recorder.log and self.recorder.log.ticks:
+            self.snapshot_writer.save(path, self.recorder.log.encode())
+    
+    def _handle_combat(self):
+        # Simple combat between player and enemy units: each unit hits its locked
+        # target, or locks onto the nearest one in range (see UnitManager.combat_target)
+        unit_manager = self.unit_manager
+        projectiles = unit_manager.projectiles
+        
+        # Player units first, then enemy units; units still cooling down sit out until their ready event
+        events = self.events
+        for owner in ("player", "enemy"):
+            for unit in unit_manager.get_awake_units_by_owner(owner):
+                if unit.cooling or unit.asleep or unit.health <= 0:
+                    continue
+                target = unit_manager.combat_target(unit, self.player_castle, self.enemy_castles)
+                if target is not None and unit.attack(target, self.sim_time, projectiles):
+                    events.at(unit.last_attack_time + unit.attack_cooldown, unit.cooldown_ready, unit.unit_id)
     
     def render(self):
         # Clear screen
@@ -228,13 +405,16 @@ class GameState(BaseState):
         # Render resources
         self.resource_manager.render(self.screen, self.camera)
         
-        # Render castles
+        # Render castles (enemy castles once the player has found them)
+        fog = self.unit_manager.fog
         self.player_castle.render(self.screen, self.camera)
         for castle in self.enemy_castles:
-            castle.render(self.screen, self.camera)
+            if fog.is_explored(castle.x + castle.size // 2, castle.y + castle.size // 2):
+                castle.render(self.screen, self.camera)
         
-        # Render units
+        # Render units (enemy units only where the player can see), then the fog over everything
         self.unit_manager.render(self.screen, self.camera)
+        fog.render(self.screen, self.camera)
         
         # Render selection rectangle
         if self.selection_rect:
@@ -242,7 +422,8 @@ class GameState(BaseState):
         
         # Render HUD
         current_level = getattr(self.game_manager, 'current_level', 1)
-        self.hud.render(self.screen, self.player_castle, self.unit_manager.selected_units, self.camera, current_level)
+        self.hud.render(self.screen, self.player_castle, self.unit_manager.selected_units, self.camera, current_level,
+                        self.unit_manager.get_selected_commanders())
         
         # Render instructions and level info
         font = pygame.font.Font(None, 24)
@@ -250,6 +431,7 @@ class GameState(BaseState):
         instructions = [
             f"Level {getattr(self.game_manager, 'current_level', 1)}: {level_info['name']}",
             "WASD/Arrow Keys: Move Camera",
+            "Mouse Wheel or +/-: Zoom",
             "Left Click: Select Units",
             "F Key: Move Units",
             "ESC: Return to Menu"
@@ -259,14 +441,45 @@ class GameState(BaseState):
             text = font.render(instruction, True, (255, 255, 255))
             self.screen.blit(text, (10, 10 + i * 25))
         
+        # Performance stats
+        if self.show_debug:
+            pool = self.unit_manager.pool.stats()
+            ai_scheduler = self.unit_manager.ai_scheduler
+            debug_text = (f"Units: {len(self.unit_manager.units)} ({len(self.unit_manager.dormancy.active)} awake)  Pool hit rate: {pool['hit_rate']:.0%} "
+                          f"({pool['pooled']} pooled)  GC collections: {'/'.join(map(str, pool['gc_collections']))}  "
+                          f"AI: {ai_scheduler.last_steps} evals in {ai_scheduler.last_ms:.2f} ms")
+            if self.unit_manager.regions is not None:
+                debug_text += f"  Regions: {self.unit_manager.regions.regions} in {self.unit_manager.regions.last_ms:.2f} ms"
+            if self.sim_process:
+                debug_text = (f"Units: {len(self.unit_manager.units)}  Simulation process: tick {self.sim_process.sim_tick} "
+                              f"in {self.sim_process.tick_ms:.2f} ms")
+            text = font.render(debug_text, True, (255, 255, 0))
+            self.screen.blit(text, (10, 10 + len(instructions) * 25))
+        
         # Render game over messages
         if self.game_over:
             self._render_game_over_message()
+        
+        # Report how long the level took to show up after it was started
+        if self.first_frame_pending:
+            self.first_frame_pending = False
+            start_time = getattr(self.game_manager, 'level_start_time', None)
+            if start_time is not None:
+                self.first_frame_latency_ms = (time.perf_counter() - start_time) * 1000
+                print(f"Level {getattr(self.game_manager, 'current_level', 1)} first frame: {self.first_frame_latency_ms:.1f} ms")
     
     def _spawn_enemy_units(self):
-        # Spawn enemy units from random enemy castles
+        # Spawn enemy units from a random enemy castle the player is not besieging (influence map), so
+        # the wave can form up and march; if every castle is under attack, the least pressed one
         if self.enemy_castles:
-            spawn_castle = random.choice(self.enemy_castles)
+            influence = self.unit_manager.influence
+            pressure = [influence.threat("enemy", castle.x + castle.size // 2, castle.y + castle.size // 2)
+                        for castle in self.enemy_castles]
+            quiet = [castle for castle, threat in zip(self.enemy_castles, pressure) if threat == 0]
+            if quiet:
+                spawn_castle = random.choice(quiet)
+            else:
+                spawn_castle = self.enemy_castles[pressure.index(min(pressure))]
             
             # Choose random unit type (include musket at level 5+, cannon at level 6+, battalion at level 10+, giant at level 21+)
             unit_types = ['peasant', 'knight', 'archer', 'cavalry']
@@ -291,12 +504,11 @@ class GameState(BaseState):
                 spawn_y = spawn_castle.y + offset_y
                 
                 # Create and add enemy unit (apply difficulty scaling)
-                enemy_unit = Unit(spawn_x, spawn_y, unit_type, "enemy")
+                enemy_unit = self.unit_manager.spawn_unit(spawn_x, spawn_y, unit_type, "enemy")
                 # Apply additional difficulty scaling
                 enemy_unit.health = int(enemy_unit.health * self.enemy_multiplier)
                 enemy_unit.max_health = int(enemy_unit.max_health * self.enemy_multiplier)
                 enemy_unit.attack_damage = int(enemy_unit.attack_damage * self.enemy_multiplier)
-                self.unit_manager.add_unit(enemy_unit)
                 
                 # Special handling for enemy battalions - spawn knights
                 if unit_type == 'battalion':
@@ -0,0 +1,47 @@
+import pygame
+from .base_state import BaseState
+
+class LoadingState(BaseState):
+    """Shows a progress bar while the asset loader decodes startup images"""
+    
+    def __init__(self, game_manager, next_state="menu"):
+        super().__init__(game_manager)
+        self.next_state = next_state
+        self.title_text = pygame.font.Font(None, 74).render("Kingdom Heroes", True, (255, 215, 0))
+        self.font = pygame.font.Font(None, 32)
+        self.time = 0
+        
+        # Progress bar
+        bar_width = 500
+        self.bar_rect = pygame.Rect((self.screen_width - bar_width) // 2, self.screen_height // 2 + 40, bar_width, 24)
+    
+    def handle_event(self, event):
+        pass
+    
+    def update(self, dt):
+        self.time += dt
+        assets = self.game_manager.assets
+        
+        # Convert whatever finished decoding on the worker threads
+        assets.finish_ready(budget_ms=8.0)
+        if assets.is_done("startup"):
+            self.game_manager.change_state(self.next_state)
+    
+    def render(self):
+        self.screen.fill((10, 20, 40))
+        
+        title_rect = self.title_text.get_rect(center=(self.screen_width // 2, self.screen_height // 2 - 60))
+        self.screen.blit(self.title_text, title_rect)
+        
+        # Loading message with animated dots
+        dots = "." * (int(self.time * 3) % 4)
+        text = self.font.render(f"Loading{dots}", True, (255, 255, 255))
+        self.screen.blit(text, text.get_rect(midleft=(self.bar_rect.x, self.bar_rect.y - 20)))
+        
+        # Progress bar
+        progress = self.game_manager.assets.progress("startup")
+        pygame.draw.rect(self.screen, (60, 60, 60), self.bar_rect)
+        fill_rect = self.bar_rect.copy()
+        fill_rect.width = int(self.bar_rect.width * progress)
+        pygame.draw.rect(self.screen, (255, 215, 0), fill_rect)
+        pygame.draw.rect(self.screen, (255, 255, 255), self.bar_rect, 2)
\ No newline at end of file
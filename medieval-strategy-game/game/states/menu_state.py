@@ -2,6 +2,42 @@ import pygame
 import math
 import random
 from .base_state import BaseState
+from ..ui.sprite_cache import sprite_cache
+
+# Level definitions (30 levels total); enemy_mult and spawn_rate are tuned with
+# python -m game.balance
+LEVELS = {
+    1: {'name': 'Novice Knight', 'description': 'Learn the basics of warfare', 'enemy_mult': 1.0, 'spawn_rate': 1.0},
+    2: {'name': 'Skilled Warrior', 'description': 'Face stronger opposition', 'enemy_mult': 1.3, 'spawn_rate': 0.9},
+    3: {'name': 'Veteran Commander', 'description': 'Multiple enemy castles', 'enemy_mult': 1.6, 'spawn_rate': 0.8},
+    4: {'name': 'Master Tactician', 'description': 'Elite enemy forces', 'enemy_mult': 2.0, 'spawn_rate': 0.7},
+    5: {'name': 'Legendary Conqueror', 'description': 'Musket unlocked', 'enemy_mult': 2.5, 'spawn_rate': 0.6},
+    6: {'name': 'Artillery Master', 'description': 'Cannon unlocked', 'enemy_mult': 3.0, 'spawn_rate': 0.5},
+    7: {'name': 'Fortress Breaker', 'description': 'Heavily fortified enemies', 'enemy_mult': 3.5, 'spawn_rate': 0.45},
+    8: {'name': 'War Machine', 'description': 'Endless enemy waves', 'enemy_mult': 4.0, 'spawn_rate': 0.4},
+    9: {'name': 'Battle Hardened', 'description': 'Elite enemy commanders', 'enemy_mult': 4.5, 'spawn_rate': 0.35},
+    10: {'name': 'Iron Fist', 'description': 'Massive enemy armies', 'enemy_mult': 5.0, 'spawn_rate': 0.3},
+    11: {'name': 'Storm Bringer', 'description': 'Lightning fast enemies', 'enemy_mult': 5.5, 'spawn_rate': 0.28},
+    12: {'name': 'Castle Crusher', 'description': 'Enemy siege weapons', 'enemy_mult': 6.0, 'spawn_rate': 0.26},
+    13: {'name': 'Lord of War', 'description': 'Multiple enemy fronts', 'enemy_mult': 6.5, 'spawn_rate': 0.24},
+    14: {'name': 'Death Dealer', 'description': 'Overwhelming odds', 'enemy_mult': 7.0, 'spawn_rate': 0.22},
+    15: {'name': 'Apex Predator', 'description': 'Elite death squads', 'enemy_mult': 7.5, 'spawn_rate': 0.2},
+    16: {'name': 'Nightmare Lord', 'description': 'Relentless assault', 'enemy_mult': 8.0, 'spawn_rate': 0.18},
+    17: {'name': 'Demon Slayer', 'description': 'Supernatural enemies', 'enemy_mult': 8.5, 'spawn_rate': 0.16},
+    18: {'name': 'God of War', 'description': 'Divine intervention needed', 'enemy_mult': 9.0, 'spawn_rate': 0.14},
+    19: {'name': 'World Ender', 'description': 'Reality bending enemies', 'enemy_mult': 9.5, 'spawn_rate': 0.12},
+    20: {'name': 'Omnipotent Ruler', 'description': 'Ultimate challenge', 'enemy_mult': 10.0, 'spawn_rate': 0.7},
+    21: {'name': 'Giant Battle', 'description': 'Giant unlocked', 'enemy_mult': 10.5, 'spawn_rate': 0.5},
+    22: {'name': 'Titan Clash', 'description': 'Colossal warfare', 'enemy_mult': 11.0, 'spawn_rate': 0.45},
+    23: {'name': 'Behemoth Rising', 'description': 'Massive creatures emerge', 'enemy_mult': 11.5, 'spawn_rate': 0.4},
+    24: {'name': 'Leviathan War', 'description': 'Sea monsters join battle', 'enemy_mult': 12.0, 'spawn_rate': 0.35},
+    25: {'name': 'Kraken Storm', 'description': 'Tentacled terror', 'enemy_mult': 12.5, 'spawn_rate': 0.3},
+    26: {'name': 'Dragon Emperor', 'description': 'Ancient wyrms awaken', 'enemy_mult': 13.0, 'spawn_rate': 0.25},
+    27: {'name': 'Phoenix Apocalypse', 'description': 'Eternal flame enemies', 'enemy_mult': 13.5, 'spawn_rate': 0.2},
+    28: {'name': 'Cosmic Overlord', 'description': 'Stellar domination', 'enemy_mult': 14.0, 'spawn_rate': 0.15},
+    29: {'name': 'Void Master', 'description': 'Reality-warping foes', 'enemy_mult': 14.5, 'spawn_rate': 0.1},
+    30: {'name': 'Ultimate Conqueror', 'description': 'Final challenge awaits', 'enemy_mult': 15.0, 'spawn_rate': 0.05}
+}
 
 class MenuState(BaseState):
     def __init__(self, game_manager):
@@ -26,39 +62,8 @@ class MenuState(BaseState):
             'description': pygame.font.Font(None, 24)
         }
         
-        # Level definitions (21 levels total)
-        self.levels = {
-            1: {'name': 'Novice Knight', 'description': 'Learn the basics of warfare', 'enemy_mult': 1.0, 'spawn_rate': 1.0},
-            2: {'name': 'Skilled Warrior', 'description': 'Face stronger opposition', 'enemy_mult': 1.3, 'spawn_rate': 0.9},
-            3: {'name': 'Veteran Commander', 'description': 'Multiple enemy castles', 'enemy_mult': 1.6, 'spawn_rate': 0.8},
-            4: {'name': 'Master Tactician', 'description': 'Elite enemy forces', 'enemy_mult': 2.0, 'spawn_rate': 0.7},
-            5: {'name': 'Legendary Conqueror', 'description': 'Musket unlocked', 'enemy_mult': 2.5, 'spawn_rate': 0.6},
-            6: {'name': 'Artillery Master', 'description': 'Cannon unlocked', 'enemy_mult': 3.0, 'spawn_rate': 0.5},
-            7: {'name': 'Fortress Breaker', 'description': 'Heavily fortified enemies', 'enemy_mult': 3.5, 'spawn_rate': 0.45},
-            8: {'name': 'War Machine', 'description': 'Endless enemy waves', 'enemy_mult': 4.0, 'spawn_rate': 0.4},
-            9: {'name': 'Battle Hardened', 'description': 'Elite enemy commanders', 'enemy_mult': 4.5, 'spawn_rate': 0.35},
-            10: {'name': 'Iron Fist', 'description': 'Massive enemy armies', 'enemy_mult': 5.0, 'spawn_rate': 0.3},
-            11: {'name': 'Storm Bringer', 'description': 'Lightning fast enemies', 'enemy_mult': 5.5, 'spawn_rate': 0.28},
-            12: {'name': 'Castle Crusher', 'description': 'Enemy siege weapons', 'enemy_mult': 6.0, 'spawn_rate': 0.26},
-            13: {'name': 'Lord of War', 'description': 'Multiple enemy fronts', 'enemy_mult': 6.5, 'spawn_rate': 0.24},
-            14: {'name': 'Death Dealer', 'description': 'Overwhelming odds', 'enemy_mult': 7.0, 'spawn_rate': 0.22},
-            15: {'name': 'Apex Predator', 'description': 'Elite death squads', 'enemy_mult': 7.5, 'spawn_rate': 0.2},
-            16: {'name': 'Nightmare Lord', 'description': 'Relentless assault', 'enemy_mult': 8.0, 'spawn_rate': 0.18},
-            17: {'name': 'Demon Slayer', 'description': 'Supernatural enemies', 'enemy_mult': 8.5, 'spawn_rate': 0.16},
-            18: {'name': 'God of War', 'description': 'Divine intervention needed', 'enemy_mult': 9.0, 'spawn_rate': 0.14},
-            19: {'name': 'World Ender', 'description': 'Reality bending enemies', 'enemy_mult': 9.5, 'spawn_rate': 0.12},
-            20: {'name': 'Omnipotent Ruler', 'description': 'Ultimate challenge', 'enemy_mult': 10.0, 'spawn_rate': 0.7},
-            21: {'name': 'Giant Battle', 'description': 'Giant unlocked', 'enemy_mult': 10.5, 'spawn_rate': 0.5},
-            22: {'name': 'Titan Clash', 'description': 'Colossal warfare', 'enemy_mult': 11.0, 'spawn_rate': 0.45},
-            23: {'name': 'Behemoth Rising', 'description': 'Massive creatures emerge', 'enemy_mult': 11.5, 'spawn_rate': 0.4},
-            24: {'name': 'Leviathan War', 'description': 'Sea monsters join battle', 'enemy_mult': 12.0, 'spawn_rate': 0.35},
-            25: {'name': 'Kraken Storm', 'description': 'Tentacled terror', 'enemy_mult': 12.5, 'spawn_rate': 0.3},
-            26: {'name': 'Dragon Emperor', 'description': 'Ancient wyrms awaken', 'enemy_mult': 13.0, 'spawn_rate': 0.25},
-            27: {'name': 'Phoenix Apocalypse', 'description': 'Eternal flame enemies', 'enemy_mult': 13.5, 'spawn_rate': 0.2},
-            28: {'name': 'Cosmic Overlord', 'description': 'Stellar domination', 'enemy_mult': 14.0, 'spawn_rate': 0.15},
-            29: {'name': 'Void Master', 'description': 'Reality-warping foes', 'enemy_mult': 14.5, 'spawn_rate': 0.1},
-            30: {'name': 'Ultimate Conqueror', 'description': 'Final challenge awaits', 'enemy_mult': 15.0, 'spawn_rate': 0.05}
-    }
+        # Level definitions
+        self.levels = LEVELS
 
 
         
@@ -74,12 +79,16 @@ class MenuState(BaseState):
             [(600, 520), (640, 420), (680, 520)]
         ]
         #### add image of castle to menu
-        self.castle_image = pygame.image.load("/Users/joegentsch/PycharmProjects/vibe_coding_copy/teddy_project/teddy_project_2/medieval-strategy-game/game/ui/images/menubackground.jpeg").convert_alpha()
-        self.castle_image = pygame.transform.scale(self.castle_image, (self.screen_width, self.screen_height))  # Resize as needed
-        #self.castle_image = pygame.transform.scale(self.castle_image, (200, 150))  # Resize as needed
+        # Decoded and scaled by the asset loader; picked up once it is ready
+        self.castle_image = None
         self.castle_pos = (self.screen_width // 1000, self.screen_height // 1000 )  # Adjust position
         #self.castle_pos = (self.screen_width // 2 - 100, self.screen_height // 2 - 200)  # Adjust position
 
+    
+    def enter(self):
+        # The loading screen only hands over once the background is decoded
+        if self.castle_image is None:
+            self.castle_image = sprite_cache.get_image("menubackground.jpeg", (self.screen_width, self.screen_height))
         
     def init_particles(self):
         for _ in range(50):
@@ -128,6 +137,9 @@ class MenuState(BaseState):
     def update(self, dt):
         self.time += dt
         
+        # Keep converting level assets that finish decoding in the background
+        self.game_manager.assets.finish_ready()
+        
         # Update particles
         for particle in self.particles:
             particle['y'] -= particle['speed']
@@ -161,7 +173,8 @@ class MenuState(BaseState):
                 pygame.draw.polygon(self.screen, (200, 200, 220), snow_points)
 
         #Make castle
-        self.screen.blit(self.castle_image, self.castle_pos) ### JOE ADDED HERE
+        if self.castle_image:
+            self.screen.blit(self.castle_image, self.castle_pos) ### JOE ADDED HERE
         
         # Draw castle silhouette
         for i in range(len(self.castle_points) - 1):
@@ -0,0 +1,97 @@
+import pygame
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Unit sprites, loaded at the size units are drawn with
+UNIT_IMAGE_TYPES = ('peasant', 'knight', 'archer', 'cavalry', 'catapult', 'musket',
+                    'cannon', 'battalion', 'dragoons', 'commander', 'giant')
+UNIT_IMAGE_SIZE = (48, 48)
+CASTLE_IMAGE_SIZE = (128, 128)
+
+class AssetLoader:
+    """Decodes images on a thread pool and hands them to the sprite cache.
+    
+    Decoding and scaling run on worker threads; converting to the display
+    format touches the display, so it happens on the main thread in
+    finish_ready(), a few images per frame.
+    """
+    
+    def __init__(self, sprite_cache, max_workers=None):
+        self.sprite_cache = sprite_cache
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or min(4, os.cpu_count() or 1),
+                                           thread_name_prefix="asset-loader")
+        self.futures = {}  # (filename, size) -> future still waiting for the main thread
+        self.groups = {}   # (filename, size) -> group name
+        self.finished = set()
+    
+    def queue_game_assets(self, screen_width, screen_height):
+        """Queue everything the menu and a level need.
+        
+        The "startup" group is what the loading screen waits for; the "menu"
+        group keeps decoding while the player picks a level.
+        """
+        self.queue("menubackground.jpeg", (screen_width, screen_height), "startup")
+        self.queue("level_1_field.JPEG", None, "startup")
+        self.queue("your_castle.jpeg", CASTLE_IMAGE_SIZE, "startup")
+        self.queue("enemy_castle.jpeg", CASTLE_IMAGE_SIZE, "startup")
+        for unit_type in UNIT_IMAGE_TYPES:
+            self.queue(f"{unit_type}.jpeg", UNIT_IMAGE_SIZE, "menu")
+    
+    def queue(self, filename, size=None, group="startup"):
+        key = (filename, size)
+        if key in self.groups or self.sprite_cache.has_image(filename, size):
+            return
+        path = os.path.join(self.sprite_cache.images_dir, filename)
+        self.groups[key] = group
+        self.futures[key] = self.executor.submit(_decode_image, path, size)
+    
+    def progress(self, group=None):
+        """Fraction of queued images (optionally in one group) that are ready to use"""
+        keys = [key for key, key_group in self.groups.items() if group is None or key_group == group]
+        if not keys:
+            return 1.0
+        return sum(1 for key in keys if key in self.finished) / len(keys)
+    
+    def is_done(self, group=None):
+        return self.progress(group) >= 1.0
+    
+    def finish_ready(self, budget_ms=4.0):
+        """Convert decoded images to the display format, spending at most budget_ms"""
+        start = time.perf_counter()
+        for key, future in list(self.futures.items()):
+            if not future.done():
+                continue
+            self._finish(key, future)
+            if (time.perf_counter() - start) * 1000 >= budget_ms:
+                break
+    
+    def finish_all(self):
+        """Block until every queued image is decoded and converted"""
+        for key, future in list(self.futures.items()):
+            self._finish(key, future)
+    
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _finish(self, key, future):
+        filename, size = key
+        try:
+            image = future.result()
+        except (pygame.error, FileNotFoundError) as e:
+            print(f"Could not load image {filename}: {e}")
+            image = None
+        
+        if image is not None and pygame.display.get_surface() is not None:
+            image = image.convert()
+        self.sprite_cache.add_image(filename, size, image)
+        
+        del self.futures[key]
+        self.finished.add(key)
+
+def _decode_image(path, size):
+    """Runs on a worker thread: decode and scale, but leave conversion to the main thread"""
+    image = pygame.image.load(path)
+    if size:
+        image = pygame.transform.scale(image, size)
+    return image
\ No newline at end of file
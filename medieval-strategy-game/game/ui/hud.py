@@ -1,4 +1,5 @@
 import pygame
+from .minimap import Minimap
 
 class HUD:
     def __init__(self, screen_width, screen_height):
@@ -39,8 +40,12 @@ class HUD:
         
         # Selected unit info area
         self.info_rect = pygame.Rect(400, screen_height - 90, 300, 80)
+        
+        # Minimap in top-right corner
+        minimap_size = 150
+        self.minimap = Minimap(pygame.Rect(screen_width - minimap_size - 10, 10, minimap_size, minimap_size))
     
-    def render(self, screen, castle, selected_units, camera, current_level=1):
+    def render(self, screen, castle, selected_units, camera, current_level=1, selected_commanders=()):
         # Draw HUD background
         pygame.draw.rect(screen, (40, 40, 40), self.hud_rect)
         pygame.draw.rect(screen, (255, 255, 255), self.hud_rect, 2)
@@ -58,7 +63,7 @@ class HUD:
         self._draw_selected_unit_info(screen, selected_units)
         
         # Draw commander control button
-        self._draw_command_button(screen, selected_units)
+        self._draw_command_button(screen, selected_commanders)
         
         # Draw minimap
         self._draw_minimap(screen, camera)
@@ -164,11 +169,9 @@ class HUD:
                 cost_rect = cost_surface.get_rect(center=(self.upgrade_button.centerx, cost_y + 8))
                 screen.blit(cost_surface, cost_rect)
     
-    def _draw_command_button(self, screen, selected_units):
-        # Check if any selected unit is a commander
-        has_commander = any(getattr(unit, 'is_commander', False) for unit in selected_units)
-        
-        if has_commander:
+    def _draw_command_button(self, screen, selected_commanders):
+        # Only when a commander is selected (UnitManager.get_selected_commanders, off the commander index)
+        if selected_commanders:
             # Draw command button
             button_color = (150, 100, 0)  # Bronze color
             pygame.draw.rect(screen, button_color, self.command_button)
@@ -211,27 +214,19 @@ class HUD:
             screen.blit(text, (self.info_rect.x + 10, self.info_rect.y + 10))
     
     def _draw_minimap(self, screen, camera):
-        # Simple minimap in top-right corner
-        minimap_size = 150
-        minimap_x = self.screen_width - minimap_size - 10
-        minimap_y = 10
-        minimap_rect = pygame.Rect(minimap_x, minimap_y, minimap_size, minimap_size)
-        
-        # Draw minimap background
-        pygame.draw.rect(screen, (20, 20, 20), minimap_rect)
-        pygame.draw.rect(screen, (255, 255, 255), minimap_rect, 2)
-        
-        # Draw camera viewport indicator
-        if camera.world_width > 0 and camera.world_height > 0:
-            view_x = int((camera.x / camera.world_width) * minimap_size)
-            view_y = int((camera.y / camera.world_height) * minimap_size)
-            view_w = int((camera.screen_width / camera.world_width) * minimap_size)
-            view_h = int((camera.screen_height / camera.world_height) * minimap_size)
-            
-            view_rect = pygame.Rect(minimap_x + view_x, minimap_y + view_y, view_w, view_h)
-            pygame.draw.rect(screen, (255, 255, 0), view_rect, 2)
+        self.minimap.render(screen, camera)
+    
+    def button_at(self, mouse_x, mouse_y):
+        """True if the point is on a recruit, upgrade or command button"""
+        buttons = list(self.recruit_buttons.values()) + [self.upgrade_button, self.command_button]
+        return any(rect.collidepoint(mouse_x, mouse_y) for rect in buttons)
     
-    def handle_click(self, mouse_x, mouse_y, castle, unit_manager, current_level=1, enemy_castles=None, selected_units=None):
+    def handle_click(self, mouse_x, mouse_y, castle, unit_manager, current_level=1, enemy_castles=None, selected_units=None, camera=None):
+        # Clicking the minimap moves the camera there
+        if camera and self.minimap.rect.collidepoint(mouse_x, mouse_y):
+            camera.center_on(*self.minimap.screen_to_world(mouse_x, mouse_y))
+            return True
+        
         # Check recruitment buttons
         unit_costs = {
             'peasant': {'gold': 5, 'food': 0},
@@ -268,9 +263,8 @@ class HUD:
                     cost = unit_costs[unit_type]
                     if castle.recruit_unit(unit_type, cost):
                         # Spawn unit near castle with upgrade bonuses
-                        from ..entities.unit import Unit
-                        unit = Unit(castle.x + castle.size + 20, castle.y + castle.size // 2, unit_type, "player", castle.upgrade_bonus)
-                        unit_manager.add_unit(unit)
+                        unit = unit_manager.spawn_unit(castle.x + castle.size + 20, castle.y + castle.size // 2,
+                                                       unit_type, "player", castle.upgrade_bonus)
                         
                         # Special handling for battalion - spawn 6 elite knights
                         if unit_type == 'battalion':
@@ -279,6 +273,10 @@ class HUD:
                         # Special handling for dragoons - spawn 6 cavalry
                         if unit_type == 'dragoons':
                             unit.spawn_dragoon_cavalry(unit_manager, castle.upgrade_bonus)
+                        
+                        # Peasants go to work: the economy sends them to the nearest free resource
+                        if unit_type == 'peasant':
+                            unit_manager.economy.hire(unit)
                 return True
         
         # Check upgrade button
@@ -292,7 +290,7 @@ class HUD:
         if (self.command_button.collidepoint(mouse_x, mouse_y) and 
             selected_units and enemy_castles):
             # Find selected commanders
-            commanders = [unit for unit in selected_units if getattr(unit, 'is_commander', False)]
+            commanders = unit_manager.get_selected_commanders()
             if commanders and enemy_castles:
                 # Command attack on nearest enemy castle
                 target_castle = min(enemy_castles, 
@@ -0,0 +1,153 @@
+import pygame
+import numpy as np
+
+class Minimap:
+    """Minimap drawn from a cached terrain image plus a low-resolution density grid.
+    
+    Units are counted into per-owner grids that are updated incrementally a few
+    times per second; only cells whose occupant moved are touched, and the grid
+    is turned into pixels with surfarray instead of drawing a rect per unit.
+    """
+    
+    def __init__(self, rect, grid_size=50, update_interval=0.2):
+        self.rect = rect
+        self.grid_width = grid_size
+        self.grid_height = grid_size
+        self.update_interval = update_interval  # 5 Hz
+        self.update_timer = update_interval
+        
+        self.world_width = 1
+        self.world_height = 1
+        self.base_surface = None
+        
+        # Unit counts per cell, indexed [cell_x, cell_y] like surfarray
+        self.player_density = np.zeros((self.grid_width, self.grid_height), dtype=np.int32)
+        self.enemy_density = np.zeros((self.grid_width, self.grid_height), dtype=np.int32)
+        self.unit_cells = {}  # unit -> (owner, cell_x, cell_y)
+        
+        # Static markers (castles, resources) stamped in on each refresh
+        self.marker_pixels = np.zeros((self.grid_width, self.grid_height, 3), dtype=np.uint8)
+        self.marker_surface = pygame.Surface((self.grid_width, self.grid_height))
+        self.marker_surface.set_colorkey((0, 0, 0))
+        self.scaled_markers = pygame.Surface(self.rect.size)
+        self.scaled_markers.set_colorkey((0, 0, 0))
+        self.scaled_markers.fill((0, 0, 0))
+    
+    def set_world(self, game_map):
+        """Build the terrain layer once from the map background"""
+        self.world_width = game_map.world_width
+        self.world_height = game_map.world_height
+        self.base_surface = game_map.render_overview(self.rect.width, self.rect.height)
+        self.clear()
+    
+    def clear(self):
+        self.player_density.fill(0)
+        self.enemy_density.fill(0)
+        self.unit_cells.clear()
+        self.update_timer = self.update_interval
+    
+    def world_to_cell(self, world_x, world_y):
+        cell_x = int(world_x * self.grid_width / self.world_width)
+        cell_y = int(world_y * self.grid_height / self.world_height)
+        return (max(0, min(self.grid_width - 1, cell_x)),
+                max(0, min(self.grid_height - 1, cell_y)))
+    
+    def screen_to_world(self, screen_x, screen_y):
+        """Convert a click on the minimap to world coordinates"""
+        world_x = (screen_x - self.rect.x) / self.rect.width * self.world_width
+        world_y = (screen_y - self.rect.y) / self.rect.height * self.world_height
+        return world_x, world_y
+    
+    def update(self, dt, units, castles, resources, fog=None):
+        """Refresh the density grids at a throttled rate (enemies only where fog lets the player see)"""
+        self.update_timer += dt
+        if self.update_timer < self.update_interval:
+            return
+        self.update_timer = 0
+        
+        # Move only the units that changed cell since the last refresh
+        seen = set()
+        for unit in units:
+            if not unit.is_alive():
+                continue
+            seen.add(unit)
+            cell = (unit.owner,) + self.world_to_cell(unit.x + unit.size / 2, unit.y + unit.size / 2)
+            previous = self.unit_cells.get(unit)
+            if previous == cell:
+                continue
+            if previous:
+                self._density_for(previous[0])[previous[1], previous[2]] -= 1
+            self._density_for(cell[0])[cell[1], cell[2]] += 1
+            self.unit_cells[unit] = cell
+        
+        # Drop units that died or were removed
+        for unit in [unit for unit in self.unit_cells if unit not in seen]:
+            owner, cell_x, cell_y = self.unit_cells.pop(unit)
+            self._density_for(owner)[cell_x, cell_y] -= 1
+        
+        self._refresh_markers(castles, resources, fog)
+    
+    def _density_for(self, owner):
+        return self.player_density if owner == "player" else self.enemy_density
+    
+    def _refresh_markers(self, castles, resources, fog=None):
+        """Convert density grids and static markers to minimap pixels"""
+        pixels = self.marker_pixels
+        pixels.fill(0)
+        if fog is not None:
+            visible, explored = fog.sample(self.grid_width, self.grid_height)
+        
+        # Resources as dim dots underneath the units
+        for resource in resources:
+            if not resource.is_depleted():
+                cell_x, cell_y = self.world_to_cell(resource.x, resource.y)
+                pixels[cell_x, cell_y] = (120, 100, 40)
+        
+        # Unit density: brighter cells hold more units
+        player_level = np.minimum(self.player_density, 4) * 40 + 95
+        enemy_level = np.minimum(self.enemy_density, 4) * 40 + 95
+        has_player = self.player_density > 0
+        has_enemy = self.enemy_density > 0
+        if fog is not None:
+            has_enemy &= visible
+        pixels[has_player] = 0
+        pixels[has_enemy] = 0
+        pixels[..., 0] = np.where(has_enemy, enemy_level, pixels[..., 0])
+        pixels[..., 1] = np.where(has_player, player_level // 2, pixels[..., 1])
+        pixels[..., 2] = np.where(has_player, player_level, pixels[..., 2])
+        
+        # Castles as 3x3 cell blocks on top (enemy castles once found)
+        for castle in castles:
+            if not castle.is_alive():
+                continue
+            cell_x, cell_y = self.world_to_cell(castle.x + castle.size / 2, castle.y + castle.size / 2)
+            if fog is not None and castle.owner != "player" and not explored[cell_x, cell_y]:
+                continue
+            color = (255, 255, 255) if castle.owner == "player" else (255, 200, 0)
+            pixels[max(0, cell_x - 1):cell_x + 2, max(0, cell_y - 1):cell_y + 2] = color
+        
+        # Ground never seen is blacked out (just above the color key, so it still draws)
+        if fog is not None:
+            pixels[~explored] = (1, 1, 1)
+        
+        pygame.surfarray.blit_array(self.marker_surface, pixels)
+        pygame.transform.scale(self.marker_surface, self.rect.size, self.scaled_markers)
+    
+    def render(self, screen, camera):
+        # Draw minimap background
+        if self.base_surface:
+            screen.blit(self.base_surface, self.rect)
+        else:
+            pygame.draw.rect(screen, (20, 20, 20), self.rect)
+        screen.blit(self.scaled_markers, self.rect)
+        pygame.draw.rect(screen, (255, 255, 255), self.rect, 2)
+        
+        # Draw camera viewport indicator
+        if camera.world_width > 0 and camera.world_height > 0:
+            view_x = int((camera.x / camera.world_width) * self.rect.width)
+            view_y = int((camera.y / camera.world_height) * self.rect.height)
+            view_w = int((min(camera.view_width, camera.world_width) / camera.world_width) * self.rect.width)
+            view_h = int((min(camera.view_height, camera.world_height) / camera.world_height) * self.rect.height)
+            
+            view_rect = pygame.Rect(self.rect.x + view_x, self.rect.y + view_y, view_w, view_h)
+            pygame.draw.rect(screen, (255, 255, 0), view_rect, 2)
\ No newline at end of file
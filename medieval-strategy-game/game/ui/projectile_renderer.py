@@ -0,0 +1,82 @@
+import pygame
+import math
+import numpy as np
+from ..entities.projectiles import PROJECTILE_KINDS
+from .unit_renderer import _submit
+
+DIRECTIONS = 16  # Rotation steps prebuilt for arrows and bolts
+SCREEN_MARGIN = 16
+
+# How each projectile kind is drawn: (shape, color, world length or radius, line width)
+PROJECTILE_LOOKS = {
+    'arrow': ('line', (150, 110, 60), 10, 2),
+    'bullet': ('ball', (40, 40, 40), 2, 0),
+    'stone': ('ball', (120, 120, 120), 4, 0),
+    'cannonball': ('ball', (20, 20, 20), 3, 0),
+    'bolt': ('line', (255, 255, 0), 14, 3),
+}
+
+class ProjectileRenderer:
+    """Draws every shot in flight with one Surface.blits call.
+    
+    Screen positions, culling and facing are worked out on the projectile
+    arrays; the sprites come from a table of prebuilt surfaces indexed by
+    (kind, direction), rebuilt only when the zoom changes.
+    """
+    
+    def __init__(self):
+        self.tables = {}  # zoom -> (sprites[kind, direction], half sizes[kind])
+        self.visible_count = 0
+    
+    def render(self, screen, camera, projectiles):
+        count = projectiles.count
+        self.visible_count = 0
+        if not count:
+            return
+        zoom = camera.zoom
+        sprites, halves = self._table(zoom)
+        
+        screen_x = ((projectiles.x[:count] - camera.x) * zoom).astype(np.int32)
+        screen_y = ((projectiles.y[:count] - projectiles.heights() - camera.y) * zoom).astype(np.int32)
+        width, height = screen.get_size()
+        visible = ((screen_x > -SCREEN_MARGIN) & (screen_x < width + SCREEN_MARGIN) &
+                   (screen_y > -SCREEN_MARGIN) & (screen_y < height + SCREEN_MARGIN))
+        if not visible.any():
+            return
+        
+        kinds = projectiles.kinds[:count][visible]
+        angles = np.arctan2(projectiles.vy[:count][visible], projectiles.vx[:count][visible])
+        directions = np.rint(angles * (DIRECTIONS / (2 * math.pi))).astype(np.int32) % DIRECTIONS
+        half = halves[kinds]
+        self.visible_count = len(kinds)
+        _submit(screen, list(zip(sprites[kinds, directions].tolist(),
+                                 zip((screen_x[visible] - half).tolist(), (screen_y[visible] - half).tolist()))))
+    
+    def _table(self, zoom):
+        table = self.tables.get(zoom)
+        if table is None:
+            sprites = np.empty((len(PROJECTILE_KINDS), DIRECTIONS), dtype=object)
+            halves = np.zeros(len(PROJECTILE_KINDS), dtype=np.int32)
+            for kind_index, kind in enumerate(PROJECTILE_KINDS):
+                shape, color, length, line_width = PROJECTILE_LOOKS[kind]
+                if shape == 'ball':
+                    radius = max(1, int(length * zoom))
+                    ball = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+                    pygame.draw.circle(ball, color, (radius, radius), radius)
+                    sprites[kind_index, :] = [ball] * DIRECTIONS
+                    halves[kind_index] = radius
+                else:
+                    half_length = max(2, int(length * zoom / 2))
+                    side = half_length * 2 + 1
+                    for direction in range(DIRECTIONS):
+                        angle = direction * 2 * math.pi / DIRECTIONS
+                        dx = math.cos(angle) * half_length
+                        dy = math.sin(angle) * half_length
+                        line = pygame.Surface((side, side), pygame.SRCALPHA)
+                        pygame.draw.line(line, color, (half_length - dx, half_length - dy),
+                                         (half_length + dx, half_length + dy), line_width)
+                        sprites[kind_index, direction] = line
+                    halves[kind_index] = half_length
+            table = (sprites, halves)
+            self.tables[zoom] = table
+        return table
\ No newline at end of file
@@ -0,0 +1,70 @@
+import pygame
+import os
+
+class SpriteCache:
+    """Shared sprite images plus pre-scaled copies for each camera zoom step"""
+    
+    def __init__(self):
+        # Get the path to the images folder
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        self.images_dir = os.path.join(current_dir, 'images')
+        
+        # Decoded images keyed by (filename, size)
+        self.images = {}
+        # Mip levels keyed by (sprite key, zoom)
+        self.mips = {}
+    
+    def load_image(self, filename, size=None):
+        """Load an image from the images folder once and share it between entities"""
+        key = (filename, size)
+        if key in self.images:
+            return self.images[key]
+        
+        try:
+            image = pygame.image.load(os.path.join(self.images_dir, filename))
+            if pygame.display.get_surface() is not None:
+                image = image.convert()
+            if size:
+                image = pygame.transform.scale(image, size)
+        except (pygame.error, FileNotFoundError):
+            print(f"Could not load image {filename}")
+            image = None
+        
+        self.images[key] = image
+        return image
+    
+    def has_image(self, filename, size=None):
+        return (filename, size) in self.images
+    
+    def get_image(self, filename, size=None):
+        """Return an image only if it is already loaded (never blocks on disk)"""
+        return self.images.get((filename, size))
+    
+    def add_image(self, filename, size, image):
+        """Register an image decoded elsewhere (see AssetLoader)"""
+        self.images[(filename, size)] = image
+    
+    def get_mip(self, key, zoom, build):
+        """Return the cached surface for key at a zoom step, building it once with build(zoom)"""
+        mip_key = (key, zoom)
+        surface = self.mips.get(mip_key)
+        if surface is None:
+            surface = build(zoom)
+            self.mips[mip_key] = surface
+        return surface
+    
+    def clear_mips(self):
+        self.mips.clear()
+
+def scale_surface(image, zoom):
+    """Scale a surface by a zoom factor, smoothing where the pixel format allows it"""
+    width, height = image.get_size()
+    size = (max(1, round(width * zoom)), max(1, round(height * zoom)))
+    if size == (width, height):
+        return image
+    if image.get_bitsize() >= 24:
+        return pygame.transform.smoothscale(image, size)
+    return pygame.transform.scale(image, size)
+
+# Shared by every unit, castle and resource
+sprite_cache = SpriteCache()
\ No newline at end of file
@@ -0,0 +1,253 @@
+import pygame
+import math
+import numpy as np
+import time
+from operator import attrgetter
+
+# Extra world-space margin around the view when querying units, so trails,
+# shadows, selection glows and health bars of units just off screen still show
+QUERY_MARGIN = 64
+PULSE_STEPS = 16  # Selection ring brightness levels
+FLASH_STEPS = 16  # Combat flash alpha levels
+
+# Health bar gradients (start, end) for > 60%, > 30% and the rest
+HEALTH_BANDS = (((0, 200, 0), (0, 255, 0)), ((200, 200, 0), (255, 255, 0)), ((200, 0, 0), (255, 0, 0)))
+
+class UnitRenderer:
+    """Draws all visible units in a few batched layers.
+    
+    The visible set comes from the unit manager's spatial grid; trails come
+    from its ring buffer. Draw commands are collected per layer (trails,
+    shadows, sprites, overlays, bars) and each layer goes to the screen in a
+    single Surface.blits call. Every shape that used to be drawn per unit per
+    frame is prebuilt once per size and color.
+    """
+    
+    def __init__(self):
+        self.dots = {}          # color -> trail dot
+        self.shadows = {}       # (size, has image) -> shadow
+        self.flashes = {}       # (size, level) -> white combat flash
+        self.selections = {}    # (size, level) -> selection ring with glow
+        self.bar_backs = {}     # width -> health bar background
+        self.bar_fills = {}     # (width, band) -> gradient health bar fill
+        self.icons = {}         # (color, size) -> far-zoom icon
+        self.icon_outlines = {}  # size -> far-zoom selection outline
+        self.visible_count = 0
+    
+    def render(self, screen, camera, unit_manager):
+        units = self._visible_units(camera, unit_manager)
+        self.visible_count = len(units)
+        if not units:
+            return
+        if camera.zoom <= camera.icon_zoom:
+            self._render_icons(screen, camera, units)
+        else:
+            self._render_full(screen, camera, units, unit_manager)
+    
+    def _visible_units(self, camera, unit_manager):
+        """Alive units overlapping the view (enemies only out of the fog), in spawn order so overlaps look the same every frame"""
+        view_width = camera.view_width
+        view_height = camera.view_height
+        candidates = unit_manager.grid.query_rect(camera.x - QUERY_MARGIN, camera.y - QUERY_MARGIN,
+                                                  view_width + QUERY_MARGIN * 2, view_height + QUERY_MARGIN * 2)
+        left = camera.x
+        top = camera.y
+        right = left + view_width
+        bottom = top + view_height
+        fog = unit_manager.fog
+        units = [unit for unit in candidates
+                 if unit.health > 0 and unit.x + unit.size >= left and unit.x <= right
+                 and unit.y + unit.size >= top and unit.y <= bottom
+                 and (unit.owner == "player" or fog.is_visible(unit.x + unit.size / 2, unit.y + unit.size / 2))]
+        units.sort(key=attrgetter('unit_id'))
+        return units
+    
+    def _render_icons(self, screen, camera, units):
+        """Far zoom: one flat square per unit, outlined when selected"""
+        zoom = camera.zoom
+        cam_x = camera.x
+        cam_y = camera.y
+        icons = []
+        outlines = []
+        icon_cache = self.icons
+        for unit in units:
+            size = max(3, int(unit.size * zoom))
+            screen_x = int((unit.x - cam_x) * zoom)
+            screen_y = int((unit.y - cam_y) * zoom)
+            icon = icon_cache.get((unit.colors, size)) or self._icon(unit.colors, size)
+            icons.append((icon, (screen_x, screen_y)))
+            if unit.selected:
+                outlines.append((self._icon_outline(size), (screen_x - 1, screen_y - 1)))
+        _submit(screen, icons)
+        _submit(screen, outlines)
+    
+    def _render_trails(self, screen, camera, trails, fog):
+        """All trail dots in one pass: positions are converted and culled (view and fog) as arrays"""
+        active = trails.active_trails()
+        if active is None:
+            return
+        points, valid, offsets, colors = active
+        zoom = camera.zoom
+        world_x = points[:, :, 0] + offsets[:, None]
+        world_y = points[:, :, 1] + offsets[:, None]
+        screen_x = ((world_x - camera.x) * zoom).astype(np.int32) - 2
+        screen_y = ((world_y - camera.y) * zoom).astype(np.int32) - 2
+        valid &= (screen_x > -5) & (screen_x < screen.get_width()) & (screen_y > -5) & (screen_y < screen.get_height())
+        valid &= fog.visible_points(world_x, world_y)
+        if not valid.any():
+            return
+        
+        # One dot surface per trail, repeated for each of its points on screen
+        dots = np.empty(len(colors), dtype=object)
+        dots[:] = [self._dot(color) for color in colors]
+        trail_index = np.nonzero(valid)[0]
+        _submit(screen, list(zip(dots[trail_index].tolist(),
+                                 zip(screen_x[valid].tolist(), screen_y[valid].tolist()))))
+    
+    def _render_full(self, screen, camera, units, unit_manager):
+        zoom = camera.zoom
+        cam_x = camera.x
+        cam_y = camera.y
+        pulse_level = int((abs(math.sin(time.time() * 3)) * 0.3 + 0.7) * PULSE_STEPS)
+        
+        shadows = []
+        sprites = []
+        overlays = []
+        bars = []
+        fallbacks = []
+        for unit in units:
+            size = max(1, int(unit.size * zoom))
+            half = size // 2
+            screen_x = int((unit.x - cam_x) * zoom)
+            screen_y = int((unit.y - cam_y) * zoom)
+            
+            # Shadow and sprite
+            has_image = unit.image is not None
+            shadows.append((self._shadow(size, has_image), (screen_x + 3, screen_y + 3)))
+            if has_image:
+                sprites.append((unit._get_sprite(zoom), (screen_x, screen_y)))
+                if unit.combat_flash > 0:
+                    overlays.append((self._flash(size, unit.combat_flash), (screen_x, screen_y)))
+            else:
+                fallbacks.append((unit, screen_x + half, screen_y + half, half))
+            
+            # Selection ring and glow
+            if unit.selected:
+                overlays.append((self._selection(size, pulse_level), (screen_x - 8, screen_y - 8)))
+            
+            # Health bar
+            if unit.health < unit.max_health:
+                bar_y = screen_y - 10
+                health_percent = unit.health / unit.max_health
+                band = 0 if health_percent > 0.6 else 1 if health_percent > 0.3 else 2
+                bars.append((self._bar_back(size), (screen_x - 1, bar_y - 1)))
+                health_width = int(health_percent * size)
+                if health_width > 0:
+                    bars.append((self._bar_fill(size, band), (screen_x, bar_y), (0, 0, health_width, 6)))
+        
+        self._render_trails(screen, camera, unit_manager.trails, unit_manager.fog)
+        _submit(screen, shadows)
+        _submit(screen, sprites)
+        for unit, center_x, center_y, radius in fallbacks:
+            # Colored circle if the unit image failed to load
+            color = unit.colors
+            if unit.combat_flash > 0:
+                color = tuple(min(255, c + int(unit.combat_flash * 100)) for c in color)
+            pygame.draw.circle(screen, color, (center_x, center_y), radius)
+        _submit(screen, overlays)
+        _submit(screen, bars, areas=True)
+    
+    def _dot(self, color):
+        dot = self.dots.get(color)
+        if dot is None:
+            dot = pygame.Surface((5, 5))
+            dot.set_colorkey((0, 0, 0))
+            pygame.draw.circle(dot, color[:3], (2, 2), 2)
+            self.dots[color] = dot
+        return dot
+    
+    def _shadow(self, size, has_image):
+        key = (size, has_image)
+        shadow = self.shadows.get(key)
+        if shadow is None:
+            shadow = pygame.Surface((size, size), pygame.SRCALPHA)
+            if has_image:
+                # Shadow based on image shape (simplified as oval)
+                pygame.draw.ellipse(shadow, (0, 0, 0, 60), (4, 4, max(1, size - 8), max(1, size // 2)))
+            else:
+                pygame.draw.circle(shadow, (0, 0, 0, 60), (size // 2, size // 2), max(1, size // 2 - 2))
+            self.shadows[key] = shadow
+        return shadow
+    
+    def _flash(self, size, combat_flash):
+        level = min(FLASH_STEPS, max(1, int(combat_flash * FLASH_STEPS + 0.5)))
+        key = (size, level)
+        flash = self.flashes.get(key)
+        if flash is None:
+            flash = pygame.Surface((size, size), pygame.SRCALPHA)
+            flash.fill((255, 255, 255, min(255, level * 256 // FLASH_STEPS)))
+            self.flashes[key] = flash
+        return flash
+    
+    def _selection(self, size, pulse_level):
+        key = (size, pulse_level)
+        selection = self.selections.get(key)
+        if selection is None:
+            selection = pygame.Surface((size + 16, size + 16), pygame.SRCALPHA)
+            center = (size // 2 + 8, size // 2 + 8)
+            # Inner glow, then the pulsing ring on top
+            pygame.draw.circle(selection, (255, 255, 0, 30), center, size // 2 + 8)
+            brightness = min(255, int(255 * pulse_level / PULSE_STEPS))
+            pygame.draw.circle(selection, (brightness, brightness, 0), center, size // 2 + 4, 3)
+            self.selections[key] = selection
+        return selection
+    
+    def _bar_back(self, width):
+        back = self.bar_backs.get(width)
+        if back is None:
+            back = pygame.Surface((width + 2, 8))
+            back.fill((0, 0, 0))
+            back.fill((60, 60, 60), (1, 1, width, 6))
+            self.bar_backs[width] = back
+        return back
+    
+    def _bar_fill(self, width, band):
+        key = (width, band)
+        fill = self.bar_fills.get(key)
+        if fill is None:
+            start_color, end_color = HEALTH_BANDS[band]
+            fill = pygame.Surface((width, 6))
+            for i in range(width):
+                progress = i / width
+                color = tuple(int(start + (end - start) * progress) for start, end in zip(start_color, end_color))
+                pygame.draw.line(fill, color, (i, 0), (i, 5))
+            self.bar_fills[key] = fill
+        return fill
+    
+    def _icon(self, color, size):
+        key = (color, size)
+        icon = self.icons.get(key)
+        if icon is None:
+            icon = pygame.Surface((size, size))
+            icon.fill(color)
+            self.icons[key] = icon
+        return icon
+    
+    def _icon_outline(self, size):
+        outline = self.icon_outlines.get(size)
+        if outline is None:
+            outline = pygame.Surface((size + 2, size + 2))
+            outline.set_colorkey((0, 0, 0))
+            pygame.draw.rect(outline, (255, 255, 0), outline.get_rect(), 1)
+            self.icon_outlines[size] = outline
+        return outline
+
+def _submit(screen, batch, areas=False):
+    """Send one layer to the screen in a single call (fblits on pygame-ce when no source areas are used)"""
+    if not batch:
+        return
+    fblits = getattr(screen, 'fblits', None)
+    if fblits is not None and not areas:
+        fblits(batch)
+    else:
+        screen.blits(batch, doreturn=False)
\ No newline at end of file
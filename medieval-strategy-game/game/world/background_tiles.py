@@ -0,0 +1,159 @@
+import pygame
+import math
+import queue
+import threading
+from collections import OrderedDict
+
+class BackgroundTileCache:
+    """Streams a background image as world-space tiles that are scaled on demand.
+    
+    Only the decoded source image is kept whole; world-sized pixels exist just
+    for the tiles near the camera, held in a bounded LRU cache and prepared
+    ahead of time by a background thread. Each zoom step gets its own mip
+    level whose tiles cover tile_size / zoom world pixels, so a tile is always
+    about tile_size screen pixels and the cache bound holds at any zoom.
+    """
+    
+    def __init__(self, source_image, world_width, world_height, tile_size=256, max_tiles=96):
+        self.source = source_image
+        self.world_width = world_width
+        self.world_height = world_height
+        self.tile_size = tile_size
+        self.max_tiles = max(1, max_tiles)
+        
+        # Source pixels per world pixel
+        self.scale_x = source_image.get_width() / world_width
+        self.scale_y = source_image.get_height() / world_height
+        
+        # LRU cache of scaled tiles keyed by (zoom, tile_x, tile_y)
+        self._tiles = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Serializes access to the shared source surface
+        self._build_lock = threading.Lock()
+        
+        # Background preloading
+        self._requests = queue.Queue()
+        self._pending = set()
+        self._stop_event = threading.Event()
+        self._worker = None
+    
+    def world_tile_size(self, zoom=1.0):
+        """World pixels covered by one tile at a zoom step"""
+        return max(1, int(round(self.tile_size / zoom)))
+    
+    def get_tile(self, tile_x, tile_y, zoom=1.0):
+        """Return the scaled tile, building it now if it is not cached yet"""
+        key = (zoom, tile_x, tile_y)
+        with self._cache_lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                return tile
+        
+        tile = self._build_tile(*key)
+        self._store(key, tile)
+        return tile
+    
+    def visible_tiles(self, view_x, view_y, view_width, view_height, zoom=1.0, margin=0):
+        """Yield (tile_x, tile_y) for every tile overlapping a world rectangle"""
+        world_tile = self.world_tile_size(zoom)
+        cols = math.ceil(self.world_width / world_tile)
+        rows = math.ceil(self.world_height / world_tile)
+        
+        start_x = max(0, int(view_x // world_tile) - margin)
+        start_y = max(0, int(view_y // world_tile) - margin)
+        end_x = min(cols, int((view_x + view_width) // world_tile) + 1 + margin)
+        end_y = min(rows, int((view_y + view_height) // world_tile) + 1 + margin)
+        
+        for tile_y in range(start_y, end_y):
+            for tile_x in range(start_x, end_x):
+                yield tile_x, tile_y
+    
+    def prefetch(self, view_x, view_y, view_width, view_height, zoom=1.0, margin=1):
+        """Queue tiles around the view for preloading on the worker thread"""
+        with self._cache_lock:
+            missing = [(zoom, tile_x, tile_y)
+                       for tile_x, tile_y in self.visible_tiles(view_x, view_y, view_width, view_height, zoom, margin)
+                       if (zoom, tile_x, tile_y) not in self._tiles and (zoom, tile_x, tile_y) not in self._pending]
+            self._pending.update(missing)
+        
+        if not missing:
+            return
+        
+        self._ensure_worker()
+        for key in missing:
+            self._requests.put(key)
+    
+    def close(self):
+        """Stop the preloading thread and drop every cached tile"""
+        self._stop_event.set()
+        if self._worker:
+            self._worker.join(timeout=1.0)
+            self._worker = None
+        with self._cache_lock:
+            self._tiles.clear()
+            self._pending.clear()
+    
+    def cached_tile_count(self):
+        with self._cache_lock:
+            return len(self._tiles)
+    
+    def _tile_rect(self, tile_x, tile_y, zoom=1.0):
+        """World rectangle covered by a tile (edge tiles may be smaller)"""
+        world_tile = self.world_tile_size(zoom)
+        world_x = tile_x * world_tile
+        world_y = tile_y * world_tile
+        width = min(world_tile, self.world_width - world_x)
+        height = min(world_tile, self.world_height - world_y)
+        return pygame.Rect(world_x, world_y, width, height)
+    
+    def _build_tile(self, zoom, tile_x, tile_y):
+        """Cut the matching part of the source image and scale it to the zoomed tile size"""
+        world_rect = self._tile_rect(tile_x, tile_y, zoom)
+        # Round up so neighbouring tiles never leave a gap on screen
+        screen_size = (max(1, math.ceil(world_rect.width * zoom)), max(1, math.ceil(world_rect.height * zoom)))
+        source_width, source_height = self.source.get_size()
+        
+        src_x = min(source_width - 1, int(world_rect.x * self.scale_x))
+        src_y = min(source_height - 1, int(world_rect.y * self.scale_y))
+        src_right = min(source_width, max(src_x + 1, int(round(world_rect.right * self.scale_x))))
+        src_bottom = min(source_height, max(src_y + 1, int(round(world_rect.bottom * self.scale_y))))
+        source_rect = pygame.Rect(src_x, src_y, src_right - src_x, src_bottom - src_y)
+        
+        with self._build_lock:
+            region = self.source.subsurface(source_rect)
+            return pygame.transform.scale(region, screen_size)
+    
+    def _store(self, key, tile):
+        with self._cache_lock:
+            self._tiles[key] = tile
+            self._tiles.move_to_end(key)
+            self._pending.discard(key)
+            # Evict least recently used tiles
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+    
+    def _ensure_worker(self):
+        if self._worker is None and not self._stop_event.is_set():
+            self._worker = threading.Thread(target=self._preload_loop, name="background-tiles", daemon=True)
+            self._worker.start()
+    
+    def _preload_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                key = self._requests.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            
+            with self._cache_lock:
+                if key in self._tiles or key not in self._pending:
+                    continue
+            
+            try:
+                tile = self._build_tile(*key)
+            except pygame.error as e:
+                print(f"Could not build background tile {key}: {e}")
+                with self._cache_lock:
+                    self._pending.discard(key)
+                continue
+            self._store(key, tile)
\ No newline at end of file
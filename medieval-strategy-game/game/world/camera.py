@@ -1,50 +1,107 @@
 import pygame
 
+# Discrete zoom steps; sprites and map tiles are cached once per step
+ZOOM_LEVELS = (0.25, 0.5, 0.75, 1.0, 1.5, 2.0)
+
+# At or below this zoom units are drawn as flat icons instead of sprites
+ICON_ZOOM = 0.5
+
 class Camera:
     def __init__(self, screen_width, screen_height, world_width, world_height):
         self.screen_width = screen_width
         self.screen_height = screen_height
         self.world_width = world_width
         self.world_height = world_height
-        
+
         # Camera position (top-left corner)
         self.x = 0
         self.y = 0
-        
+
         # Camera movement speed
         self.speed = 300
+
+        # Zoom (screen pixels per world pixel)
+        self.zoom_index = ZOOM_LEVELS.index(1.0)
+        self.zoom = ZOOM_LEVELS[self.zoom_index]
+        self.icon_zoom = ICON_ZOOM
         
         # Camera bounds
         self.min_x = 0
         self.min_y = 0
-        self.max_x = max(0, world_width - screen_width)
-        self.max_y = max(0, world_height - screen_height)
+        self._update_bounds()
     
+    @property
+    def view_width(self):
+        """Width of the visible area in world pixels"""
+        return self.screen_width / self.zoom
+    
+    @property
+    def view_height(self):
+        """Height of the visible area in world pixels"""
+        return self.screen_height / self.zoom
+    
+    def _update_bounds(self):
+        self.max_x = max(0, self.world_width - self.view_width)
+        self.max_y = max(0, self.world_height - self.view_height)
+    
+    def _clamp(self):
+        self.x = max(self.min_x, min(self.max_x, self.x))
+        self.y = max(self.min_y, min(self.max_y, self.y))
+
     def update(self, dt):
         keys = pygame.key.get_pressed()
+
+        # Pan at a constant on-screen speed regardless of zoom
+        step = self.speed * dt / self.zoom
         
         # Camera movement with arrow keys or WASD
         if keys[pygame.K_LEFT] or keys[pygame.K_a]:
-            self.x -= self.speed * dt
+            self.x -= step
         if keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-            self.x += self.speed * dt
+            self.x += step
         if keys[pygame.K_UP] or keys[pygame.K_w]:
-            self.y -= self.speed * dt
+            self.y -= step
         if keys[pygame.K_DOWN] or keys[pygame.K_s]:
-            self.y += self.speed * dt
-        
+            self.y += step
+
         # Clamp camera to world bounds
-        self.x = max(self.min_x, min(self.max_x, self.x))
-        self.y = max(self.min_y, min(self.max_y, self.y))
+        self._clamp()
     
-    def world_to_screen(self, world_x, world_y):
-        return (world_x - self.x, world_y - self.y)
+    def set_zoom_index(self, zoom_index, anchor=None):
+        """Switch to a zoom step, keeping the world point under anchor (screen coords) fixed"""
+        zoom_index = max(0, min(len(ZOOM_LEVELS) - 1, zoom_index))
+        if zoom_index == self.zoom_index:
+            return
+        
+        if anchor is None:
+            anchor = (self.screen_width / 2, self.screen_height / 2)
+        anchor_world_x, anchor_world_y = self.screen_to_world(*anchor)
+        
+        self.zoom_index = zoom_index
+        self.zoom = ZOOM_LEVELS[zoom_index]
+        self._update_bounds()
+        
+        self.x = anchor_world_x - anchor[0] / self.zoom
+        self.y = anchor_world_y - anchor[1] / self.zoom
+        self._clamp()
     
-    def screen_to_world(self, screen_x, screen_y):
-        return (screen_x + self.x, screen_y + self.y)
+    def zoom_by(self, steps, anchor=None):
+        """Zoom in (positive steps) or out (negative steps)"""
+        self.set_zoom_index(self.zoom_index + steps, anchor)
     
+    def center_on(self, world_x, world_y):
+        self.x = world_x - self.view_width / 2
+        self.y = world_y - self.view_height / 2
+        self._clamp()
+
+    def world_to_screen(self, world_x, world_y):
+        return ((world_x - self.x) * self.zoom, (world_y - self.y) * self.zoom)
+
+    def screen_to_world(self, screen_x, screen_y):
+        return (screen_x / self.zoom + self.x, screen_y / self.zoom + self.y)
+
     def is_visible(self, world_x, world_y, width, height):
-        return not (world_x + width < self.x or 
-                   world_x > self.x + self.screen_width or
+        return not (world_x + width < self.x or
+                   world_x > self.x + self.view_width or
                    world_y + height < self.y or
-                   world_y > self.y + self.screen_height)
\ No newline at end of file
+                   world_y > self.y + self.view_height)
\ No newline at end of file
@@ -1,5 +1,13 @@
 import pygame
-import os
+from ..ui.sprite_cache import sprite_cache
+
+# Resources every castle starts a match with
+STARTING_RESOURCES = {
+    'gold': 100,
+    'wood': 50,
+    'stone': 30,
+    'food': 80
+}
 
 class Castle:
     def __init__(self, x, y, owner="player"):
@@ -16,12 +24,7 @@ class Castle:
         self.image = self._load_castle_image()
         
         # Resources stored in castle
-        self.resources = {
-            'gold': 100,
-            'wood': 50,
-            'stone': 30,
-            'food': 80
-        }
+        self.resources = dict(STARTING_RESOURCES)
         
         # Units garrisoned in castle
         self.garrison = []
@@ -29,6 +32,7 @@ class Castle:
         
         # Permanent upgrade bonuses for all player units
         self.upgrade_bonus = 1.0  # Multiplier for unit stats (starts at 1.0 = no bonus)
+        self.persist_upgrades = True  # Write upgrades to castle_upgrades.txt
         
         # Load saved castle level and upgrade bonus if this is a player castle
         if self.owner == "player":
@@ -38,8 +42,10 @@ class Castle:
         if self.owner == "player":
             self.defense_range = 500  # Attack range for castle defenses
             self.defense_damage = 60  # Damage per attack #40
+            self.defense_splash_radius = 40  # Bolts also hurt enemies this close to the impact
             self.defense_cooldown = 1.0  # Seconds between attacks
             self.last_defense_attack = 0
+            self.defense_ready = True  # Cleared by a shot; the match's reload event sets it again
             self.defense_target = None
             self.defense_flash = 0  # Visual effect for attacks
         
@@ -50,6 +56,27 @@ class Castle:
             'neutral': (150, 150, 150)
         }
     
+    def reset(self):
+        """Prepare the castle for a new match, keeping its level and upgrade bonus"""
+        self.health = self.max_health
+        self.resources = dict(STARTING_RESOURCES)
+        self.garrison.clear()
+        
+        if self.owner == "player":
+            self.last_defense_attack = 0
+            self.defense_ready = True
+            self.defense_target = None
+            self.defense_flash = 0
+    
+    def reset_upgrades(self):
+        """Return to a level 1 castle without touching castle_upgrades.txt (balance runs)"""
+        self.level = 1
+        self.max_health = 5500
+        self.health = self.max_health
+        self.max_garrison = 10
+        self.size = 128
+        self.upgrade_bonus = 1.0
+    
     def upgrade(self):
         if self.level < self.max_level:
             # Cost to upgrade
@@ -75,8 +102,9 @@ class Castle:
                 # Apply permanent 15% bonus to all player units
                 if self.owner == "player":
                     self.upgrade_bonus *= 1.15  # 15% increase
-                    # Save the new castle level and upgrade bonus
-                    self.save_castle_upgrades()
+                    # Save the new castle level and upgrade bonus (not during replays)
+                    if self.persist_upgrades:
+                        self.save_castle_upgrades()
                     
                 return True
         return False
@@ -150,18 +178,23 @@ class Castle:
     def render(self, screen, camera):
         if camera.is_visible(self.x, self.y, self.size, self.size):
             screen_x, screen_y = camera.world_to_screen(self.x, self.y)
+            size = max(1, int(self.size * camera.zoom))
             
             # Draw castle image if available
             if self.image:
-                screen.blit(self.image, (screen_x, screen_y))
+                # Castle image pre-scaled for this zoom step (size grows with upgrades)
+                castle_image = sprite_cache.get_mip(
+                    ('castle', self.owner, self.size), camera.zoom,
+                    lambda zoom: pygame.transform.smoothscale(self.image, (size, size)))
+                screen.blit(castle_image, (screen_x, screen_y))
                 
                 # Draw castle border
-                pygame.draw.rect(screen, (0, 0, 0), (screen_x, screen_y, self.size, self.size), 2)
+                pygame.draw.rect(screen, (0, 0, 0), (screen_x, screen_y, size, size), 2)
                 
                 # Draw level indicator with background
                 font = pygame.font.Font(None, 24)
                 level_text = font.render(str(self.level), True, (255, 255, 255))
-                text_rect = level_text.get_rect(center=(screen_x + self.size // 2, screen_y + self.size // 2))
+                text_rect = level_text.get_rect(center=(screen_x + size // 2, screen_y + size // 2))
                 
                 # Add background for level text for better visibility
                 bg_rect = pygame.Rect(text_rect.x - 5, text_rect.y - 2, text_rect.width + 10, text_rect.height + 4)
@@ -171,45 +204,45 @@ class Castle:
             else:
                 # Fallback to colored rectangles if image fails to load
                 color = self.colors.get(self.owner, (150, 150, 150))
-                pygame.draw.rect(screen, color, (screen_x, screen_y, self.size, self.size))
+                pygame.draw.rect(screen, color, (screen_x, screen_y, size, size))
                 
                 # Add castle details
-                self._draw_castle_details(screen, screen_x, screen_y)
+                self._draw_castle_details(screen, screen_x, screen_y, size)
                 
                 # Draw castle border
-                pygame.draw.rect(screen, (0, 0, 0), (screen_x, screen_y, self.size, self.size), 2)
+                pygame.draw.rect(screen, (0, 0, 0), (screen_x, screen_y, size, size), 2)
                 
                 # Draw level indicator
                 font = pygame.font.Font(None, 24)
                 level_text = font.render(str(self.level), True, (255, 255, 255))
-                text_rect = level_text.get_rect(center=(screen_x + self.size // 2, screen_y + self.size // 2))
+                text_rect = level_text.get_rect(center=(screen_x + size // 2, screen_y + size // 2))
                 screen.blit(level_text, text_rect)
             
             # Draw enhanced health bar
-            self._draw_health_bar(screen, screen_x, screen_y)
+            self._draw_health_bar(screen, screen_x, screen_y, size)
             
             # Draw defense effects for player castle
             if self.owner == "player":
-                self._draw_defense_effects(screen, screen_x, screen_y, camera)
+                self._draw_defense_effects(screen, screen_x, screen_y, camera, size)
     
-    def _draw_castle_details(self, screen, screen_x, screen_y):
+    def _draw_castle_details(self, screen, screen_x, screen_y, size):
         """Draw detailed castle graphics"""
         # Castle towers
-        tower_size = self.size // 4
+        tower_size = size // 4
         pygame.draw.rect(screen, (80, 80, 80), 
                         (screen_x, screen_y, tower_size, tower_size))
         pygame.draw.rect(screen, (80, 80, 80), 
-                        (screen_x + self.size - tower_size, screen_y, tower_size, tower_size))
+                        (screen_x + size - tower_size, screen_y, tower_size, tower_size))
         pygame.draw.rect(screen, (80, 80, 80), 
-                        (screen_x, screen_y + self.size - tower_size, tower_size, tower_size))
+                        (screen_x, screen_y + size - tower_size, tower_size, tower_size))
         pygame.draw.rect(screen, (80, 80, 80), 
-                        (screen_x + self.size - tower_size, screen_y + self.size - tower_size, tower_size, tower_size))
+                        (screen_x + size - tower_size, screen_y + size - tower_size, tower_size, tower_size))
         
         # Castle gate
-        gate_width = self.size // 3
-        gate_height = self.size // 2
-        gate_x = screen_x + (self.size - gate_width) // 2
-        gate_y = screen_y + self.size - gate_height
+        gate_width = size // 3
+        gate_height = size // 2
+        gate_x = screen_x + (size - gate_width) // 2
+        gate_y = screen_y + size - gate_height
         pygame.draw.rect(screen, (40, 40, 40), 
                         (gate_x, gate_y, gate_width, gate_height))
         
@@ -225,11 +258,11 @@ class Castle:
         pygame.draw.rect(screen, flag_color, 
                         (screen_x + tower_size//2 - 2, screen_y - 8, 4, 8))
         pygame.draw.rect(screen, flag_color, 
-                        (screen_x + self.size - tower_size//2 - 2, screen_y - 8, 4, 8))
+                        (screen_x + size - tower_size//2 - 2, screen_y - 8, 4, 8))
     
-    def _draw_health_bar(self, screen, screen_x, screen_y):
+    def _draw_health_bar(self, screen, screen_x, screen_y, size):
         """Draw enhanced health bar with background"""
-        bar_width = self.size
+        bar_width = size
         bar_height = 6
         bar_y = screen_y - 12
         
@@ -256,13 +289,13 @@ class Castle:
             pygame.draw.rect(screen, health_color, 
                             (screen_x, bar_y, health_width, bar_height))
     
-    def _draw_defense_effects(self, screen, screen_x, screen_y, camera):
+    def _draw_defense_effects(self, screen, screen_x, screen_y, camera, size):
         """Draw castle defense system visual effects"""
         import math
         import time
         
-        castle_center_x = screen_x + self.size // 2
-        castle_center_y = screen_y + self.size // 2
+        castle_center_x = screen_x + size // 2
+        castle_center_y = screen_y + size // 2
         
         # Draw defense range indicator (subtle circle)
         if hasattr(self, 'defense_range'):
@@ -279,37 +312,20 @@ class Castle:
                              (range_radius, range_radius), range_radius, 2)
             screen.blit(range_surface, (castle_center_x - range_radius, castle_center_y - range_radius))
         
-        # Draw defense flash effect when attacking
+        # Muzzle flash when the defenses fire (the bolt itself is a projectile)
         if hasattr(self, 'defense_flash') and self.defense_flash > 0:
             flash_intensity = int(self.defense_flash * 255)
-            flash_surface = pygame.Surface((self.size + 20, self.size + 20), pygame.SRCALPHA)
+            flash_surface = pygame.Surface((size + 20, size + 20), pygame.SRCALPHA)
             flash_surface.fill((255, 255, 0, flash_intensity))
             screen.blit(flash_surface, (screen_x - 10, screen_y - 10))
-            
-            # Draw projectile effect if we have a target
-            if hasattr(self, 'defense_target') and self.defense_target:
-                target_screen_x, target_screen_y = camera.world_to_screen(
-                    self.defense_target.x, self.defense_target.y)
-                target_center_x = target_screen_x + (self.defense_target.size // 2 if hasattr(self.defense_target, 'size') else 0)
-                target_center_y = target_screen_y + (self.defense_target.size // 2 if hasattr(self.defense_target, 'size') else 0)
-                
-                # Draw energy beam
-                pygame.draw.line(screen, (255, 255, 0, flash_intensity), 
-                               (castle_center_x, castle_center_y), 
-                               (target_center_x, target_center_y), 3)
-                
-                # Draw impact effect at target
-                impact_radius = int(10 * self.defense_flash)
-                pygame.draw.circle(screen, (255, 255, 0), 
-                                 (target_center_x, target_center_y), impact_radius, 2)
         
         # Draw defense turrets on castle corners
         turret_size = 8
         turret_positions = [
             (screen_x + 5, screen_y + 5),  # Top-left
-            (screen_x + self.size - turret_size - 5, screen_y + 5),  # Top-right
-            (screen_x + 5, screen_y + self.size - turret_size - 5),  # Bottom-left
-            (screen_x + self.size - turret_size - 5, screen_y + self.size - turret_size - 5)  # Bottom-right
+            (screen_x + size - turret_size - 5, screen_y + 5),  # Top-right
+            (screen_x + 5, screen_y + size - turret_size - 5),  # Bottom-left
+            (screen_x + size - turret_size - 5, screen_y + size - turret_size - 5)  # Bottom-right
         ]
         
         for turret_x, turret_y in turret_positions:
@@ -334,14 +350,15 @@ class Castle:
     def is_alive(self):
         return self.health > 0
     
-    def defense_attack(self, target):
+    def defense_attack(self, target, current_time=None, projectiles=None):
         """Castle defense system attacks a target"""
         if self.owner != "player":
             return False
             
-        import pygame
-        current_time = pygame.time.get_ticks() / 1000.0
-        if current_time - self.last_defense_attack >= self.defense_cooldown:
+        if current_time is None:
+            import pygame
+            current_time = pygame.time.get_ticks() / 1000.0
+        if self.defense_ready:
             # Calculate distance to target
             target_x = target.x + (target.size // 2 if hasattr(target, 'size') else 0)
             target_y = target.y + (target.size // 2 if hasattr(target, 'size') else 0)
@@ -350,22 +367,33 @@ class Castle:
             
             distance = ((castle_center_x - target_x)**2 + (castle_center_y - target_y)**2)**0.5
             if distance <= self.defense_range:
-                target.take_damage(self.defense_damage)
+                if projectiles is not None:
+                    # Fire a bolt; it does the damage when it lands
+                    projectiles.launch('bolt', castle_center_x, castle_center_y, target,
+                                       target_x, target_y, self.defense_damage, self.owner,
+                                       self.defense_splash_radius)
+                else:
+                    target.take_damage(self.defense_damage)
                 self.last_defense_attack = current_time
+                self.defense_ready = False
                 self.defense_flash = 0.5  # Flash for 0.5 seconds
                 self.defense_target = target
                 return True
         return False
     
-    def update_defense(self, dt, enemy_units):
-        """Update castle defense system"""
+    def update_defense(self, dt, enemy_units, current_time=None, projectiles=None):
+        """Update castle defense system; returns True if it fired"""
         if self.owner != "player":
-            return
+            return False
             
         # Update visual effects
         if self.defense_flash > 0:
             self.defense_flash -= dt
         
+        # Reloading: no need to look for a target yet
+        if not self.defense_ready:
+            return False
+        
         # Find nearest enemy within range
         nearest_enemy = None
         nearest_distance = float('inf')
@@ -384,26 +412,20 @@ class Castle:
         
         # Attack nearest enemy
         if nearest_enemy:
-            self.defense_attack(nearest_enemy)
+            return self.defense_attack(nearest_enemy, current_time, projectiles)
+        return False
+    
+    def defense_reloaded(self):
+        """Scheduled callback: the defenses can fire again"""
+        self.defense_ready = True
     
     def _load_castle_image(self):
         """Load castle image based on owner"""
-        try:
-            # Get the path to the images folder
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            images_dir = os.path.join(current_dir, '..', 'ui', 'images')
-            
-            # Choose image based on owner
-            if self.owner == "player":
-                image_path = os.path.join(images_dir, "your_castle.jpeg")
-            else:
-                image_path = os.path.join(images_dir, "enemy_castle.jpeg")
-            
-            # Load and scale image
-            image = pygame.image.load(image_path)
-            # Scale to castle size
-            scaled_image = pygame.transform.scale(image, (self.size, self.size))
-            return scaled_image
-        except pygame.error:
-            print(f"Could not load castle image for {self.owner}")
-            return None
\ No newline at end of file
+        # Choose image based on owner
+        if self.owner == "player":
+            filename = "your_castle.jpeg"
+        else:
+            filename = "enemy_castle.jpeg"
+        
+        # Decoded once and shared; scaled to castle size
+        return sprite_cache.load_image(filename, (self.size, self.size))
\ No newline at end of file
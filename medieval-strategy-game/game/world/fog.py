@@ -0,0 +1,184 @@
+import math
+import pygame
+import numpy as np
+
+FOG_CELL = 32          # Fog cell in world pixels (one map tile)
+SIGHT_MARGIN = 64      # Units see this far past their engage radius (200) or attack range
+EXPLORED_ALPHA = 150   # Darkness over ground seen before but not watched now
+UNEXPLORED_ALPHA = 255
+
+class FogOfWar:
+    """What the player can see: per-cell viewer counts plus an explored mask.
+    
+    Every viewer (player unit, player castle) stamps a disc of +1 into the
+    counts around its cell and takes it back out when it leaves, so the grid
+    only changes when a viewer crosses a cell boundary; a cell is visible while
+    its count is above zero. Counts are uint16 rather than uint8 so a crowd of
+    more than 255 units around one spot cannot wrap them. The overlay is drawn
+    from the grid with surfarray into a one-pixel-per-cell texture, rebuilt
+    only after the grid changed and scaled up to the view.
+    """
+    
+    def __init__(self, world_width=1600, world_height=1600):
+        self.discs = {}  # radius in cells -> (dx, dy) offsets of the cells in the disc
+        self.set_world(world_width, world_height)
+    
+    def set_world(self, world_width, world_height):
+        self.width = max(1, math.ceil(world_width / FOG_CELL))
+        self.height = max(1, math.ceil(world_height / FOG_CELL))
+        self.counts = np.zeros((self.width, self.height), dtype=np.uint16)
+        self.explored = np.zeros((self.width, self.height), dtype=np.uint8)
+        self.texture = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+        self.clear()
+    
+    def clear(self):
+        self.counts.fill(0)
+        self.explored.fill(0)
+        self.stamps = {}  # viewer -> (cell_x, cell_y, radius in cells)
+        self.version = 0  # Bumped whenever the grid changes (overlay cache key)
+        self.texture_version = -1
+        self.scaled = None
+        self.scaled_key = None
+    
+    def cell_of(self, x, y):
+        return (min(max(int(x // FOG_CELL), 0), self.width - 1),
+                min(max(int(y // FOG_CELL), 0), self.height - 1))
+    
+    def is_visible(self, x, y):
+        cell_x, cell_y = self.cell_of(x, y)
+        return self.counts[cell_x, cell_y] > 0
+    
+    def is_explored(self, x, y):
+        cell_x, cell_y = self.cell_of(x, y)
+        return self.explored[cell_x, cell_y] > 0
+    
+    def visible_points(self, x, y):
+        """Visibility of many world points at once (NumPy arrays in, bool array out)"""
+        cell_x = np.clip((x // FOG_CELL).astype(np.int64), 0, self.width - 1)
+        cell_y = np.clip((y // FOG_CELL).astype(np.int64), 0, self.height - 1)
+        return self.counts[cell_x, cell_y] > 0
+    
+    def look(self, viewer, x, y, radius):
+        """Viewer now sees radius world pixels around (x, y); only restamps when it changed cell"""
+        cell_x, cell_y = self.cell_of(x, y)
+        radius = math.ceil(radius / FOG_CELL)
+        stamp = (cell_x, cell_y, radius)
+        old = self.stamps.get(viewer)
+        if old == stamp:
+            return
+        if old is not None:
+            self._stamp(old, -1)
+        self._stamp(stamp, 1)
+        self.stamps[viewer] = stamp
+    
+    def look_all(self, units):
+        """Stamp many units (all on the player's side) at once, as look() would one by one.
+        
+        Used when a snapshot brings back thousands of units: viewers are
+        counted per cell with a bincount for each sight radius, and the counts
+        spread over the disc as one shifted add per disc offset instead of one
+        disc stamp per unit.
+        """
+        if not units:
+            return
+        x = np.fromiter((unit.x + unit.size / 2 for unit in units), dtype=np.float64, count=len(units))
+        y = np.fromiter((unit.y + unit.size / 2 for unit in units), dtype=np.float64, count=len(units))
+        radii = np.fromiter((math.ceil(sight_radius(unit) / FOG_CELL) for unit in units), dtype=np.int64,
+                            count=len(units))
+        cell_x = np.clip((x // FOG_CELL).astype(np.int64), 0, self.width - 1)
+        cell_y = np.clip((y // FOG_CELL).astype(np.int64), 0, self.height - 1)
+        for unit, stamp in zip(units, zip(cell_x.tolist(), cell_y.tolist(), radii.tolist())):
+            old = self.stamps.get(unit)
+            if old is not None:
+                self._stamp(old, -1)
+            self.stamps[unit] = stamp
+        
+        added = np.zeros((self.width, self.height), dtype=np.uint16)
+        for radius in np.unique(radii).tolist():
+            mine = radii == radius
+            viewers = np.bincount(cell_x[mine] * self.height + cell_y[mine],
+                                  minlength=self.width * self.height).reshape(self.width, self.height).astype(np.uint16)
+            dx, dy = self.discs.get(radius) or self._disc(radius)
+            for offset_x, offset_y in zip(dx.tolist(), dy.tolist()):
+                # Viewers in cell (i, j) see cell (i + offset_x, j + offset_y)
+                added[max(0, offset_x):self.width + min(0, offset_x), max(0, offset_y):self.height + min(0, offset_y)] += \
+                    viewers[max(0, -offset_x):self.width - max(0, offset_x), max(0, -offset_y):self.height - max(0, offset_y)]
+        self.counts += added
+        self.explored[added > 0] = 1
+        self.version += 1
+    
+    def forget(self, viewer):
+        old = self.stamps.pop(viewer, None)
+        if old is not None:
+            self._stamp(old, -1)
+    
+    def follow(self, units):
+        """Restamp the units (all on the player's side) that crossed a cell boundary"""
+        stamps = self.stamps
+        for unit in units:
+            if unit.health <= 0:
+                continue
+            x = unit.x + unit.size / 2
+            y = unit.y + unit.size / 2
+            old = stamps.get(unit)
+            if old is None or int(x // FOG_CELL) != old[0] or int(y // FOG_CELL) != old[1]:
+                self.look(unit, x, y, sight_radius(unit))
+    
+    def sample(self, grid_width, grid_height):
+        """(visible, explored) bool grids resampled to another grid over the same world (the minimap)"""
+        xs = (np.arange(grid_width) * self.width) // grid_width
+        ys = (np.arange(grid_height) * self.height) // grid_height
+        return self.counts[np.ix_(xs, ys)] > 0, self.explored[np.ix_(xs, ys)] > 0
+    
+    def _stamp(self, stamp, delta):
+        cell_x, cell_y, radius = stamp
+        dx, dy = self.discs.get(radius) or self._disc(radius)
+        xs = dx + cell_x
+        ys = dy + cell_y
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        xs = xs[inside]
+        ys = ys[inside]
+        if delta > 0:
+            self.counts[xs, ys] += 1
+            self.explored[xs, ys] = 1
+        else:
+            self.counts[xs, ys] -= 1
+        self.version += 1
+    
+    def _disc(self, radius):
+        span = np.arange(-radius, radius + 1)
+        dx, dy = np.meshgrid(span, span, indexing='ij')
+        inside = dx * dx + dy * dy <= radius * radius
+        disc = (dx[inside], dy[inside])
+        self.discs[radius] = disc
+        return disc
+    
+    def render(self, screen, camera):
+        """Darken what is out of sight, black out what was never seen"""
+        if self.texture_version != self.version:
+            self.texture_version = self.version
+            alpha = np.where(self.counts > 0, 0, np.where(self.explored > 0, EXPLORED_ALPHA, UNEXPLORED_ALPHA))
+            pixels = pygame.surfarray.pixels_alpha(self.texture)
+            pixels[...] = alpha
+            del pixels  # Unlock the texture
+            self.scaled_key = None
+        
+        # Only the cells in view, scaled to the screen (cached while the camera and grid stay put)
+        left = max(0, int(camera.x // FOG_CELL))
+        top = max(0, int(camera.y // FOG_CELL))
+        right = min(self.width, int((camera.x + camera.view_width) // FOG_CELL) + 1)
+        bottom = min(self.height, int((camera.y + camera.view_height) // FOG_CELL) + 1)
+        if right <= left or bottom <= top:
+            return
+        cell = FOG_CELL * camera.zoom
+        size = (math.ceil((right - left) * cell), math.ceil((bottom - top) * cell))
+        key = (left, top, right, bottom, size)
+        if self.scaled_key != key:
+            self.scaled_key = key
+            self.scaled = pygame.transform.smoothscale(
+                self.texture.subsurface((left, top, right - left, bottom - top)), size)
+        screen.blit(self.scaled, ((left * FOG_CELL - camera.x) * camera.zoom, (top * FOG_CELL - camera.y) * camera.zoom))
+
+def sight_radius(unit):
+    """How far a player unit sees: past both its engage radius and its attack range"""
+    return max(200, unit.attack_range) + SIGHT_MARGIN
\ No newline at end of file
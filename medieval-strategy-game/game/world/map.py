@@ -1,7 +1,8 @@
 import pygame
 import random
 import math
-import os
+from .background_tiles import BackgroundTileCache
+from ..ui.sprite_cache import sprite_cache
 
 class GameMap:
     def __init__(self, width, height, tile_size=32):
@@ -11,8 +12,8 @@ class GameMap:
         self.world_width = width * tile_size
         self.world_height = height * tile_size
         
-        # Load background image
-        self.background_image = self._load_background_image()
+        # Load background image (streamed in tiles near the camera)
+        self.background_tiles = self._load_background_image()
         
         # Generate terrain for collision detection (simplified)
         self.terrain = self._generate_terrain()
@@ -39,7 +40,7 @@ class GameMap:
         self._render_background_layers(screen, camera)
         
         # Render background image
-        if self.background_image:
+        if self.background_tiles:
             self._render_background_image(screen, camera)
         else:
             # Fallback to original tile rendering if image fails to load
@@ -140,49 +141,45 @@ class GameMap:
         return max(0.6, min(1.2, base_light))
     
     def _load_background_image(self):
-        """Load the background landscape image"""
-        try:
-            # Get the path to the images folder
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            images_dir = os.path.join(current_dir, '..', 'ui', 'images')
-            image_path = os.path.join(images_dir, 'level_1_field.JPEG')
-            
-            # Load image
-            image = pygame.image.load(image_path)
-            
-            # Scale image to match world dimensions
-            scaled_image = pygame.transform.scale(image, (self.world_width, self.world_height))
-            return scaled_image
-        except pygame.error as e:
-            print(f"Could not load background image: {e}")
+        """Load the background landscape image as a tile cache"""
+        # Decoded once (normally ahead of time by the asset loader); tiles are cut from it lazily
+        image = sprite_cache.load_image('level_1_field.JPEG')
+        if image is None:
             return None
+        return BackgroundTileCache(image, self.world_width, self.world_height)
     
     def _render_background_image(self, screen, camera):
-        """Render the background image with camera offset"""
-        # Calculate the portion of the image to display based on camera position
-        source_rect = pygame.Rect(
-            int(camera.x), int(camera.y),
-            min(camera.screen_width, self.world_width - int(camera.x)),
-            min(camera.screen_height, self.world_height - int(camera.y))
-        )
-        
-        # Make sure we don't go outside image bounds
-        if source_rect.x < 0:
-            source_rect.x = 0
-        if source_rect.y < 0:
-            source_rect.y = 0
-        if source_rect.right > self.world_width:
-            source_rect.width = self.world_width - source_rect.x
-        if source_rect.bottom > self.world_height:
-            source_rect.height = self.world_height - source_rect.y
-        
-        # Calculate destination position on screen
-        dest_x = max(0, -camera.x) if camera.x < 0 else 0
-        dest_y = max(0, -camera.y) if camera.y < 0 else 0
-        
-        # Blit the visible portion of the background image
-        if source_rect.width > 0 and source_rect.height > 0:
-            screen.blit(self.background_image, (dest_x, dest_y), source_rect)
+        """Render the background tiles under the camera view"""
+        view_x, view_y = camera.x, camera.y
+        view_width, view_height = camera.view_width, camera.view_height
+        zoom = camera.zoom
+        
+        # Warm up the tiles around the view before the camera reaches them
+        self.background_tiles.prefetch(view_x, view_y, view_width, view_height, zoom)
+        
+        world_tile = self.background_tiles.world_tile_size(zoom)
+        for tile_x, tile_y in self.background_tiles.visible_tiles(view_x, view_y, view_width, view_height, zoom):
+            tile = self.background_tiles.get_tile(tile_x, tile_y, zoom)
+            screen_x, screen_y = camera.world_to_screen(tile_x * world_tile, tile_y * world_tile)
+            screen.blit(tile, (math.floor(screen_x), math.floor(screen_y)))
+    
+    def render_overview(self, width, height):
+        """Render the whole map into a small surface (used by the minimap)"""
+        if self.background_tiles:
+            return pygame.transform.smoothscale(self.background_tiles.source, (width, height))
+        
+        # Fallback: paint the terrain grid with the base tile colors
+        terrain_colors = {'grass': (34, 139, 34)}
+        overview = pygame.Surface((self.width, self.height))
+        for y in range(self.height):
+            for x in range(self.width):
+                overview.set_at((x, y), terrain_colors.get(self.terrain[y][x], (0, 0, 0)))
+        return pygame.transform.scale(overview, (width, height))
+    
+    def close(self):
+        """Release streamed background tiles and stop the preloading thread"""
+        if self.background_tiles:
+            self.background_tiles.close()
     
     def _render_tiles_fallback(self, screen, camera):
         """Fallback tile rendering if background image fails to load"""
@@ -194,8 +191,9 @@ class GameMap:
         # Calculate visible tiles
         start_x = max(0, int(camera.x // self.tile_size))
         start_y = max(0, int(camera.y // self.tile_size))
-        end_x = min(self.width, int((camera.x + camera.screen_width) // self.tile_size) + 1)
-        end_y = min(self.height, int((camera.y + camera.screen_height) // self.tile_size) + 1)
+        end_x = min(self.width, int((camera.x + camera.view_width) // self.tile_size) + 1)
+        end_y = min(self.height, int((camera.y + camera.view_height) // self.tile_size) + 1)
+        tile_screen_size = max(1, math.ceil(self.tile_size * camera.zoom))
         
         # Render visible tiles
         for y in range(start_y, end_y):
@@ -218,7 +216,11 @@ class GameMap:
                 
                 # Draw tile
                 pygame.draw.rect(screen, color, 
-                               (screen_x, screen_y, self.tile_size, self.tile_size))
+                               (screen_x, screen_y, tile_screen_size, tile_screen_size))
+                
+                # Grass details are lost when zoomed out
+                if camera.zoom < 1.0:
+                    continue
                 
                 # Add simple grass details
                 pygame.draw.circle(screen, (20, 100, 20), 
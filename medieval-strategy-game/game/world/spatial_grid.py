@@ -0,0 +1,81 @@
+class SpatialGrid:
+    """Uniform hash grid for finding objects near a point or inside a rectangle.
+    
+    Objects are filed under the cell containing their (x, y). Callers keep the
+    grid in sync with insert/move/remove; move() is cheap when an object stays
+    in its cell, which is almost every frame. Set on_enter to hear about every
+    object filed under a new cell.
+    """
+    
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}        # (cell_x, cell_y) -> list of objects
+        self.object_cells = {}  # object -> (cell_x, cell_y)
+        self.on_enter = None    # Called as on_enter(obj, cell) when an object is inserted or changes cell
+    
+    def cell_of(self, x, y):
+        return (int(x // self.cell_size), int(y // self.cell_size))
+    
+    def insert(self, obj, x, y):
+        cell = self.cell_of(x, y)
+        self.object_cells[obj] = cell
+        self.cells.setdefault(cell, []).append(obj)
+        if self.on_enter is not None:
+            self.on_enter(obj, cell)
+    
+    def remove(self, obj):
+        cell = self.object_cells.pop(obj, None)
+        if cell is None:
+            return
+        bucket = self.cells[cell]
+        bucket.remove(obj)
+        if not bucket:
+            del self.cells[cell]
+    
+    def move(self, obj, x, y):
+        """Refile an object after it moved; returns True if it changed cell"""
+        cell = (int(x // self.cell_size), int(y // self.cell_size))
+        old_cell = self.object_cells.get(obj)
+        if cell == old_cell:
+            return False
+        if old_cell is not None:
+            bucket = self.cells[old_cell]
+            bucket.remove(obj)
+            if not bucket:
+                del self.cells[old_cell]
+        self.object_cells[obj] = cell
+        self.cells.setdefault(cell, []).append(obj)
+        if self.on_enter is not None:
+            self.on_enter(obj, cell)
+        return True
+    
+    def clear(self):
+        self.cells.clear()
+        self.object_cells.clear()
+    
+    def __len__(self):
+        return len(self.object_cells)
+    
+    def query_rect(self, x, y, width, height):
+        """Objects filed in any cell overlapping the rectangle (a superset of the exact answer)"""
+        min_x, min_y = self.cell_of(x, y)
+        max_x, max_y = self.cell_of(x + width, y + height)
+        cells = self.cells
+        found = []
+        
+        # Walk whichever is smaller: the cells in the rectangle or the occupied cells
+        if (max_x - min_x + 1) * (max_y - min_y + 1) <= len(cells):
+            for cell_x in range(min_x, max_x + 1):
+                for cell_y in range(min_y, max_y + 1):
+                    bucket = cells.get((cell_x, cell_y))
+                    if bucket:
+                        found.extend(bucket)
+        else:
+            for (cell_x, cell_y), bucket in cells.items():
+                if min_x <= cell_x <= max_x and min_y <= cell_y <= max_y:
+                    found.extend(bucket)
+        return found
+    
+    def query_radius(self, x, y, radius):
+        """Objects filed in cells that a circle could touch (callers check exact distance)"""
+        return self.query_rect(x - radius, y - radius, radius * 2, radius * 2)
\ No newline at end of file
@@ -1,8 +1,15 @@
+import argparse
 import pygame
 import sys
 from game.game_manager import GameManager
 
 def main():
+    parser = argparse.ArgumentParser(description="Kingdom Heroes")
+    parser.add_argument("--sim-process", action="store_true", help="run the simulation in a separate process")
+    parser.add_argument("--sim-workers", type=int, default=0,
+                        help="cores for unit movement and target search (split into map regions)")
+    args = parser.parse_args()
+    
     pygame.init()
     
     # Game settings
@@ -16,27 +23,29 @@ def main():
     clock = pygame.time.Clock()
     
     # Initialize game manager
-    game_manager = GameManager(screen, SCREEN_WIDTH, SCREEN_HEIGHT)
-    
-    # Main game loop
-    running = True
-    while running:
-        dt = clock.tick(FPS) / 1000.0  # Delta time in seconds
-        
-        # Handle events
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            else:
-                game_manager.handle_event(event)
-        
-        # Update game
-        game_manager.update(dt)
-        
-        # Render game
-        game_manager.render()
-        pygame.display.flip()
+    game_manager = GameManager(screen, SCREEN_WIDTH, SCREEN_HEIGHT, args.sim_process, args.sim_workers)
     
+    # Main game loop (worker processes are stopped in shutdown, even after an error)
+    try:
+        running = True
+        while running:
+            dt = clock.tick(FPS) / 1000.0  # Delta time in seconds
+            
+            # Handle events
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                else:
+                    game_manager.handle_event(event)
+            
+            # Update game
+            game_manager.update(dt)
+            
+            # Render game
+            game_manager.render()
+            pygame.display.flip()
+    finally:
+        game_manager.shutdown()
     pygame.quit()
     sys.exit()
 
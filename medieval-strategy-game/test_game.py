@@ -68,6 +68,794 @@ def test_basic_functionality():
         print(f"✗ Functionality test error: {e}")
         return False
 
+def test_balance_run_resumes():
+    import json
+    import os
+    import tempfile
+    from game.balance import run_balance, load_results, match_seed
+    
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "results.jsonl")
+        finished = {'level': 1, 'policy': 'idle', 'match': 0, 'seed': 0, 'result': 'win', 'seconds': -1.0}
+        with open(path, "w") as f:
+            f.write(json.dumps(finished) + "\n")
+        
+        # Only the match missing from the file runs; the finished one is left as it was
+        run_balance([1], ['idle'], 2, path, workers=1, max_seconds=1)
+        results = load_results(path)
+        assert results[0] == finished and len(results) == 2
+        assert (results[1]['match'], results[1]['seed']) == (1, match_seed(0, 1, 'idle', 1))
+        
+        # Nothing left to do the second time round
+        run_balance([1], ['idle'], 2, path, workers=1, max_seconds=1)
+        assert load_results(path) == results
+    print("✓ Balance resume tests passed")
+
+def test_background_tile_cache():
+    import pygame
+    from game.world.background_tiles import BackgroundTileCache
+    
+    # A large world only keeps a bounded number of scaled tiles around
+    source = pygame.Surface((64, 64))
+    tiles = BackgroundTileCache(source, 16000, 16000, tile_size=256, max_tiles=8)
+    for tile_x, tile_y in tiles.visible_tiles(0, 0, 1500, 1000):
+        tile = tiles.get_tile(tile_x, tile_y)
+        assert tile.get_size() == (256, 256)
+    assert tiles.cached_tile_count() == 8
+    
+    # Edge tiles are clipped to the world
+    edge = BackgroundTileCache(source, 300, 300, tile_size=256)
+    assert edge.get_tile(1, 1).get_size() == (44, 44)
+    tiles.close()
+    print("✓ Background tile cache tests passed")
+
+def test_camera_zoom_and_mip_cache():
+    import pygame
+    from game.world.camera import Camera, ZOOM_LEVELS
+    from game.ui.sprite_cache import SpriteCache, scale_surface
+    
+    # Zooming stops at the first and last step; the point under the anchor stays put
+    camera = Camera(800, 600, 1600, 1600)
+    camera.center_on(800, 800)
+    camera.zoom_by(1, anchor=(400, 300))
+    assert camera.zoom == 1.5 and camera.screen_to_world(400, 300) == (800, 800)
+    camera.zoom_by(10)
+    assert camera.zoom == ZOOM_LEVELS[-1]
+    camera.zoom_by(-10)
+    assert camera.zoom == ZOOM_LEVELS[0]
+    
+    # Zoomed out past the whole world, the view is pinned to the top-left
+    assert camera.view_width > 1600 and (camera.x, camera.y) == (0, 0)
+    
+    # A sprite is scaled once per zoom step and reused after that
+    cache = SpriteCache()
+    image = pygame.Surface((48, 48))
+    builds = []
+    def build(zoom):
+        builds.append(zoom)
+        return scale_surface(image, zoom)
+    for zoom in (0.5, 1.0, 0.5, 2.0, 1.0, 2.0):
+        sprite = cache.get_mip(('unit', 'knight', 'player'), zoom, build)
+        assert sprite.get_size() == (round(48 * zoom), round(48 * zoom))
+    assert builds == [0.5, 1.0, 2.0]
+    assert cache.get_mip(('unit', 'knight', 'player'), 1.0, build) is image
+    print("✓ Camera zoom tests passed")
+
+def test_minimap_density_follows_units():
+    import pygame
+    from game.ui.minimap import Minimap
+    from game.entities.unit import Unit
+    
+    minimap = Minimap(pygame.Rect(0, 0, 100, 100), grid_size=10, update_interval=0.2)
+    minimap.world_width = minimap.world_height = 1600  # 160 px cells
+    knight = Unit(100, 100, 'knight', 'player')
+    archer = Unit(100, 100, 'archer', 'player')
+    raider = Unit(1000, 500, 'cavalry', 'enemy')
+    units = [knight, archer, raider]
+    minimap.update(0.2, units, [], [])
+    assert minimap.player_density[0, 0] == 2 and minimap.enemy_density[6, 3] == 1
+    assert minimap.player_density.sum() == 2 and minimap.enemy_density.sum() == 1
+    
+    # Moves only show up at the next refresh, and leave the old cell
+    knight.x, knight.y = 700, 1200
+    minimap.update(0.1, units, [], [])
+    assert minimap.player_density[0, 0] == 2
+    minimap.update(0.1, units, [], [])
+    assert minimap.player_density[0, 0] == 1 and minimap.player_density[4, 7] == 1
+    
+    # Units that left play are counted out
+    minimap.update(0.2, [knight, archer], [], [])
+    assert minimap.enemy_density.sum() == 0 and minimap.player_density.sum() == 2
+    print("✓ Minimap tests passed")
+
+def test_asset_loader_finishes_all_images():
+    import pygame
+    from game.ui.asset_loader import AssetLoader, UNIT_IMAGE_TYPES, UNIT_IMAGE_SIZE
+    from game.ui.sprite_cache import SpriteCache
+    
+    cache = SpriteCache()
+    loader = AssetLoader(cache, max_workers=2)
+    try:
+        loader.queue_game_assets(800, 600)
+        loader.queue("missing.jpeg", None, "menu")
+        loader.finish_all()
+        
+        # Every image is decoded, scaled and in the cache; a missing file is None, not an error
+        assert loader.is_done() and not loader.futures
+        assert cache.get_image("menubackground.jpeg", (800, 600)).get_size() == (800, 600)
+        for unit_type in UNIT_IMAGE_TYPES:
+            image = cache.get_image(f"{unit_type}.jpeg", UNIT_IMAGE_SIZE)
+            assert isinstance(image, pygame.Surface) and image.get_size() == UNIT_IMAGE_SIZE
+        assert cache.has_image("missing.jpeg") and cache.get_image("missing.jpeg") is None
+        
+        # Already loaded images are not queued again
+        loader.queue("knight.jpeg", UNIT_IMAGE_SIZE)
+        assert not loader.futures
+    finally:
+        loader.shutdown()
+    print("✓ Asset loader tests passed")
+
+def test_game_state_reset_starts_clean():
+    import pygame
+    from game.replay import HeadlessManager
+    from game.states.game_state import GameState
+    
+    pygame.init()
+    game_state = GameState(HeadlessManager((800, 600), 3))
+    game_state.recorder.enabled = False
+    unit_manager = game_state.unit_manager
+    fog = unit_manager.fog
+    fresh_counts = fog.counts.copy()
+    fresh_explored = fog.explored.copy()
+    game_map = game_state.game_map
+    
+    # Play a little: a scout far out, a fight, a pending cooldown, a selection
+    scout = unit_manager.spawn_unit(1300, 1300, 'cavalry', 'player')
+    unit_manager.spawn_unit(1340, 1300, 'archer', 'enemy')
+    unit_manager.select_unit(scout)
+    for _ in range(90):
+        game_state.simulate(1 / 60)
+    game_state.update(0.3)
+    game_state.events.at(game_state.sim_time + 5.0, scout.cooldown_ready, scout.unit_id)
+    assert fog.is_explored(1300, 1300) and len(game_state.events) > 2
+    assert game_state.hud.minimap.unit_cells and game_state.sim_tick > 0
+    
+    # A restart reuses the world but keeps nothing from the match
+    game_state.reset(None)
+    assert game_state.game_map is game_map and game_state.unit_manager is unit_manager
+    assert unit_manager.units == [] and unit_manager.selected_units == []
+    assert not unit_manager.grid.object_cells and not unit_manager.trails.slots
+    assert len(unit_manager.projectiles) == 0 and not unit_manager.index.owner('player')
+    assert not unit_manager.influence.strength.any() and not unit_manager.economy.workers
+    assert len(game_state.events) == 2 and game_state.sim_tick == 0
+    assert game_state.events.due(game_state.collect_income) == game_state.resource_interval
+    assert (fog.counts == fresh_counts).all() and (fog.explored == fresh_explored).all()
+    assert not game_state.hud.minimap.unit_cells and not game_state.hud.minimap.player_density.any()
+    assert not game_state.game_over
+    print("✓ Game state reset tests passed")
+
+def test_snapshot_round_trip():
+    import pygame
+    import random
+    from game.snapshot import capture_snapshot, restore_snapshot
+    from game.states.game_state import GameState
+    from game.entities.unit import Unit
+    
+    class StubManager:
+        screen = pygame.Surface((800, 600))
+        screen_width = 800
+        screen_height = 600
+        current_level = 2
+        current_level_info = {'spawn_rate': 0.8, 'enemy_mult': 1.2}
+    
+    pygame.init()
+    game_state = GameState(StubManager())
+    battalion = Unit(400, 400, 'battalion', "player")
+    game_state.unit_manager.add_unit(battalion)
+    battalion.spawn_battalion_knights(game_state.unit_manager)
+    archer = Unit(900, 700, 'archer', "enemy")
+    game_state.unit_manager.add_unit(archer)
+    game_state.unit_manager.select_unit(battalion)
+    game_state.player_castle.resources['gold'] = 1234
+    archer.cooling = True
+    game_state.events.at(1.0, archer.cooldown_ready, archer.unit_id)
+    
+    data = capture_snapshot(game_state)
+    expected = [(unit.unit_type, unit.owner, unit.x, unit.y, unit.health) for unit in game_state.unit_manager.units]
+    rng_state = random.getstate()
+    
+    # Restoring into a fresh match brings back units, links, selection and RNG
+    game_state.reset(None)
+    random.random()
+    restore_snapshot(game_state, data)
+    units = game_state.unit_manager.units
+    assert [(unit.unit_type, unit.owner, unit.x, unit.y, unit.health) for unit in units] == expected
+    assert units[0].squad.members == units[1:7] and units[1].squad is units[0].squad
+    assert units[1].squad.offsets[units[1]] == (-30, -30)
+    assert game_state.unit_manager.selected_units == [units[0]]
+    assert game_state.player_castle.resources['gold'] == 1234
+    assert len(game_state.enemy_castles) == 2
+    assert random.getstate() == rng_state
+    
+    # Timed events come back from the state that scheduled them
+    assert units[-1].cooling and len(game_state.events) == 3
+    assert game_state.events.due(game_state.send_enemy_wave) == 25.0 * 0.8
+    print("✓ Snapshot round-trip tests passed")
+
+def test_snapshot_keeps_unit_ids():
+    import pygame
+    from game.snapshot import capture_snapshot, restore_snapshot
+    from game.replay import HeadlessManager
+    from game.states.game_state import GameState
+    
+    pygame.init()
+    game_state = GameState(HeadlessManager((800, 600), 1))
+    unit_manager = game_state.unit_manager
+    for index in range(5):
+        unit_manager.spawn_unit(300 + index * 60, 300, 'knight', 'player')
+    # Ids with gaps, and a next id past the last unit still alive
+    for unit in unit_manager.units[1::2]:
+        unit.take_damage(unit.health)
+        unit_manager.remove_unit(unit)
+    unit_manager.spawn_unit(900, 900, 'archer', 'enemy')
+    unit_manager.remove_unit(unit_manager.units[-1])
+    ids = [unit.unit_id for unit in unit_manager.units]
+    next_unit_id = unit_manager.next_unit_id
+    assert ids == [0, 2, 4] and next_unit_id == 6
+    
+    data = capture_snapshot(game_state)
+    game_state.reset(None)
+    restore_snapshot(game_state, data)
+    assert [unit.unit_id for unit in unit_manager.units] == ids
+    assert unit_manager.next_unit_id == next_unit_id
+    assert unit_manager.spawn_unit(100, 100, 'knight', 'player').unit_id == next_unit_id
+    print("✓ Snapshot unit id tests passed")
+
+def test_snapshot_restore_is_fast_for_big_matches():
+    import pygame
+    import random
+    import time
+    from game.snapshot import capture_snapshot, restore_snapshot
+    from game.replay import HeadlessManager
+    from game.states.game_state import GameState
+    
+    pygame.init()
+    game_state = GameState(HeadlessManager((800, 600), 3))
+    rng = random.Random(5)
+    for index in range(5000):
+        game_state.unit_manager.spawn_unit(rng.uniform(0, 1550), rng.uniform(0, 1550),
+                                           rng.choice(['knight', 'archer', 'cavalry', 'catapult']),
+                                           "player" if index % 2 else "enemy")
+    data = capture_snapshot(game_state)
+    counts = game_state.unit_manager.fog.counts.copy()
+    
+    # The sight of every unit is stamped in one pass, to the same counts as one by one
+    times = []
+    for _ in range(3):
+        start = time.perf_counter()
+        restore_snapshot(game_state, data)
+        times.append(time.perf_counter() - start)
+    assert (game_state.unit_manager.fog.counts == counts).all()
+    assert min(times) < 0.1
+    print("✓ Snapshot restore time tests passed")
+
+def test_spatial_grid():
+    from game.world.spatial_grid import SpatialGrid
+    
+    grid = SpatialGrid(100)
+    grid.insert('a', 50, 50)
+    grid.insert('b', 450, 50)
+    grid.insert('c', 950, 950)
+    assert sorted(grid.query_rect(0, 0, 500, 100)) == ['a', 'b']
+    
+    # Moving within a cell is a no-op; crossing a boundary refiles the object
+    assert not grid.move('a', 60, 60)
+    assert grid.move('a', 900, 900)
+    assert sorted(grid.query_radius(920, 920, 50)) == ['a', 'c']
+    grid.remove('c')
+    assert grid.query_rect(900, 900, 99, 99) == ['a'] and len(grid) == 2
+    print("✓ Spatial grid tests passed")
+
+def test_replay_is_deterministic():
+    import pygame
+    from game.replay import ReplayLog, HeadlessManager, run_replay
+    from game.states.game_state import GameState
+    
+    pygame.init()
+    game_state = GameState(HeadlessManager((800, 600), 3, {'spawn_rate': 0.1, 'enemy_mult': 1.0}))
+    game_state.player_castle.persist_upgrades = False
+    game_state.player_castle.resources['gold'] = 500
+    game_state.recorder.hash_interval = 30
+    game_state.recorder.start(game_state, game_state.match_seed)
+    
+    # Recruit through the HUD, then order the new units somewhere
+    for button in list(game_state.hud.recruit_buttons.values())[:3]:
+        game_state.click_hud(*button.center)
+    for unit in game_state.unit_manager.units:
+        game_state.unit_manager.select_unit(unit)
+    game_state.move_selected_units(900, 700)
+    for _ in range(120):
+        game_state.simulate(1 / 60)
+    
+    # Replaying the encoded log reproduces every checkpoint hash
+    log = ReplayLog.decode(game_state.recorder.log.encode())
+    ticks, seconds, mismatches = run_replay(log)
+    assert ticks == 120 and len(log.hashes) == 4
+    assert len(log.commands) == 5
+    assert mismatches == []
+    print("✓ Replay determinism tests passed")
+
+def test_unit_pool_recycles_fully_reset_units():
+    from game.entities.unit import UnitManager
+    
+    unit_manager = UnitManager()
+    battalion = unit_manager.spawn_unit(300, 300, 'battalion', 'player')
+    battalion.spawn_battalion_knights(unit_manager)
+    knight = battalion.squad.members[0]
+    enemy = unit_manager.spawn_unit(340, 300, 'archer', 'enemy')
+    assert unit_manager.pool.stats()['misses'] == 8 and unit_manager.pool.hits == 0
+    
+    # A dead elite knight that was cooling, asleep, locked on and locked onto
+    knight.set_target(enemy)
+    enemy.set_target(knight)
+    knight.cooling = True
+    knight.asleep = True
+    knight.take_damage(40)
+    knight.health = 0
+    unit_manager.remove_unit(knight)
+    assert unit_manager.pool.stats()['pooled'] == 1
+    
+    # The next knight is the same object, back to a fresh unit in every field
+    recycled = unit_manager.spawn_unit(700, 700, 'knight', 'enemy')
+    assert recycled is knight
+    assert recycled.health == recycled.max_health and recycled.owner == 'enemy'
+    assert not recycled.cooling and not recycled.asleep and not recycled.is_elite
+    assert recycled.target_enemy is None and recycled.targeted_by == []
+    assert recycled.squad is None and recycled not in battalion.squad.members
+    assert enemy.target_enemy is None and enemy.targeted_by == []
+    
+    stats = unit_manager.pool.stats()
+    assert (stats['hits'], stats['misses'], stats['pooled']) == (1, 8, 0)
+    assert stats['hit_rate'] == 1 / 9
+    assert len(stats['gc_collections']) == 3 and all(count >= 0 for count in stats['gc_collections'])
+    print("✓ Unit pool tests passed")
+
+def test_trails_release_stopped_units():
+    from game.entities.unit import Unit
+    from game.entities.trails import TrailBuffer
+    
+    trails = TrailBuffer(sample_interval=0.05)
+    walker = Unit(0, 0, 'knight', 'player')
+    starter = Unit(100, 0, 'knight', 'player')
+    walker.is_moving = True
+    trails.update(0.05, [walker, starter])
+    assert list(trails.slots) == [walker]
+    
+    # One unit stops in the same sample another starts: the stopped one's trail goes
+    walker.is_moving = False
+    starter.is_moving = True
+    trails.update(0.05, [walker, starter])
+    assert list(trails.slots) == [starter] and len(trails.free_slots) == 63
+    print("✓ Trail tests passed")
+
+def test_projectiles_land_after_flight():
+    from game.entities.unit import UnitManager
+    
+    unit_manager = UnitManager()
+    archer = unit_manager.spawn_unit(0, 0, 'archer', 'player')
+    knight = unit_manager.spawn_unit(60, 0, 'knight', 'enemy')
+    assert archer.attack(knight, 1.0, unit_manager.projectiles)
+    assert len(unit_manager.projectiles) == 1 and knight.health == knight.max_health
+    
+    # 60 px between centers at arrow speed takes 0.13 s; damage lands on arrival
+    unit_manager.projectiles.update(0.1)
+    assert knight.health == knight.max_health
+    unit_manager.projectiles.update(0.05)
+    assert len(unit_manager.projectiles) == 0 and knight.health == knight.max_health - archer.attack_damage
+    
+    # Cooling down until the ready event, which a recycled unit's stale event cannot cut short
+    assert not archer.attack(knight, 3.0, unit_manager.projectiles)
+    archer.cooldown_ready(archer.unit_id + 1)
+    assert archer.cooling
+    archer.cooldown_ready(archer.unit_id)
+    
+    # A shot at a unit that died and was recycled does not hit the new unit
+    assert archer.attack(knight, 3.0, unit_manager.projectiles)
+    knight.take_damage(knight.health)
+    unit_manager.remove_unit(knight)
+    recycled = unit_manager.spawn_unit(60, 0, 'knight', 'enemy')
+    assert recycled is knight
+    unit_manager.projectiles.update(1.0)
+    assert recycled.health == recycled.max_health
+    print("✓ Projectile tests passed")
+
+def test_area_damage_falloff():
+    from game.entities.unit import UnitManager
+    from game.world.castle import Castle
+    
+    unit_manager = UnitManager()
+    center = unit_manager.spawn_unit(76, 76, 'giant', 'enemy')   # centered on the blast
+    edge = unit_manager.spawn_unit(126, 76, 'giant', 'enemy')    # 50 px away
+    outside = unit_manager.spawn_unit(176, 76, 'giant', 'enemy')  # 100 px away
+    friendly = unit_manager.spawn_unit(80, 80, 'giant', 'player')
+    castle = Castle(150, 0, "enemy")
+    
+    hit = unit_manager.area_damage.apply(100, 100, 60, 100, 'player', [castle])
+    assert hit == 3
+    assert center.max_health - center.health == 100
+    assert 30 <= edge.max_health - edge.health < 100
+    assert outside.health == outside.max_health and friendly.health == friendly.max_health
+    assert castle.health < castle.max_health
+    print("✓ Area damage tests passed")
+
+def test_ai_scheduler_slices_and_urgent():
+    from game.entities.ai_scheduler import AIScheduler
+    
+    class Dummy:
+        health = 1
+    
+    units = [Dummy() for _ in range(10)]
+    scheduler = AIScheduler(buckets=4, budget_ms=None)
+    seen = []
+    
+    # Each tick covers a quarter of the units, round-robin
+    scheduler.run(units, seen.append)
+    assert seen == units[:3]
+    
+    # Woken units go first, on top of the regular slice
+    scheduler.wake(units[9])
+    scheduler.run(units, seen.append)
+    assert seen[3:] == [units[9]] + units[3:6]
+    
+    # Replays run exactly the recorded number of evaluations
+    scheduler.forced_steps = 1
+    assert scheduler.run(units, seen.append) == 1 and seen[-1] is units[6]
+    print("✓ AI scheduler tests passed")
+
+def test_sticky_targets():
+    from game.entities.unit import UnitManager, TARGET_HYSTERESIS
+    
+    unit_manager = UnitManager()
+    knight = unit_manager.spawn_unit(0, 0, 'knight', 'player')
+    first = unit_manager.spawn_unit(-14, -14, 'peasant', 'enemy')   # center 14 px away
+    second = unit_manager.spawn_unit(-4, -24, 'peasant', 'enemy')   # center 20 px away
+    assert unit_manager.combat_target(knight, None, []) is first
+    assert first.targeted_by == [knight]
+    
+    # A closer enemy does not steal the lock, and the lock survives a short step out of range
+    first.x, first.y = -24 - knight.attack_range - TARGET_HYSTERESIS // 2, -24
+    assert unit_manager.combat_target(knight, None, []) is first
+    
+    # Removing the target drops the lock; the next search finds the other enemy
+    first.take_damage(first.health)
+    unit_manager.remove_unit(first)
+    assert knight.target_enemy is None
+    assert unit_manager.combat_target(knight, None, []) is second
+    
+    # A player order overrides the lock
+    unit_manager.select_unit(knight)
+    unit_manager.move_selected_units(500, 500)
+    assert knight.target_enemy is None and second.targeted_by == []
+    print("✓ Sticky target tests passed")
+
+def test_frame_buffers_hand_over_whole_frames():
+    from game.sim_process import FrameBuffers, HEADER_TICK, HEADER_UNITS
+    
+    writer = FrameBuffers()
+    reader = FrameBuffers(writer.shm.name)
+    try:
+        assert reader.read() is None  # Nothing published yet
+        for tick in (1, 2):
+            frame = writer.begin_write()
+            frame['unit_id'][:3] = [7, 8, 9]
+            frame['header'][HEADER_TICK] = tick
+            frame['header'][HEADER_UNITS] = 3
+            writer.end_write()
+        frame = reader.read()
+        assert frame['header'][HEADER_TICK] == 2 and frame['unit_id'].tolist() == [7, 8, 9]
+        assert reader.read() is None  # Already seen
+    finally:
+        reader.close()
+        writer.close()
+    print("✓ Frame buffer tests passed")
+
+def test_frames_report_units_past_the_cap():
+    import contextlib
+    import io
+    import pygame
+    from game import sim_process
+    from game.sim_process import FrameBuffers, SimulationProcess, publish_frame
+    from game.replay import HeadlessManager
+    from game.states.game_state import GameState
+    
+    pygame.init()
+    game_state = GameState(HeadlessManager((800, 600), 1))
+    for index in range(5):
+        game_state.unit_manager.spawn_unit(100 + index * 60, 300, 'knight', 'player')
+    buffers = FrameBuffers()
+    cap = sim_process.MAX_UNITS
+    sim_process.MAX_UNITS = 3
+    try:
+        publish_frame(buffers, game_state, 0, 1.0)
+        
+        # The frame holds the first units only, but says how many there are
+        mirror = SimulationProcess.__new__(SimulationProcess)
+        mirror.buffers = FrameBuffers(buffers.shm.name)
+        mirror.process = type('Running', (), {'is_alive': lambda self: True})()
+        mirror.generation = mirror.shown_generation = 0
+        mirror.reported_exit = mirror.reported_cap = False
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            assert mirror.sync(game_state)
+            publish_frame(buffers, game_state, 0, 1.0)
+            assert mirror.sync(game_state)
+        assert output.getvalue().count("Warning") == 1 and "5 units" in output.getvalue()
+        assert len(game_state.unit_manager.units) == 3
+        mirror.buffers.close()
+    finally:
+        sim_process.MAX_UNITS = cap
+        buffers.close()
+    print("✓ Frame cap tests passed")
+
+def test_region_update_matches_serial():
+    import random
+    from game.entities.unit import UnitManager
+    from game.entities.regions import UNKNOWN
+    
+    serial, split = UnitManager(), UnitManager()
+    split.use_regions(1)
+    rng = random.Random(3)
+    for index in range(300):
+        x, y = rng.uniform(0, 800), rng.uniform(0, 800)
+        unit_type = rng.choice(['knight', 'archer', 'catapult'])
+        owner = 'player' if index % 2 else 'enemy'
+        for unit_manager in (serial, split):
+            unit_manager.spawn_unit(x, y, unit_type, owner).move_to(x + 90, y - 40)
+    try:
+        for _ in range(20):
+            serial.update(1 / 60)
+            split.update(1 / 60)
+        assert [(unit.x, unit.y, unit.is_moving) for unit in serial.units] == \
+            [(unit.x, unit.y, unit.is_moving) for unit in split.units]
+        
+        # The precomputed nearest enemy is the one a grid search finds
+        checked = 0
+        for unit in split.units:
+            target = split.regions.nearest_hostile(unit)
+            if target is not UNKNOWN:
+                assert target is split._nearest_hostile(unit, unit.attack_range, to_center=True)
+                checked += 1
+        assert checked > 250
+    finally:
+        split.close_regions()
+    print("✓ Region update tests passed")
+
+def test_steering_spreads_stacked_units():
+    from game.entities.unit import UnitManager
+    
+    unit_manager = UnitManager()
+    knights = [unit_manager.spawn_unit(100, 100, 'knight', 'player') for _ in range(4)]
+    for _ in range(60):
+        unit_manager.steering.update(1 / 60, unit_manager.units, unit_manager.grid)
+    spots = {(round(knight.x), round(knight.y)) for knight in knights}
+    assert len(spots) == 4
+    # Each knight is back in the grid cell of its new position
+    grid = unit_manager.grid
+    assert all(grid.object_cells[knight] == grid.cell_of(knight.x, knight.y) for knight in knights)
+    print("✓ Steering tests passed")
+
+def test_squads_follow_leader():
+    from game.entities.unit import UnitManager
+    
+    unit_manager = UnitManager()
+    battalion = unit_manager.spawn_unit(300, 300, 'battalion', 'player')
+    battalion.spawn_battalion_knights(unit_manager)
+    squad = battalion.squad
+    knights = squad.members[:]
+    assert len(knights) == 6 and all(knight.squad is squad for knight in knights)
+    
+    # Ordering the leader moves the whole squad into formation around the destination
+    unit_manager.select_unit(battalion)
+    unit_manager.move_selected_units(900, 300)
+    destination = (battalion.target_x, battalion.target_y)
+    assert [(knight.target_x, knight.target_y) for knight in knights[:2]] == \
+        [(destination[0] - 30, destination[1] - 30), (destination[0] + 30, destination[1] - 30)]
+    
+    # A member ordered on its own leaves; a lost leader hands over to the oldest member
+    unit_manager.deselect_all()
+    unit_manager.select_unit(knights[5])
+    unit_manager.move_selected_units(100, 100)
+    assert knights[5].squad is None and len(squad.members) == 5
+    battalion.take_damage(battalion.health)
+    unit_manager.remove_unit(battalion)
+    assert squad.leader is knights[0] and squad.offsets[knights[1]] == (60, 0)
+    print("✓ Squad tests passed")
+
+def test_idle_units_sleep_and_wake():
+    from game.entities.unit import UnitManager
+    
+    unit_manager = UnitManager()
+    unit_manager.ai_scheduler.budget_ms = None
+    knight = unit_manager.spawn_unit(100, 100, 'knight', 'player')
+    archer = unit_manager.spawn_unit(300, 100, 'archer', 'player')
+    for _ in range(5):
+        unit_manager.update(1 / 60)
+    assert knight.asleep and archer.asleep and unit_manager.dormancy.active == []
+    
+    # Orders and damage wake a unit; it rejoins the awake list on the next tick
+    unit_manager.select_unit(knight)
+    unit_manager.move_selected_units(120, 100)
+    archer.take_damage(1)
+    unit_manager.update(1 / 60)
+    assert unit_manager.dormancy.active == [knight, archer]
+    
+    # Both rest again; an enemy walking into the cells they watch wakes them
+    for _ in range(60):
+        unit_manager.update(1 / 60)
+    assert knight.asleep and archer.asleep
+    enemy = unit_manager.spawn_unit(1200, 100, 'knight', 'enemy')
+    enemy.move_to(100, 100)
+    while knight.asleep:
+        unit_manager.update(1 / 60)
+    assert enemy.x > 100 + knight.attack_range + 200
+    print("✓ Sleep tests passed")
+
+def test_unit_indexes_follow_spawns_and_deaths():
+    from game.entities.unit import UnitManager
+    
+    unit_manager = UnitManager()
+    knight = unit_manager.spawn_unit(100, 100, 'knight', 'player')
+    battalion = unit_manager.spawn_unit(300, 100, 'battalion', 'player')
+    battalion.spawn_battalion_knights(unit_manager)
+    commander = unit_manager.spawn_unit(500, 100, 'commander', 'player')
+    archer = unit_manager.spawn_unit(900, 100, 'archer', 'enemy')
+    
+    # Views are live and in id order
+    players = unit_manager.get_units_by_owner('player')
+    assert list(players) == unit_manager.units[:-1]
+    assert list(unit_manager.index.flagged('elite')) == battalion.squad.members
+    assert list(unit_manager.index.of_type('knight')) == [knight] + battalion.squad.members
+    assert unit_manager.get_selected_commanders() == []
+    unit_manager.select_unit(commander)
+    assert unit_manager.get_selected_commanders() == [commander]
+    
+    # A unit leaves its indexes when it dies, before the update that removes it
+    archer.take_damage(archer.health)
+    assert list(unit_manager.get_units_by_owner('enemy')) == []
+    knight.take_damage(knight.health)
+    unit_manager.update(1 / 60)
+    assert knight not in players and len(players) == 8
+    print("✓ Unit index tests passed")
+
+def test_influence_map():
+    from game.entities.unit import UnitManager
+    from game.entities.influence import UPDATE_INTERVAL
+    from game.entities.resource import Resource
+    from game.world.castle import Castle
+    
+    unit_manager = UnitManager()
+    unit_manager.spawn_unit(100, 100, 'knight', 'player')
+    archer = unit_manager.spawn_unit(1400, 1400, 'archer', 'enemy')
+    unit_manager.update(1 / 60)  # The first update refreshes the map
+    influence = unit_manager.influence
+    
+    # Each side's field covers its engage range and stops a little past it
+    assert influence.friendly('player', 100, 100) > 0 and influence.threat('player', 100, 100) == 0
+    assert influence.threat('player', 1400 - 200, 1400) > 0
+    assert influence.threat('player', 1400 - 500, 1400) == 0
+    assert influence.hotspot('enemy') == (1376.0, 1376.0)
+    
+    # Refreshed at a low rate, not every tick
+    archer.x, archer.y = 800, 800
+    unit_manager.update(1 / 60)
+    assert influence.threat('player', 800, 800) == 0
+    for _ in range(30):
+        unit_manager.update(1 / 60)
+    assert influence.threat('player', 800, 800) > 0
+    
+    # A new unit shows up on the next update, and the field reaches as far as it and a
+    # player unit can close in on each other before the refresh after that
+    cavalry = unit_manager.spawn_unit(1000, 400, 'cavalry', 'enemy')
+    unit_manager.update(1 / 60)
+    assert influence.threat('player', 1000, 400) > 0
+    assert influence.threat('player', 1000 - 200 - 2 * cavalry.speed * UPDATE_INTERVAL, 400) > 0
+    
+    # Value fades out from what is worth taking; a damaged castle is worth more
+    castle = Castle(200, 150, "player")
+    center = (castle.x + castle.size // 2, castle.y + castle.size // 2)
+    field = Resource(1200, 1200, 'gold', 40)
+    influence.refresh(unit_manager.index, [castle], [field])
+    assert influence.worth_taking('enemy', *center) > influence.worth_taking('enemy', center[0] + 300, center[1]) > 0
+    assert influence.worth_taking('player', *center) == 0
+    intact = influence.worth_taking('enemy', *center)
+    castle.health //= 2
+    influence.refresh(unit_manager.index, [castle], [field])
+    assert influence.worth_taking('enemy', *center) > intact
+    
+    # Enemies march on the castle, unless its defenders outweigh it: then they raid the harvest
+    assert unit_manager._find_nearest_target_for_enemy(archer, castle) == center
+    for _ in range(15):
+        unit_manager.spawn_unit(230, 190, 'knight', 'player')
+    influence.refresh(unit_manager.index, [castle], [field])
+    assert unit_manager._find_nearest_target_for_enemy(archer, castle) == influence.objective('enemy')
+    assert influence.cell_of(*influence.objective('enemy')) == influence.cell_of(1212, 1212)
+    print("✓ Influence map tests passed")
+
+def test_timed_events():
+    from game.scheduler import EventScheduler
+    
+    # Events fire in due order, ties in the order they were added, only once due
+    events = EventScheduler()
+    fired = []
+    events.at(2.0, fired.append, 'late')
+    events.at(1.0, fired.append, 'first')
+    events.at(1.0, fired.append, 'second')
+    assert events.run(0.5) == 0 and fired == []
+    assert events.run(1.0) == 2 and fired == ['first', 'second']
+    assert events.due(fired.append) == 2.0
+    events.run(5.0)
+    assert fired == ['first', 'second', 'late'] and len(events) == 0
+    print("✓ Timed event tests passed")
+
+def test_fog_of_war():
+    from game.entities.unit import UnitManager
+    from game.world.fog import FOG_CELL
+    
+    unit_manager = UnitManager()
+    fog = unit_manager.fog
+    scout = unit_manager.spawn_unit(100, 100, 'knight', 'player')
+    unit_manager.spawn_unit(1400, 1400, 'archer', 'enemy')
+    assert fog.is_visible(100, 100) and not fog.is_visible(1400, 1400)
+    
+    # Moving inside a cell leaves the grid alone; crossing one restamps it
+    version = fog.version
+    scout.x += 3
+    fog.follow([scout])
+    assert fog.version == version
+    scout.x += FOG_CELL * 10
+    fog.follow([scout])
+    assert fog.version > version
+    
+    # Ground walked away from stays explored but is no longer watched
+    assert not fog.is_visible(0, 0) and fog.is_explored(0, 0)
+    unit_manager.remove_unit(scout)
+    assert not fog.counts.any() and fog.is_explored(100, 100)
+    print("✓ Fog of war tests passed")
+
+def test_peasant_economy():
+    from game.entities.unit import UnitManager
+    from game.entities.resource import Resource, ResourceManager
+    from game.entities.economy import CARRY_CAPACITY
+    from game.world.castle import Castle
+    from game.world.map import GameMap
+    
+    resource_manager = ResourceManager(GameMap(50, 50))
+    resource_manager.clear()
+    near = Resource(400, 200, 'stone', 100)
+    resource_manager.add(near)
+    resource_manager.add(Resource(1200, 1200, 'wood', 40))
+    castle = Castle(200, 150, "player")
+    stone = castle.resources['stone']
+    
+    # A hired peasant takes the nearest resource off the job queue, works it and carries the stone home
+    unit_manager = UnitManager()
+    economy = unit_manager.economy
+    peasant = unit_manager.spawn_unit(castle.x + castle.size + 20, castle.y + castle.size // 2, 'peasant', 'player')
+    economy.hire(peasant)
+    dt = 1 / 30
+    for _ in range(int(20 / dt)):
+        unit_manager.update(dt, castle, [])
+        economy.update(dt, castle, resource_manager)
+    assert economy.workers[peasant].resource is near
+    assert castle.resources['stone'] >= stone + CARRY_CAPACITY and near.amount < 100
+    
+    # A player order takes it off work
+    unit_manager.select_unit(peasant)
+    unit_manager.move_selected_units(800, 800)
+    assert peasant not in economy.workers and not economy.claims
+    assert resource_manager.get_resource_at(near.x + 5, near.y + 5) is near
+    print("✓ Peasant economy tests passed")
+
 if __name__ == "__main__":
     print("Testing Kingdom Heroes...")
     print("=" * 40)